@@ -0,0 +1,140 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+
+import httpx
+from jose import jwt, JWTError
+
+
+class JWKSUnavailable(Exception):
+    # the IdP's signing keys couldn't be fetched and none are cached, so no
+    # token can be checked either way
+    pass
+
+
+class JWKSCache:
+    # Signing keys from the IdP's JWKS endpoint, refreshed every `ttl` seconds
+    # or when a token arrives with a kid we haven't seen. Only one refresh runs
+    # at a time; everyone else waits for it and reuses the result. If the IdP is
+    # unreachable the last good key set keeps being served.
+
+    def __init__(self, url: str, ttl: float = 600, min_refresh_interval: float = 30, timeout: float = 5.0):
+        self.url = url
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+
+        self._keys = {}
+        self._fetched_at = None
+        self._lock = asyncio.Lock()
+
+    async def get_key(self, kid: str) -> dict:
+        now = time.monotonic()
+        if self._fetched_at is None or now - self._fetched_at > self.ttl:
+            await self._refresh()
+        elif kid not in self._keys and now - self._fetched_at > self.min_refresh_interval:
+            # possibly a rotated key; rate limited so garbage kids can't hammer the IdP
+            await self._refresh()
+
+        key = self._keys.get(kid)
+        if key is None:
+            raise JWTError("Invalid JWT")
+        return key
+
+    async def _refresh(self):
+        seen = self._fetched_at
+        async with self._lock:
+            if self._fetched_at != seen:
+                # another request refreshed while we were waiting
+                return
+
+            try:
+                async with httpx.AsyncClient(timeout=self.timeout) as client:
+                    response = await client.get(self.url)
+                    response.raise_for_status()
+                    jwks = response.json()
+            except (httpx.HTTPError, ValueError) as e:
+                if not self._keys:
+                    raise JWKSUnavailable(f"JWKS fetch failed: {e!r}") from e
+                print(f"JWKS refresh failed, keeping cached keys: {e}")
+                # retry after min_refresh_interval rather than on every request
+                self._fetched_at = time.monotonic() - self.ttl + self.min_refresh_interval
+                return
+
+            self._keys = {
+                key["kid"]: {
+                    "kty": key["kty"],
+                    "kid": key["kid"],
+                    "use": key["use"],
+                    "n": key["n"],
+                    "e": key["e"],
+                }
+                for key in jwks["keys"]
+            }
+            self._fetched_at = time.monotonic()
+
+
+class VerifiedTokenCache:
+    # Decoded payloads of tokens that already passed verification, keyed by a
+    # hash of the raw token and dropped once the token's exp has passed.
+
+    def __init__(self, maxsize: int = 10_000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str):
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        payload, exp = entry
+        if exp <= time.time():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return payload
+
+    def put(self, token: str, payload: dict):
+        exp = payload.get("exp")
+        if exp is None:
+            return
+
+        key = self._key(token)
+        self._entries[key] = (payload, exp)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+class TokenVerifier:
+    def __init__(self, jwks: JWKSCache, audience: str, issuer: str, algorithms: list, cache: VerifiedTokenCache | None = None):
+        self.jwks = jwks
+        self.audience = audience
+        self.issuer = issuer
+        self.algorithms = algorithms
+        self.cache = cache or VerifiedTokenCache()
+
+    async def verify(self, token: str) -> dict:
+        payload = self.cache.get(token)
+        if payload is not None:
+            return payload
+
+        unverified_header = jwt.get_unverified_header(token)
+        rsa_key = await self.jwks.get_key(unverified_header.get("kid"))
+        payload = jwt.decode(
+            token,
+            rsa_key,
+            algorithms=self.algorithms,
+            audience=self.audience,
+            issuer=self.issuer,
+        )
+
+        self.cache.put(token, payload)
+        return payload
@@ -0,0 +1,141 @@
+import asyncio
+import itertools
+import time
+
+import modal
+
+
+class UnknownJob(Exception):
+    # result() for a job id the backend never handed out
+    pass
+
+
+class ModalBackend:
+    # How the web tier reaches the GPU classes. Every call goes through modal's
+    # .aio interface so nothing blocks the event loop, and class handles are
+    # looked up once per container instead of once per request.
+
+    def __init__(self, app_name: str, cancellations: str):
+        self.app_name = app_name
+        self._generators = {}
+        # the modal.Dict generators poll for cancelled job ids
+        self.cancellations = modal.Dict.from_name(cancellations, create_if_missing=True)
+
+    def generator(self, class_name: str):
+        generator = self._generators.get(class_name)
+        if generator is None:
+            generator = modal.Cls.from_name(self.app_name, class_name)()
+            self._generators[class_name] = generator
+        return generator
+
+    # run() and result() return what generate_timed does: the images with
+    # their seeds and the generator's stage timings
+
+    async def run(self, class_name: str, request: dict):
+        return await self.generator(class_name).generate_timed.remote.aio(request)
+
+    async def spawn(self, class_name: str, request: dict) -> str:
+        call = await self.generator(class_name).generate_timed.spawn.aio(request)
+        return call.object_id
+
+    async def stream(self, class_name: str, request: dict):
+        # progress events as the generator emits them, ending with the result
+        async for event in self.generator(class_name).generate_stream.remote_gen.aio(request):
+            yield event
+
+    async def result(self, job_id: str, timeout: float = 0):
+        # raises TimeoutError while the job is still running
+        try:
+            call = await modal.FunctionCall.from_id.aio(job_id)
+            return await call.get.aio(timeout=timeout)
+        except (modal.exception.NotFoundError, modal.exception.InvalidError) as e:
+            raise UnknownJob(job_id) from e
+
+    async def cancel(self, job_id: str):
+        # whichever generator holds the job (the job_id of its request)
+        # stops it at the next denoising step, and its result says
+        # {"cancelled": True, "reclaimed": seconds}
+        await self.cancellations.put.aio(job_id, time.time())
+
+
+class FakeBackend:
+    # Stand-in for ModalBackend when running the web app in-process: every job
+    # "runs" for `latency` seconds and returns `image`, numberImages times,
+    # unless cancel() is called with its job_id first. Tracks how many jobs
+    # overlapped so callers can tell concurrent handling from serialised.
+
+    def __init__(self, latency: float = 0.5, image: bytes = b"\x89PNG\r\n\x1a\nfake"):
+        self.latency = latency
+        self.image = image
+        self.running = 0
+        self.peak_running = 0
+        self.calls = []
+        self.cancelled = set()
+
+        self._jobs = {}
+        self._ids = itertools.count(1)
+
+    async def _generate(self, class_name: str, request: dict):
+        self.calls.append((class_name, request, time.monotonic()))
+        self.running += 1
+        self.peak_running = max(self.peak_running, self.running)
+        try:
+            steps = request.get("iterations") or 1
+            for step in range(1, steps + 1):
+                await asyncio.sleep(self.latency / steps)
+                if request.get("job_id") in self.cancelled:
+                    return self._cancelled(step, steps)
+        finally:
+            self.running -= 1
+        return self._result(request)
+
+    def _cancelled(self, step: int, steps: int) -> dict:
+        return {
+            "cancelled": True,
+            "reclaimed": self.latency * (steps - step) / steps,
+            "timings": {"denoise": self.latency * step / steps},
+        }
+
+    def _result(self, request: dict) -> dict:
+        seed = int(request.get("seed") or 0)
+        n = request.get("numberImages") or 1
+        return {
+            "image": self.image,
+            "images": [self.image] * n,
+            "seeds": [seed + i for i in range(n)],
+            "batch_size": 1,
+            "timings": {"denoise": self.latency},
+            "counters": {"batch_size": 1, "steps_requested": request.get("iterations") or 1, "steps_run": request.get("iterations") or 1},
+        }
+
+    async def run(self, class_name: str, request: dict):
+        return await self._generate(class_name, request)
+
+    async def stream(self, class_name: str, request: dict):
+        steps = request.get("iterations") or 1
+        for step in range(1, steps + 1):
+            await asyncio.sleep(self.latency / steps)
+            if request.get("job_id") in self.cancelled:
+                yield {"event": "result", **self._cancelled(step, steps)}
+                return
+            yield {"event": "progress", "step": step, "steps": steps, "preview": None}
+        yield {"event": "result", **self._result(request)}
+
+    async def spawn(self, class_name: str, request: dict) -> str:
+        job_id = f"fc-fake-{next(self._ids)}"
+        self._jobs[job_id] = asyncio.create_task(self._generate(class_name, request))
+        return job_id
+
+    async def result(self, job_id: str, timeout: float = 0):
+        task = self._jobs.get(job_id)
+        if task is None:
+            raise UnknownJob(job_id)
+        if task.done():
+            return task.result()
+        if timeout <= 0:
+            raise TimeoutError()
+
+        return await asyncio.wait_for(asyncio.shield(task), timeout)
+
+    async def cancel(self, job_id: str):
+        self.cancelled.add(job_id)
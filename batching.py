@@ -0,0 +1,105 @@
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+
+
+class _Entry:
+    def __init__(self, key, item):
+        self.key = key
+        self.item = item
+        self.future = Future()
+
+
+class MicroBatcher:
+    # Collects concurrent submissions that share a key (width, height, steps,
+    # guidance, ...) for up to max_wait seconds and hands them to run_batch as
+    # a single list. run_batch must return one result per item, in order.
+    # Everything runs on one worker thread, so run_batch never overlaps itself.
+    # batch_limit(item), when given, caps a batch below max_batch_size
+    # according to the item that starts it.
+
+    def __init__(self, run_batch, max_batch_size: int = 4, max_wait: float = 0.05, batch_limit=None):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.batch_limit = batch_limit
+        self.max_wait = max_wait
+        self.batch_sizes = Counter()
+
+        self._queue = queue.Queue()
+        self._pending = deque()  # entries pulled off the queue that didn't fit the last batch
+        self._worker = threading.Thread(target=self._loop, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def enqueue(self, key, item) -> Future:
+        # the future resolves to (result, batch_size) once item's batch has run
+        entry = _Entry(key, item)
+        self._queue.put(entry)
+        return entry.future
+
+    def submit(self, key, item):
+        return self.enqueue(key, item).result()
+
+    def _next_batch(self):
+        first = self._pending.popleft() if self._pending else self._queue.get()
+        batch = [first]
+
+        limit = self.max_batch_size
+        if self.batch_limit is not None:
+            limit = max(1, min(limit, self.batch_limit(first.item)))
+
+        for entry in list(self._pending):
+            if len(batch) >= limit:
+                break
+            if entry.key == first.key:
+                self._pending.remove(entry)
+                batch.append(entry)
+
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < limit:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+
+            if entry.key == first.key:
+                batch.append(entry)
+            else:
+                self._pending.append(entry)
+
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._next_batch()
+            size = len(batch)
+            self.batch_sizes[size] += 1
+
+            try:
+                results = self.run_batch([entry.item for entry in batch])
+                if len(results) != size:
+                    raise RuntimeError(f"run_batch returned {len(results)} results for {size} items")
+            except Exception as e:
+                for entry in batch:
+                    entry.future.set_exception(e)
+                continue
+
+            for entry, result in zip(batch, results):
+                entry.future.set_result((result, size))
+
+    def stats(self) -> dict:
+        total = sum(self.batch_sizes.values())
+        images = sum(size * count for size, count in self.batch_sizes.items())
+        return {
+            "batches": total,
+            "images": images,
+            "mean_batch_size": images / total if total else 0.0,
+            "batch_sizes": dict(self.batch_sizes),
+        }
@@ -0,0 +1,147 @@
+# Cold start: time from a model on disk to a pipeline ready on the device,
+# for the current loading path (from_pretrained, cast, move, LoRA applied at
+# runtime) and for baked artifacts (weights.load_baked).
+#
+#   python -m benchmarks.bench_cold_start [--scale 8] [--repeat 3] [--device cpu] [--json cold_start.json]
+#
+# Pipelines are random-weight stand-ins from benchmarks/tiny_pipelines.py,
+# saved in float32 the way most Hub snapshots are. The FLUX one also gets a
+# LoRA, which the current path loads on start and the baked one has fused in.
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import torch
+from peft import LoraConfig
+from peft.utils import get_peft_model_state_dict
+
+from benchmarks.tiny_pipelines import TINY_PIPELINES
+from weights import bake_pipeline, load_baked, load_source
+
+PROMPT = "a cute racoon in a priest robe"
+
+
+def folder_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(dirpath, name)) for dirpath, _, names in os.walk(path) for name in names)
+
+
+def make_lora(kind: str, scale: int, lora_dir: str) -> dict:
+    pipe = TINY_PIPELINES[kind](scale)
+    pipe.transformer.add_adapter(LoraConfig(
+        r=4,
+        lora_alpha=4,
+        target_modules=["to_q", "to_k", "to_v", "to_out.0"],
+        init_lora_weights=False,  # random B as well, so the LoRA changes the output
+    ))
+    type(pipe).save_lora_weights(lora_dir, transformer_lora_layers=get_peft_model_state_dict(pipe.transformer))
+    return {"repo": lora_dir, "weight_name": "pytorch_lora_weights.safetensors"}
+
+
+def load_current(spec: dict, source_dir: str, device: str):
+    pipe = load_source(spec, source_dir).to(device)
+    loras = spec.get("fuse_loras", [])
+    for i, lora in enumerate(loras):
+        pipe.load_lora_weights(lora["repo"], weight_name=lora["weight_name"], adapter_name=f"lora_{i}")
+    if loras:
+        pipe.set_adapters([f"lora_{i}" for i in range(len(loras))])
+    return pipe
+
+
+def timed(load, repeat: int, device: str) -> list:
+    load()  # imports and first-touch allocations aren't part of either path
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pipe = load()
+        if device.startswith("cuda"):
+            torch.cuda.synchronize()
+        timings.append(time.perf_counter() - start)
+        del pipe
+    return timings
+
+
+def render(pipe, kind: str):
+    args = {} if kind == "sdxl" else {"max_sequence_length": 64}
+    image = pipe(
+        prompt=PROMPT,
+        num_inference_steps=2,
+        width=64,
+        height=64,
+        generator=torch.Generator("cpu").manual_seed(0),
+        **args,
+    ).images[0]
+    return np.asarray(image, dtype=np.int16)
+
+
+def run(scale: int, repeat: int, device: str, dtype: str) -> list:
+    results = []
+
+    for kind, build in TINY_PIPELINES.items():
+        with tempfile.TemporaryDirectory() as root:
+            source_dir = os.path.join(root, "model-cache", kind)
+            baked_dir = os.path.join(root, "baked", kind)
+
+            pipe = build(scale)
+            pipe.save_pretrained(source_dir)
+            params = sum(p.numel() for c in pipe.components.values() if isinstance(c, torch.nn.Module) for p in c.parameters())
+
+            spec = {"pipeline": type(pipe).__name__, "dtype": dtype}
+            if kind == "flux":
+                spec["fuse_loras"] = [make_lora(kind, scale, os.path.join(root, "lora"))]
+            del pipe
+
+            start = time.perf_counter()
+            bake_pipeline(spec, source_dir, baked_dir, device)
+            bake_seconds = time.perf_counter() - start
+
+            current = timed(lambda: load_current(spec, source_dir, device), repeat, device)
+            baked = timed(lambda: load_baked(baked_dir, device), repeat, device)
+
+            # fusing changes rounding, not the picture
+            diff = np.abs(render(load_current(spec, source_dir, device), kind) - render(load_baked(baked_dir, device), kind))
+
+            results.append({
+                "model": kind,
+                "params": params,
+                "lora": bool(spec.get("fuse_loras")),
+                "source_bytes": folder_bytes(source_dir),
+                "baked_bytes": folder_bytes(baked_dir),
+                "bake_s": bake_seconds,
+                "current_ms_p50": statistics.median(current) * 1000,
+                "baked_ms_p50": statistics.median(baked) * 1000,
+                "max_pixel_diff": int(diff.max()),
+            })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=8, help="multiplies layer count and width of the tiny models")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--dtype", default="bfloat16")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.scale, args.repeat, args.device, args.dtype)
+
+    print(f"{'model':>6} {'params':>9} {'src MB':>7} {'baked MB':>9} {'current ms':>11} {'baked ms':>9} {'speedup':>8} {'max diff':>9}")
+    for r in results:
+        print(
+            f"{r['model']:>6} {r['params']:>9} {r['source_bytes'] / 2**20:>7.1f} {r['baked_bytes'] / 2**20:>9.1f} "
+            f"{r['current_ms_p50']:>11.1f} {r['baked_ms_p50']:>9.1f} {r['current_ms_p50'] / r['baked_ms_p50']:>7.1f}x {r['max_pixel_diff']:>9}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "cold_start", "device": args.device, "dtype": args.dtype, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Per-bucket latency of the tiny pipelines before and after
+# compilation.optimize_pipeline, and the first call of a second "container"
+# that finds the first one's inductor cache.
+#
+#   python -m benchmarks.bench_compile [--scale 2] [--steps 2] [--device cpu] [--json compile.json]
+#
+# Buckets are RESOLUTION_BUCKETS scaled down 8x, so the shapes keep their
+# aspect ratios. On a CPU inductor emits C++, which needs a compiler on PATH.
+
+import argparse
+import json
+import tempfile
+
+import torch
+import torch._dynamo
+
+from benchmarks.tiny_pipelines import TINY_PIPELINES
+from compilation import optimize_pipeline, warm_up
+from model_registry import RESOLUTION_BUCKETS
+
+BUCKETS = [(width // 8, height // 8) for width, height in RESOLUTION_BUCKETS]
+
+
+def run(scale: int, steps: int, device: str) -> list:
+    results = []
+
+    for kind, build in TINY_PIPELINES.items():
+        args = {} if kind == "sdxl" else {"max_sequence_length": 64}
+        with tempfile.TemporaryDirectory() as compile_dir:
+            pipe = build(scale).to(device)
+            eager = warm_up(pipe, BUCKETS, steps=steps, **args)
+            optimize_pipeline(pipe, compile_dir)
+            compiled = warm_up(pipe, BUCKETS, steps=steps, **args)
+
+            # a fresh pipeline and dynamo state, as in a new container
+            del pipe
+            torch._dynamo.reset()
+            pipe = build(scale).to(device)
+            optimize_pipeline(pipe, compile_dir)
+            cached = warm_up(pipe, BUCKETS, steps=steps, repeat=0, **args)
+            del pipe
+            torch._dynamo.reset()
+
+        for bucket in eager:
+            results.append({
+                "model": kind,
+                "bucket": bucket,
+                "eager_ms": eager[bucket]["steady_s"] * 1000,
+                "compiled_ms": compiled[bucket]["steady_s"] * 1000,
+                "compile_ms": compiled[bucket]["first_s"] * 1000,
+                "cached_compile_ms": cached[bucket]["first_s"] * 1000,
+            })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=2, help="multiplies layer count and width of the tiny models")
+    parser.add_argument("--steps", type=int, default=2)
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.scale, args.steps, args.device)
+
+    print(f"{'model':>6} {'bucket':>10} {'eager ms':>9} {'compiled ms':>12} {'compile ms':>11} {'from cache ms':>14}")
+    for r in results:
+        print(
+            f"{r['model']:>6} {r['bucket']:>10} {r['eager_ms']:>9.1f} {r['compiled_ms']:>12.1f} "
+            f"{r['compile_ms']:>11.0f} {r['cached_compile_ms']:>14.0f}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "compile", "device": args.device, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# Encode time and output size per format for generator-sized images.
+#
+#   python -m benchmarks.bench_encoding [--repeat 5] [--json encoding.json]
+#
+# Source pixels come from the bundled model icons (real generated images),
+# resized to each benchmark size.
+
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from encoding import FORMATS, encode_image
+
+SIZES = (512, 1024, 2048)
+IMAGES_DIR = Path(__file__).resolve().parent.parent / "images"
+
+
+def load_sources() -> list:
+    sources = []
+    for path in sorted(IMAGES_DIR.glob("*.png")) + sorted(IMAGES_DIR.glob("*.jpg")):
+        sources.append(Image.open(path).convert("RGB"))
+    return sources
+
+
+def run(repeat: int) -> list:
+    sources = load_sources()
+    results = []
+
+    for size in SIZES:
+        images = [source.resize((size, size), Image.Resampling.LANCZOS) for source in sources]
+        for fmt in FORMATS:
+            timings = []
+            sizes = []
+            for image in images:
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    data = encode_image(image, fmt)
+                    timings.append(time.perf_counter() - start)
+                sizes.append(len(data))
+
+            results.append({
+                "size": size,
+                "format": fmt,
+                "encode_ms_p50": statistics.median(timings) * 1000,
+                "encode_ms_max": max(timings) * 1000,
+                "bytes_mean": statistics.mean(sizes),
+            })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+
+    print(f"{'size':>6} {'format':>6} {'p50 ms':>9} {'max ms':>9} {'mean KB':>9}")
+    for r in results:
+        print(f"{r['size']:>6} {r['format']:>6} {r['encode_ms_p50']:>9.1f} {r['encode_ms_max']:>9.1f} {r['bytes_mean'] / 1024:>9.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "encoding", "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
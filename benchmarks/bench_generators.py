@@ -0,0 +1,187 @@
+# The generators' own enter()/generate code paths, on tiny random-weight
+# pipelines on the CPU: load time from a snapshot and from baked weights,
+# then per-step, text encoding, VAE decode and image encode time for a
+# generate call.
+#
+#   python -m benchmarks.bench_generators [--scale 1] [--steps 8] [--size 64] [--repeat 3] [--format png] [--json generators.json]
+#
+# Every GENERATORS entry runs as its own class, including the ones that are
+# pooled in production, with its registry profile apart from dtype (float32
+# on the CPU unless --dtype says otherwise) and compilation (off). LoRA
+# styles get tiny random LoRAs so adapter switching is part of the run.
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from functools import partial
+
+import torch
+
+# prompt_forge opens its profile database on import; nothing here uses it
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+import model_registry
+import prompt_forge
+from benchmarks.bench_cold_start import make_lora
+from benchmarks.tiny_pipelines import TINY_PIPELINES
+from model_registry import GENERATORS, MODELS, apply_profile, loras_for
+from weights import bake_pipeline
+
+TINY_FOR = {"FluxPipeline": "flux", "StableDiffusion3Pipeline": "sd3", "AutoPipelineForText2Image": "sdxl"}
+
+
+class Timings:
+    # wall time of every call to the hooked modules and functions
+    def __init__(self):
+        self.calls = {}
+
+    def hook_module(self, name: str, module: torch.nn.Module):
+        started = []
+        module.register_forward_pre_hook(lambda *_: started.append(time.perf_counter()))
+        module.register_forward_hook(lambda *_: self.calls.setdefault(name, []).append(time.perf_counter() - started.pop()))
+
+    def wrap(self, name: str, owner, attribute: str):
+        function = getattr(owner, attribute)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.calls.setdefault(name, []).append(time.perf_counter() - start)
+
+        setattr(owner, attribute, timed)
+
+    def mean_ms(self, name: str) -> float | None:
+        calls = self.calls.get(name)
+        return statistics.mean(calls) * 1000 if calls else None
+
+    def total_ms(self, name: str, runs: int) -> float | None:
+        calls = self.calls.get(name)
+        return sum(calls) * 1000 / runs if calls else None
+
+
+def generator_class(name: str, profile: dict, loras: dict, device: str):
+    base = prompt_forge.LoraGenerator if loras else prompt_forge.BatchedGenerator
+    return type(name, (base,), {"profile": profile, "loras": loras, "device": device})
+
+
+def entered(cls):
+    generator = cls()
+    start = time.perf_counter()
+    generator.enter()
+    return generator, (time.perf_counter() - start) * 1000
+
+
+def run(scale: int, steps: int, size: int, repeat: int, fmt: str, device: str, dtype: str) -> list:
+    results = []
+
+    with tempfile.TemporaryDirectory() as root:
+        prompt_forge.MODEL_CACHE_DIR = os.path.join(root, "model-cache")
+        prompt_forge.BAKED_DIR = os.path.join(root, "baked")
+        prompt_forge.LORA_CACHE_DIR = os.path.join(root, "lora-cache")
+
+        profiles = {name: {**profile, "dtype": dtype, "compile": False} for name, profile in GENERATORS.items()}
+        # the tiny models are sized for a few latent pixels, far below what the planner lets real ones take
+        model_registry.MIN_SIDE = min(model_registry.MIN_SIDE, size)
+        prompt_forge.apply_profile = partial(apply_profile, models=MODELS, generators=profiles)
+
+        for name, profile in profiles.items():
+            kind = TINY_FOR[profile["pipeline"]]
+            source_dir = os.path.join(prompt_forge.MODEL_CACHE_DIR, profile["base"])
+            if not os.path.isdir(source_dir):
+                TINY_PIPELINES[kind](scale).save_pretrained(source_dir, variant=profile.get("variant"))
+
+            loras = {}
+            for model_id, lora in loras_for(name).items():
+                make_lora(kind, scale, os.path.join(prompt_forge.LORA_CACHE_DIR, lora["repo"]))
+                loras[model_id] = {"repo": lora["repo"], "weight_name": "pytorch_lora_weights.safetensors"}
+
+            cls = generator_class(name, profile, loras, device)
+            generator, load_source_ms = entered(cls)
+            generator.encoder.shutdown()
+
+            bake_pipeline(profile, source_dir, os.path.join(prompt_forge.BAKED_DIR, profile["base"]), device)
+            generator, load_baked_ms = entered(cls)
+
+            timings = Timings()
+            pipe = generator.pipe
+            timings.hook_module("denoiser", getattr(pipe, "transformer", None) or pipe.unet)
+            for component in ("text_encoder", "text_encoder_2", "text_encoder_3"):
+                if getattr(pipe, component, None) is not None:
+                    timings.hook_module("text_encoder", getattr(pipe, component))
+            timings.wrap("decode", pipe.vae, "decode")
+            timings.wrap("encode", generator, "encode")
+
+            model_id = next(m for m, model in MODELS.items() if model["generator"] == name)
+            request = {
+                "prompt": "a cute racoon in a priest robe",
+                "model_id": model_id,
+                "width": size,
+                "height": size,
+                "iterations": min(steps, MODELS[model_id]["max_steps"]),
+                "guidance": 3.5,
+                "seed": 0,
+                "format": fmt,
+            }
+
+            generator.render(request)  # first call: adapter switch, allocator warm-up
+            timings.calls.clear()
+            generate = []
+            for i in range(repeat):
+                # a new prompt every time, so text encoding isn't served from the prompt cache
+                start = time.perf_counter()
+                generator.render({**request, "prompt": f"{request['prompt']} {i}"})
+                generate.append(time.perf_counter() - start)
+            generator.encoder.shutdown()
+
+            results.append({
+                "generator": name,
+                "pipeline": kind,
+                "steps": request["iterations"],
+                "load_source_ms": load_source_ms,
+                "load_baked_ms": load_baked_ms,
+                "generate_ms_p50": statistics.median(generate) * 1000,
+                "step_ms": timings.mean_ms("denoiser"),
+                "text_encode_ms": timings.total_ms("text_encoder", repeat),
+                "decode_ms": timings.mean_ms("decode"),
+                "encode_ms": timings.mean_ms("encode"),
+            })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=1, help="multiplies layer count and width of the tiny models")
+    parser.add_argument("--steps", type=int, default=8, help="capped at each model's max_steps")
+    parser.add_argument("--size", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--format", default="png")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--dtype", default="float32")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.scale, args.steps, args.size, args.repeat, args.format, args.device, args.dtype)
+
+    def ms(value):
+        return f"{value:.1f}" if value is not None else "-"
+
+    print(f"{'generator':>26} {'load ms':>8} {'baked ms':>9} {'generate':>9} {'steps':>5} {'step ms':>8} {'text ms':>8} {'decode':>7} {'encode':>7}")
+    for r in results:
+        print(
+            f"{r['generator']:>26} {r['load_source_ms']:>8.0f} {r['load_baked_ms']:>9.0f} {r['generate_ms_p50']:>9.1f} {r['steps']:>5} "
+            f"{ms(r['step_ms']):>8} {ms(r['text_encode_ms']):>8} {ms(r['decode_ms']):>7} {ms(r['encode_ms']):>7}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "generators", "device": args.device, "dtype": args.dtype, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# Quality, latency and memory of the quantized loading modes against the
+# unquantized pipeline, for the FLUX and SD3 stand-ins.
+#
+#   python -m benchmarks.bench_quantize [--scale 4] [--repeat 3] [--device cpu] [--dtype bfloat16] [--json quantize.json]
+#
+# Each mode is baked and loaded through weights.load_pipeline, as the
+# generators do. Quality is measured on the same prompt and seed as the
+# baseline; "noise" is the baseline against itself, the floor below which
+# differences mean nothing.
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+from benchmarks.tiny_pipelines import TINY_PIPELINES
+from quantization import QUANTIZE_MODES, QUANTIZED_COMPONENTS
+from weights import bake_pipeline, load_pipeline
+
+PROMPT = "a cute racoon in a priest robe"
+MODELS = ("flux", "sd3")
+
+
+def quantized_bytes(pipe) -> int:
+    # weights of the components quantization applies to
+    total = 0
+    for name, component in pipe.components.items():
+        if name in QUANTIZED_COMPONENTS or type(component).__name__ in QUANTIZED_COMPONENTS:
+            total += sum(t.nbytes for t in list(component.parameters()) + list(component.buffers()))
+    return total
+
+
+def render(pipe, size: int) -> np.ndarray:
+    image = pipe(
+        prompt=PROMPT,
+        num_inference_steps=4,
+        width=size,
+        height=size,
+        max_sequence_length=64,
+        generator=torch.Generator("cpu").manual_seed(0),
+    ).images[0]
+    return np.asarray(image, dtype=np.float64)
+
+
+def psnr(a: np.ndarray, b: np.ndarray) -> float:
+    mse = np.mean((a - b) ** 2)
+    return float("inf") if mse == 0 else 10 * np.log10(255**2 / mse)
+
+
+def run(scale: int, repeat: int, device: str, dtype: str, size: int) -> list:
+    results = []
+
+    for kind in MODELS:
+        with tempfile.TemporaryDirectory() as root:
+            source_dir = os.path.join(root, "model-cache", kind)
+            TINY_PIPELINES[kind](scale).save_pretrained(source_dir)
+
+            baseline = None
+            for mode in (None,) + tuple(QUANTIZE_MODES):
+                spec = {"pipeline": "FluxPipeline" if kind == "flux" else "StableDiffusion3Pipeline", "dtype": dtype, "quantize": mode}
+                baked_dir = os.path.join(root, "baked", f"{kind}-{mode}")
+                bake_pipeline(spec, source_dir, baked_dir, device)
+                pipe = load_pipeline(spec, source_dir, baked_dir, device)
+
+                image = render(pipe, size)  # also the warm-up
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    render(pipe, size)
+                    if device.startswith("cuda"):
+                        torch.cuda.synchronize()
+                    timings.append(time.perf_counter() - start)
+
+                if baseline is None:
+                    baseline = image
+                    image = render(pipe, size)
+                results.append({
+                    "model": kind,
+                    "mode": mode or dtype,
+                    "weights_bytes": quantized_bytes(pipe),
+                    "render_ms_p50": statistics.median(timings) * 1000,
+                    "mean_pixel_diff": float(np.abs(image - baseline).mean()),
+                    "psnr_db": psnr(image, baseline),
+                })
+                del pipe
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=4, help="multiplies layer count and width of the tiny models")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--dtype", default="bfloat16")
+    parser.add_argument("--size", type=int, default=128)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.scale, args.repeat, args.device, args.dtype, args.size)
+
+    print(f"{'model':>6} {'mode':>9} {'weights MB':>11} {'render ms':>10} {'mean diff':>10} {'PSNR dB':>8}")
+    for r in results:
+        label = f"{r['mode']}" if r["mode"] in QUANTIZE_MODES else f"{r['mode']}*"
+        print(
+            f"{r['model']:>6} {label:>9} {r['weights_bytes'] / 2**20:>11.2f} {r['render_ms_p50']:>10.1f} "
+            f"{r['mean_pixel_diff']:>10.3f} {r['psnr_db']:>8.1f}"
+        )
+    print("* baseline: its diff and PSNR are run-to-run noise")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "quantize", "device": args.device, "dtype": args.dtype, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
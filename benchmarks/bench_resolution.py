@@ -0,0 +1,118 @@
+# The resolution planner's decisions for every generator, and what its
+# memory savers cost on the tiny pipelines: render time, peak memory (CUDA
+# only) and how far the image moves from an untiled, unsliced decode.
+#
+#   python -m benchmarks.bench_resolution [--scale 1] [--size 128] [--batch 2] [--sizes 512,1024,1536,2048,3072] [--json resolution.json]
+#
+# The tiny VAEs tile at 32 pixels, so --size only has to be a few tiles
+# across for the tiled path to do real work.
+
+import argparse
+import json
+import time
+
+import numpy as np
+import torch
+
+from benchmarks.tiny_pipelines import TINY_PIPELINES
+from model_registry import GENERATORS, plan_resolution
+
+PROMPT = "a cute racoon in a priest robe"
+MODELS = ("flux", "sd3", "sdxl")
+SAVERS = {
+    "none": {},
+    "vae_slicing": {"vae_slicing": True},
+    "vae_tiling": {"vae_slicing": True, "vae_tiling": True},
+    "attention_slicing": {"vae_slicing": True, "vae_tiling": True, "attention_slicing": True},
+}
+
+
+def plans(sizes: list) -> list:
+    results = []
+    for name in GENERATORS:
+        for size in sizes:
+            try:
+                plan = plan_resolution(name, size, size)
+            except ValueError as e:
+                plan = {"rejected": str(e)}
+            results.append({"generator": name, "size": size, **plan})
+    return results
+
+
+def render(pipe, size: int, batch: int, device: str) -> tuple:
+    if device.startswith("cuda"):
+        torch.cuda.reset_peak_memory_stats()
+    start = time.perf_counter()
+    images = pipe(
+        prompt=[PROMPT] * batch,
+        num_inference_steps=2,
+        width=size,
+        height=size,
+        generator=[torch.Generator("cpu").manual_seed(i) for i in range(batch)],
+    ).images
+    elapsed = time.perf_counter() - start
+    peak = torch.cuda.max_memory_allocated() if device.startswith("cuda") else None
+    return np.stack([np.asarray(image, dtype=np.float64) for image in images]), elapsed, peak
+
+
+def savers(scale: int, size: int, batch: int, device: str) -> list:
+    results = []
+    for kind in MODELS:
+        pipe = TINY_PIPELINES[kind](scale).to(device)
+        render(pipe, size, batch, device)  # warm-up
+
+        baseline = None
+        for label, options in SAVERS.items():
+            if options.get("attention_slicing") and not hasattr(pipe, "unet"):
+                continue
+            pipe.vae.enable_slicing() if options.get("vae_slicing") else pipe.vae.disable_slicing()
+            pipe.vae.enable_tiling() if options.get("vae_tiling") else pipe.vae.disable_tiling()
+            pipe.enable_attention_slicing() if options.get("attention_slicing") else pipe.disable_attention_slicing()
+
+            images, elapsed, peak = render(pipe, size, batch, device)
+            if baseline is None:
+                baseline = images
+            results.append({
+                "model": kind,
+                "savers": label,
+                "render_ms": elapsed * 1000,
+                "peak_bytes": peak,
+                "mean_pixel_diff": float(np.abs(images - baseline).mean()),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=1, help="multiplies layer count and width of the tiny models")
+    parser.add_argument("--size", type=int, default=128)
+    parser.add_argument("--batch", type=int, default=2)
+    parser.add_argument("--sizes", default="512,1024,1536,2048,3072", help="square sizes to plan for every generator")
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    planned = plans([int(s) for s in args.sizes.split(",")])
+    measured = savers(args.scale, args.size, args.batch, args.device)
+
+    print(f"{'generator':>26} {'size':>5} {'batch':>5} {'est GiB':>8}  savers")
+    for p in planned:
+        if "rejected" in p:
+            print(f"{p['generator']:>26} {p['size']:>5}     -        -  rejected")
+            continue
+        on = [saver for saver in ("vae_slicing", "vae_tiling", "attention_slicing") if p[saver]] or ["none"]
+        print(f"{p['generator']:>26} {p['size']:>5} {p['max_batch']:>5} {p['estimated_gb']:>8.1f}  {', '.join(on)}")
+
+    print()
+    print(f"{'model':>6} {'savers':>18} {'render ms':>10} {'peak MiB':>9} {'mean diff':>10}")
+    for r in measured:
+        peak = f"{r['peak_bytes'] / 2**20:.0f}" if r["peak_bytes"] is not None else "-"
+        print(f"{r['model']:>6} {r['savers']:>18} {r['render_ms']:>10.1f} {peak:>9} {r['mean_pixel_diff']:>10.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "resolution", "device": args.device, "plans": planned, "savers": measured}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# Steps run, speed and image difference of step_cache thresholds against
+# running every step, on the tiny FLUX and SD3 transformers.
+#
+#   python -m benchmarks.bench_step_cache [--scale 4] [--steps 28] [--repeat 3] [--thresholds 0.05,0.1,0.2,0.4] [--json step_cache.json]
+#
+# Random weights change more between steps than trained ones, so the same
+# threshold skips fewer steps here than on the real models; the shape of the
+# trade-off is what carries over.
+
+import argparse
+import json
+import time
+
+import numpy as np
+import torch
+
+from benchmarks.tiny_pipelines import TINY_PIPELINES
+from step_cache import enable_step_cache
+
+PROMPT = "a cute racoon in a priest robe"
+MODELS = ("flux", "sd3")
+
+
+def render(pipe, steps: int, size: int) -> np.ndarray:
+    image = pipe(
+        prompt=PROMPT,
+        num_inference_steps=steps,
+        width=size,
+        height=size,
+        guidance_scale=4.0,
+        max_sequence_length=64,
+        generator=torch.Generator("cpu").manual_seed(0),
+    ).images[0]
+    return np.asarray(image, dtype=np.float64)
+
+
+def psnr(a: np.ndarray, b: np.ndarray) -> float:
+    mse = np.mean((a - b) ** 2)
+    return float("inf") if mse == 0 else 10 * np.log10(255**2 / mse)
+
+
+def run(scale: int, steps: int, size: int, thresholds: list, repeat: int, device: str) -> list:
+    results = []
+
+    for kind in MODELS:
+        pipe = TINY_PIPELINES[kind](scale).to(device)
+        cache = enable_step_cache(pipe.transformer)
+        render(pipe, 2, size)  # warm-up
+
+        baseline = None
+        for threshold in [0.0] + thresholds:
+            timings = []
+            for _ in range(repeat):
+                cache.start(threshold)
+                start = time.perf_counter()
+                image = render(pipe, steps, size)
+                timings.append(time.perf_counter() - start)
+            elapsed = min(timings)
+            if baseline is None:
+                baseline, baseline_elapsed = image, elapsed
+
+            results.append({
+                "model": kind,
+                "threshold": threshold,
+                "steps": steps,
+                "steps_run": cache.computed if threshold else steps,
+                "render_ms": elapsed * 1000,
+                "speedup": baseline_elapsed / elapsed,
+                "mean_pixel_diff": float(np.abs(image - baseline).mean()),
+                "psnr_db": psnr(image, baseline),
+            })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=4, help="multiplies layer count and width of the tiny models")
+    parser.add_argument("--steps", type=int, default=28)
+    parser.add_argument("--size", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=3, help="the fastest run counts")
+    parser.add_argument("--thresholds", default="0.05,0.1,0.2,0.4")
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.scale, args.steps, args.size, [float(t) for t in args.thresholds.split(",")], args.repeat, args.device)
+
+    print(f"{'model':>6} {'threshold':>9} {'steps run':>10} {'render ms':>10} {'speedup':>8} {'mean diff':>10} {'PSNR dB':>8}")
+    for r in results:
+        print(
+            f"{r['model']:>6} {r['threshold']:>9.2f} {r['steps_run']:>5}/{r['steps']:<4} {r['render_ms']:>10.1f} "
+            f"{r['speedup']:>7.2f}x {r['mean_pixel_diff']:>10.3f} {r['psnr_db']:>8.1f}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "step_cache", "device": args.device, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
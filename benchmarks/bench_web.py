@@ -0,0 +1,153 @@
+# Latency and throughput of the web tier at increasing concurrency, with the
+# app running in-process on a FakeBackend.
+#
+#   python -m benchmarks.bench_web [--concurrency 1,8,32,128] [--requests 400] [--latency 0.05] [--json web.json]
+#
+# Scenarios:
+#   models     GET /models
+#   start-job  POST /start-job, a new prompt every time
+#   result     GET /result/<id> for jobs that have finished
+#   round-trip POST /start-job, then GET /result/<id>?wait until the image comes back
+#
+# Every concurrent client is its own subject, and the scheduler is sized so
+# nothing is queued or turned away: this measures the web tier, not
+# admission control (see sim_scheduler for that).
+
+import argparse
+import asyncio
+import itertools
+import json
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+
+from backend import FakeBackend
+from benchmarks.sim_scheduler import AllowAll, percentile
+from ledger import scratch_ledger
+from model_registry import MODELS, capacities, model_list
+from object_store import LocalObjectStore
+from result_cache import DiskResultCache
+from scheduler import FairScheduler
+from web import create_web_app
+
+MODEL_ID = "flux"
+SCENARIOS = ("models", "start-job", "result", "round-trip")
+
+
+def make_app(latency: float):
+    unlimited = {name: 10**6 for name in capacities()}
+    scheduler = FairScheduler(unlimited, {model_id: 10**6 for model_id in MODELS}, max_queued_per_subject=10**6)
+    return create_web_app(
+        FakeBackend(latency=latency),
+        AllowAll(),
+        MODELS,
+        model_list(),
+        "images",
+        DiskResultCache(tempfile.mkdtemp(), 10**9),
+        scheduler,
+        scratch_ledger(),
+        LocalObjectStore(tempfile.mkdtemp()),
+        b"bench",
+    )
+
+
+async def load(clients: list, call, total: int) -> dict:
+    # `total` calls spread over one worker per client
+    counter = itertools.count()
+    latencies = []
+    statuses = Counter()
+
+    async def worker(client):
+        while (i := next(counter)) < total:
+            start = time.perf_counter()
+            status = await call(client, i)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(client) for client in clients))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests": len(latencies),
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "throughput_rps": len(latencies) / elapsed,
+        "statuses": {str(status): count for status, count in statuses.items()},
+    }
+
+
+async def scenario(app, name: str, concurrency: int, total: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    clients = [
+        httpx.AsyncClient(transport=transport, base_url="http://bench", headers={"Authorization": f"Bearer bench-{i}"}, timeout=None)
+        for i in range(concurrency)
+    ]
+    run = f"{name}-{concurrency}-{time.monotonic()}"  # fresh prompts, so nothing comes from the result cache
+
+    async def start_job(client, i: int) -> httpx.Response:
+        return await client.post("/start-job", json={"prompt": f"{run} {i}", "model_id": MODEL_ID})
+
+    try:
+        if name == "models":
+            async def call(client, i):
+                return (await client.get("/models")).status_code
+
+        elif name == "start-job":
+            async def call(client, i):
+                return (await start_job(client, i)).status_code
+
+        elif name == "result":
+            job_ids = [(await start_job(clients[0], i)).json()["job_id"] for i in range(min(total, 100))]
+            for job_id in job_ids:
+                await clients[0].get(f"/result/{job_id}", params={"wait": 30})
+
+            async def call(client, i):
+                return (await client.get(f"/result/{job_ids[i % len(job_ids)]}")).status_code
+
+        else:
+            async def call(client, i):
+                job_id = (await start_job(client, i)).json()["job_id"]
+                while (response := await client.get(f"/result/{job_id}", params={"wait": 30})).status_code == 202:
+                    pass
+                return response.status_code
+
+        return await load(clients, call, total)
+    finally:
+        for client in clients:
+            await client.aclose()
+
+
+async def run(concurrency: list, total: int, latency: float) -> list:
+    app = make_app(latency)
+    results = []
+    for name in SCENARIOS:
+        for c in concurrency:
+            results.append({"scenario": name, "concurrency": c, **await scenario(app, name, c, total)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", default="1,8,32,128")
+    parser.add_argument("--requests", type=int, default=400, help="per scenario and concurrency level")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per fake job")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    concurrency = [int(c) for c in args.concurrency.split(",")]
+    results = asyncio.run(run(concurrency, args.requests, args.latency))
+
+    print(f"{'scenario':>10} {'clients':>7} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>8}  statuses")
+    for r in results:
+        print(f"{r['scenario']:>10} {r['concurrency']:>7} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['throughput_rps']:>8.0f}  {r['statuses']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "web", "model_id": MODEL_ID, "fake_latency_s": args.latency, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
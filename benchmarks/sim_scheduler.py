@@ -0,0 +1,153 @@
+# Simulated load against the web app's scheduler: one heavy user keeping a
+# backlog of /start-job jobs queued, and several light users calling
+# /generate one image at a time, all on the same model.
+#
+#   python -m benchmarks.sim_scheduler [--light 4] [--capacity 2] [--duration 10] [--json sim.json]
+#
+# Runs the app in-process on a FakeBackend whose jobs take --latency
+# seconds, so the numbers are queueing behaviour, not GPU time. A light
+# user's latency above --latency is time spent waiting for a slot.
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+
+import httpx
+
+from backend import FakeBackend
+from ledger import scratch_ledger
+from model_registry import MODELS, class_for, model_list, queue_limits
+from object_store import LocalObjectStore
+from result_cache import DiskResultCache
+from scheduler import FairScheduler
+from web import create_web_app
+
+MODEL_ID = "flux"
+
+
+class AllowAll:
+    # the bearer token is the subject
+    async def verify(self, token: str) -> dict:
+        return {"sub": token}
+
+
+def percentile(values: list, q: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def heavy_user(client, stats: dict, deadline: float, workers: int):
+    # keeps `workers` jobs in flight, backing off by Retry-After when refused
+    async def worker(n: int):
+        i = 0
+        while time.monotonic() < deadline:
+            start = time.monotonic()
+            r = await client.post("/start-job", json={"prompt": f"heavy {n} {i}", "model_id": MODEL_ID})
+            i += 1
+            if r.status_code == 429:
+                stats["rejected"] += 1
+                await asyncio.sleep(min(float(r.headers["retry-after"]), 1.0) / 10)
+                continue
+            job_id = r.json()["job_id"]
+            while (await client.get(f"/result/{job_id}", params={"wait": 5})).status_code != 200:
+                pass
+            stats["latencies"].append(time.monotonic() - start)
+
+    await asyncio.gather(*(worker(n) for n in range(workers)))
+
+
+async def light_user(client, name: str, stats: dict, deadline: float, think: float):
+    i = 0
+    while time.monotonic() < deadline:
+        start = time.monotonic()
+        r = await client.get("/generate", params={"prompt": f"{name} {i}", "model_id": MODEL_ID})
+        i += 1
+        if r.status_code == 429:
+            stats["rejected"] += 1
+            await asyncio.sleep(min(float(r.headers["retry-after"]), 1.0) / 10)
+            continue
+        r.raise_for_status()
+        stats["latencies"].append(time.monotonic() - start)
+        await asyncio.sleep(think)
+
+
+async def simulate(light: int, capacity: int, heavy_workers: int, latency: float, think: float, duration: float) -> dict:
+    class_name = class_for(MODEL_ID)
+    scheduler = FairScheduler({class_name: capacity}, queue_limits(), service_time=latency)
+    app = create_web_app(
+        FakeBackend(latency=latency),
+        AllowAll(),
+        MODELS,
+        model_list(),
+        "images",
+        DiskResultCache(tempfile.mkdtemp(), 10**8),
+        scheduler,
+        scratch_ledger(),
+        LocalObjectStore(tempfile.mkdtemp()),
+        b"bench",
+    )
+
+    users = {"heavy": {"latencies": [], "rejected": 0}}
+    users.update({f"light-{i}": {"latencies": [], "rejected": 0} for i in range(light)})
+    deadline = time.monotonic() + duration
+
+    transport = httpx.ASGITransport(app=app)
+    clients = {name: httpx.AsyncClient(transport=transport, base_url="http://sim", headers={"Authorization": f"Bearer {name}"}, timeout=None) for name in users}
+    try:
+        await asyncio.gather(
+            heavy_user(clients["heavy"], users["heavy"], deadline, heavy_workers),
+            *(light_user(clients[name], name, users[name], deadline, think) for name in users if name != "heavy"),
+        )
+    finally:
+        for client in clients.values():
+            await client.aclose()
+
+    results = {}
+    for name, stats in users.items():
+        latencies = stats["latencies"]
+        results[name] = {
+            "completed": len(latencies),
+            "rejected": stats["rejected"],
+            "latency_p50_s": percentile(latencies, 0.5),
+            "latency_p95_s": percentile(latencies, 0.95),
+        }
+
+    # Jain's index over each user's share of the completed work: 1.0 when
+    # everyone got the same number of images, 1/n when one user got them all
+    shares = [r["completed"] for r in results.values()]
+    fairness = sum(shares) ** 2 / (len(shares) * sum(s * s for s in shares)) if any(shares) else None
+
+    return {"users": results, "fairness": fairness, "scheduler": scheduler.stats()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--light", type=int, default=4, help="light users")
+    parser.add_argument("--capacity", type=int, default=2, help="concurrent jobs the generator class runs")
+    parser.add_argument("--heavy-workers", type=int, default=16, help="jobs the heavy user keeps in flight")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per fake job")
+    parser.add_argument("--think", type=float, default=0.05, help="light users' pause between images")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    result = asyncio.run(simulate(args.light, args.capacity, args.heavy_workers, args.latency, args.think, args.duration))
+
+    print(f"{'user':>8} {'done':>5} {'429s':>5} {'p50 s':>7} {'p95 s':>7}")
+    for name, r in result["users"].items():
+        p50 = f"{r['latency_p50_s']:.2f}" if r["latency_p50_s"] is not None else "-"
+        p95 = f"{r['latency_p95_s']:.2f}" if r["latency_p95_s"] is not None else "-"
+        print(f"{name:>8} {r['completed']:>5} {r['rejected']:>5} {p50:>7} {p95:>7}")
+    print(f"fairness (Jain): {result['fairness']:.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "scheduler", "args": vars(args), **result}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# Random-weight pipelines with the same component layout as the models the
+# generators serve, small enough to build, load and run on a laptop CPU.
+# Tokenizers are built in memory so nothing is fetched from the Hub.
+
+import torch
+from tokenizers import Tokenizer, models, pre_tokenizers
+from transformers import (
+    CLIPTextConfig,
+    CLIPTextModel,
+    CLIPTextModelWithProjection,
+    PreTrainedTokenizerFast,
+    T5Config,
+    T5EncoderModel,
+)
+from diffusers import (
+    AutoencoderKL,
+    EulerDiscreteScheduler,
+    FlowMatchEulerDiscreteScheduler,
+    FluxPipeline,
+    FluxTransformer2DModel,
+    SD3Transformer2DModel,
+    StableDiffusion3Pipeline,
+    StableDiffusionXLPipeline,
+    UNet2DConditionModel,
+)
+
+WORDS = "a an the of in on with cat dog racoon priest robe cute portrait city night forest castle painting photo".split()
+
+
+def tokenizer(max_length: int):
+    vocab = {"<pad>": 0, "<unk>": 1, "</s>": 2, **{word: i + 3 for i, word in enumerate(WORDS)}}
+    tok = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    tok.pre_tokenizer = pre_tokenizers.Whitespace()
+    return PreTrainedTokenizerFast(
+        tokenizer_object=tok,
+        pad_token="<pad>",
+        unk_token="<unk>",
+        eos_token="</s>",
+        model_max_length=max_length,
+    )
+
+
+def clip(hidden_size: int, with_projection: bool = False, projection_dim: int = 32):
+    config = CLIPTextConfig(
+        hidden_size=hidden_size,
+        intermediate_size=hidden_size * 2,
+        num_attention_heads=4,
+        num_hidden_layers=2,
+        vocab_size=1000,
+        projection_dim=projection_dim,
+        max_position_embeddings=77,
+        bos_token_id=0,
+        eos_token_id=2,
+        pad_token_id=0,
+    )
+    return CLIPTextModelWithProjection(config) if with_projection else CLIPTextModel(config)
+
+
+def t5(d_model: int):
+    return T5EncoderModel(T5Config(d_model=d_model, d_kv=8, d_ff=d_model * 2, num_layers=2, num_heads=4, vocab_size=1000))
+
+
+def tiny_flux(scale: int = 1):
+    torch.manual_seed(0)
+    transformer = FluxTransformer2DModel(
+        patch_size=1,
+        in_channels=4,
+        num_layers=scale,
+        num_single_layers=scale,
+        attention_head_dim=16,
+        num_attention_heads=2 * scale,
+        joint_attention_dim=32,
+        pooled_projection_dim=32,
+        axes_dims_rope=[4, 4, 8],
+    )
+    vae = AutoencoderKL(
+        in_channels=3,
+        out_channels=3,
+        block_out_channels=(16, 32),
+        down_block_types=("DownEncoderBlock2D",) * 2,
+        up_block_types=("UpDecoderBlock2D",) * 2,
+        layers_per_block=1,
+        latent_channels=1,
+        norm_num_groups=8,
+        use_quant_conv=False,
+        use_post_quant_conv=False,
+        shift_factor=0.0609,
+        scaling_factor=1.5035,
+    )
+    return FluxPipeline(
+        scheduler=FlowMatchEulerDiscreteScheduler(),
+        text_encoder=clip(32),
+        tokenizer=tokenizer(77),
+        text_encoder_2=t5(32),
+        tokenizer_2=tokenizer(64),
+        transformer=transformer,
+        vae=vae,
+    )
+
+
+def tiny_sdxl(scale: int = 1):
+    torch.manual_seed(0)
+    unet = UNet2DConditionModel(
+        block_out_channels=(32 * scale, 64 * scale),
+        layers_per_block=2,
+        sample_size=32,
+        in_channels=4,
+        out_channels=4,
+        down_block_types=("DownBlock2D", "CrossAttnDownBlock2D"),
+        up_block_types=("CrossAttnUpBlock2D", "UpBlock2D"),
+        attention_head_dim=(2, 4),
+        use_linear_projection=True,
+        addition_embed_type="text_time",
+        addition_time_embed_dim=8,
+        transformer_layers_per_block=(1, 2),
+        projection_class_embeddings_input_dim=80,  # 6 * 8 time ids + 32 pooled
+        cross_attention_dim=64,  # both text encoders' hidden states side by side
+        norm_num_groups=1,
+    )
+    vae = AutoencoderKL(
+        in_channels=3,
+        out_channels=3,
+        block_out_channels=(16, 32),
+        down_block_types=("DownEncoderBlock2D",) * 2,
+        up_block_types=("UpDecoderBlock2D",) * 2,
+        layers_per_block=1,
+        latent_channels=4,
+        norm_num_groups=8,
+    )
+    return StableDiffusionXLPipeline(
+        vae=vae,
+        text_encoder=clip(32),
+        text_encoder_2=clip(32, with_projection=True),
+        tokenizer=tokenizer(77),
+        tokenizer_2=tokenizer(77),
+        unet=unet,
+        scheduler=EulerDiscreteScheduler(),
+    )
+
+
+def tiny_sd3(scale: int = 1):
+    torch.manual_seed(0)
+    transformer = SD3Transformer2DModel(
+        sample_size=32,
+        patch_size=1,
+        in_channels=4,
+        num_layers=scale,
+        attention_head_dim=8,
+        num_attention_heads=4 * scale,
+        caption_projection_dim=32 * scale,
+        joint_attention_dim=32,
+        pooled_projection_dim=64,  # both CLIP projections side by side
+        out_channels=4,
+    )
+    vae = AutoencoderKL(
+        in_channels=3,
+        out_channels=3,
+        block_out_channels=(16, 32),
+        down_block_types=("DownEncoderBlock2D",) * 2,
+        up_block_types=("UpDecoderBlock2D",) * 2,
+        layers_per_block=1,
+        latent_channels=4,
+        norm_num_groups=8,
+        use_quant_conv=False,
+        use_post_quant_conv=False,
+        shift_factor=0.0609,
+        scaling_factor=1.5035,
+    )
+    return StableDiffusion3Pipeline(
+        transformer=transformer,
+        scheduler=FlowMatchEulerDiscreteScheduler(),
+        vae=vae,
+        text_encoder=clip(32, with_projection=True),
+        tokenizer=tokenizer(77),
+        text_encoder_2=clip(32, with_projection=True),
+        tokenizer_2=tokenizer(77),
+        text_encoder_3=t5(32),
+        tokenizer_3=tokenizer(64),
+    )
+
+
+TINY_PIPELINES = {
+    "flux": tiny_flux,
+    "sdxl": tiny_sdxl,
+    "sd3": tiny_sd3,
+}
@@ -0,0 +1,78 @@
+import gzip
+import hashlib
+import json
+import os
+from io import BytesIO
+
+from PIL import Image
+
+# long enough that browsers never revalidate; icon names change with their content
+ICON_CACHE_CONTROL = "public, max-age=31536000, immutable"
+THUMBNAIL_SIZE = (256, 256)
+
+
+def make_thumbnail(data: bytes, size=THUMBNAIL_SIZE) -> bytes:
+    image = Image.open(BytesIO(data))
+    image.thumbnail(size)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+
+    buf = BytesIO()
+    image.save(buf, format="WEBP", quality=80, method=6)
+    return buf.getvalue()
+
+
+def etag_matches(if_none_match: str | None, etags) -> bool:
+    if not if_none_match:
+        return False
+
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    return "*" in candidates or any(etag in candidates for etag in etags)
+
+
+class Catalogue:
+    # The /models response, rendered once: a JSON body (plain and gzipped, each
+    # with its own strong ETag) plus downscaled icons addressed by content hash.
+
+    def __init__(self, models: list, icons: dict):
+        self.models = models
+        self.icons = icons
+
+        self.body = json.dumps(models, separators=(",", ":")).encode("utf-8")
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gz"'
+
+    def representation(self, accept_encoding: str | None):
+        # -> (body, etag, content-encoding or None)
+        if accept_encoding and "gzip" in accept_encoding.lower():
+            return self.gzip_body, self.gzip_etag, "gzip"
+        return self.body, self.etag, None
+
+
+def build_catalogue(model_list: list, asset_dir: str, icon_route: str = "icons") -> Catalogue:
+    models = []
+    icons = {}
+
+    for model in model_list:
+        entry = {k: v for k, v in model.items() if k != "icon_url"}
+        entry["icon_url"] = None
+
+        image_path = os.path.join(asset_dir, model["icon_url"].lstrip("/"))
+        try:
+            with open(image_path, "rb") as f:
+                thumbnail = make_thumbnail(f.read())
+        except FileNotFoundError:
+            thumbnail = None
+
+        if thumbnail is not None:
+            stem = os.path.splitext(os.path.basename(image_path))[0]
+            name = f"{stem}.{hashlib.sha256(thumbnail).hexdigest()[:12]}.webp"
+            icons[name] = thumbnail
+            entry["icon_url"] = f"{icon_route}/{name}"
+
+        models.append(entry)
+
+    return Catalogue(models, icons)
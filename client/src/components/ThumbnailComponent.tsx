@@ -29,13 +29,23 @@ export const ThumbnailComponent : React.FC<ThumbnailComponentProps> = ({thumb, i
         overflow: "hidden",
       }}
     >
+      {thumb.url && (
+        <img
+          src={thumb.url}
+          alt={`Preview ${index + 1}`}
+          style={{ position: "absolute", width: "100%", height: "100%", objectFit: "cover", opacity: 0.6 }}
+        />
+      )}
       <Box 
         display="flex"
         justifyContent="center"
         alignItems="center"
         height="100%"
+        position="relative"
       >
-        <CircularProgress size={40} />
+        {thumb.progress !== undefined
+          ? <CircularProgress size={40} variant="determinate" value={thumb.progress * 100} />
+          : <CircularProgress size={40} />}
       </Box>          
     </Box> 
     )
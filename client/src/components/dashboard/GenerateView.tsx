@@ -1,6 +1,6 @@
 import { useAuth0 } from "@auth0/auth0-react";
 import { Box, Button, CircularProgress, IconButton, Modal, TextField, Typography } from "@mui/material";
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import { useTypedSelector } from "../../store/hooks";
 import type { Thumbnail } from "../../types/Thumbnail";
 import CloseIcon from "@mui/icons-material/Close";
@@ -37,9 +37,8 @@ export const GenerateView : React.FC = () => {
   const defaultPrompt = (location.state as GenerateViewState)?.prompt || ""; // Accessing state data
   const [prompt, setPrompt] = useState(defaultPrompt);
   const [imageSettings, setImageSettings] = useState<ImageSettings>(DEFAULT_SETTINGS);
-  const [callId, setCallId] = useState<string | null>(null);
-  const [token, setToken] = useState<string | null>(null);
-  const [lastThumbnail, setLastThumbnail] = useState<Thumbnail | null>(null);
+  const [, setToken] = useState<string | null>(null);
+  const streamController = useRef<AbortController | null>(null);
   const [numberImages, setNumberImages] = useState("1");
   const [cost, setCost] = useState<number>(0);
   
@@ -49,54 +48,10 @@ export const GenerateView : React.FC = () => {
 
   }, [numberImages])
 
+  // abort any stream still running when the view goes away
   useEffect(() => {
-    if (!callId || !token) return;
-
-    const pollInterval = setInterval(async () => {
-      try {
-
-        const response = await fetch(
-          `${import.meta.env.VITE_BASE_URL}result/${callId}`, 
-          {
-            headers: {
-              Authorization: `Bearer ${token}`,
-            }
-          }          
-        );
-
-        if (response.status === 202) {
-          return;
-        }
-
-        if (response.ok) {
-          const blob = await response.blob();
-
-          const url = URL.createObjectURL(blob);
-
-          if(lastThumbnail) {
-            updateThumbnail({ ...lastThumbnail, url, loading: false});          
-          }
-
-          clearInterval(pollInterval);
-          setCallId(null);
-        } else {
-          throw new Error("Failed to get results");
-        }
-      } catch (error) {
-
-        console.error("Error polling results:", error);
-
-        if(lastThumbnail) {
-          updateThumbnail({ ...lastThumbnail, loading: false, hasError: true});          
-        }
-
-        clearInterval(pollInterval);
-        setCallId(null);
-      }
-    }, 1000);
-
-    return () => clearInterval(pollInterval);
-  }, [callId, token]);  
+    return () => streamController.current?.abort();
+  }, []);
 
   const getAccessToken = async (): Promise<string | null> => {
     try {
@@ -182,25 +137,40 @@ export const GenerateView : React.FC = () => {
 
     console.log(`we will be outputing ${numberImages} images`);
 
-    setLastThumbnail({
+    const thumbnail: Thumbnail = {
       url: "",
       prompt,
       model: model_id,
-      loading: false,
+      loading: true,
       settings: {
         ...imageSettings
       },
       hasError: false,
-    });
+    };
+
+    streamController.current?.abort();
+    const controller = new AbortController();
+    streamController.current = controller;
     
     try {
-      const result = await imageService.generateImageAsync(accessToken, { prompt: fullPrompt, model_id: model_id, width: 512, height: 512})
-      setCallId(result);
+      const url = await imageService.generateImageStream(
+        accessToken,
+        { prompt: fullPrompt, model_id: model_id, width: 512, height: 512 },
+        {
+          signal: controller.signal,
+          onProgress: ({ step, steps, preview }) => {
+            updateThumbnail({ ...thumbnail, url: preview ?? thumbnail.url, progress: step / steps });
+            if (preview) thumbnail.url = preview;
+          },
+        }
+      );
+
+      updateThumbnail({ ...thumbnail, url, loading: false });
     }
     catch (e) {
 
-      if(lastThumbnail) {
-        updateThumbnail({...lastThumbnail, loading: false, hasError: true})
+      if (!controller.signal.aborted) {
+        updateThumbnail({ ...thumbnail, loading: false, hasError: true });
       }
 
       console.error(e);
@@ -94,7 +94,7 @@ return (
         
       }}>
         
-        <img src={model.image_data} width={"100%"} height={"auto"} style={{borderRadius: "5px", cursor: "pointer"}} onClick={() => onModelClick(model)} />
+        <img src={model.icon_url ?? ""} width={"100%"} height={"auto"} style={{borderRadius: "5px", cursor: "pointer"}} onClick={() => onModelClick(model)} />
         <Box sx={{textAlign: "center"}} >
         <Typography sx={{fontWeight: "800", fontSize: "18px"}}>{model.name}</Typography>
         <Typography sx={{fontWeight: "300", fontSize: "12px"}}>{model.description}</Typography>
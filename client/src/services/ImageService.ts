@@ -12,6 +12,17 @@ export type ImageGenerationOptions = {
   /* TODO: add other parameters here */
 }
 
+export type GenerationProgress = {
+  step: number;
+  steps: number;
+  preview: string | null;
+}
+
+export type GenerationStreamHandlers = {
+  onProgress?: (progress: GenerationProgress) => void;
+  signal?: AbortSignal;
+}
+
 export class ImageService {
 
   public async generateImage(accessToken: string, options: ImageGenerationOptions): Promise<Blob>  {
@@ -62,4 +73,101 @@ export class ImageService {
       return result.job_id;
     }
 
+  // Stops a job from /start-job: dropped if it is still queued, otherwise the
+  // GPU stops it at its next step. keepalive lets the request outlive the page.
+  public async cancelJob(accessToken: string, jobId: string): Promise<void>  {
+
+      await fetch(`${VITE_BASE_URL}jobs/${jobId}/cancel`, {
+        method: 'POST',
+        headers: {
+          'Authorization': `Bearer ${accessToken}`,
+        },
+        keepalive: true,
+      });
+    }
+
+  // Long-polls /result until the job's first image is ready. Aborting `signal`,
+  // e.g. when the view that started the job goes away, also cancels the job.
+  public async waitForJob(accessToken: string, jobId: string, signal?: AbortSignal): Promise<Blob>  {
+
+      const onAbort = () => { this.cancelJob(accessToken, jobId).catch(console.error); };
+      signal?.addEventListener("abort", onAbort, { once: true });
+
+      try {
+        for (;;) {
+          const resultResponse = await fetch(`${VITE_BASE_URL}result/${jobId}?wait=25`, {
+            headers: {
+              Authorization: `Bearer ${accessToken}`,
+            },
+            signal,
+          });
+
+          if (resultResponse.status === 200)
+            return await resultResponse.blob();
+          if (resultResponse.status !== 202)
+            throw new Error(`Failed to fetch job with a status of ${resultResponse.status}`)
+        }
+      } finally {
+        signal?.removeEventListener("abort", onAbort);
+      }
+    }
+
+  // Streams server-sent events from /generate-stream: per-step progress with
+  // occasional low resolution previews, then a short-lived URL of the final image.
+  // Aborting `signal` closes the stream, which also stops the job on the GPU.
+  public async generateImageStream(accessToken: string, options: ImageGenerationOptions, handlers: GenerationStreamHandlers = {}): Promise<string>  {
+
+      const modelUrl = `${VITE_BASE_URL}generate-stream`;
+
+      const generateResponse = await fetch(modelUrl, {
+        method: 'POST',
+        headers: {
+          'Authorization': `Bearer ${accessToken}`,
+          'Content-Type': 'application/json',
+          'Accept': 'text/event-stream',
+        },
+        body: JSON.stringify(options),
+        signal: handlers.signal,
+      });
+
+      if (generateResponse.status !== 200 || !generateResponse.body)
+        throw new Error(`Failed to stream image with a status of ${generateResponse.status}`)
+
+      const reader = generateResponse.body.pipeThrough(new TextDecoderStream()).getReader();
+      let buffer = "";
+
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += value;
+
+        let boundary;
+        while ((boundary = buffer.indexOf("\n\n")) >= 0) {
+          const message = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+
+          let event = "message";
+          let data = "";
+          for (const line of message.split("\n")) {
+            if (line.startsWith("event:")) event = line.slice(6).trim();
+            else if (line.startsWith("data:")) data += line.slice(5).trim();
+          }
+
+          const payload = JSON.parse(data);
+          if (event === "progress") {
+            handlers.onProgress?.(payload);
+          } else if (event === "result") {
+            reader.cancel();
+            return payload.image;
+          } else if (event === "cancelled") {
+            reader.cancel();
+            throw new Error("The job was cancelled");
+          }
+        }
+      }
+
+      throw new Error("Stream ended before the image arrived");
+    }
+
 }
@@ -12,13 +12,17 @@ export class ModelsService {
         headers: {
           Authorization: `Bearer ${accessToken}`,
         },
-        cache: "no-store"
+        cache: "no-cache" // revalidate with the ETag instead of refetching the catalogue
       });
 
-      const jsonResponse = await modelsResponse.json();
+      const jsonResponse: AIModel[] = await modelsResponse.json();
 
       console.log('jsonResponse ', jsonResponse);
 
-      return jsonResponse;
+      // icons are served from the API by relative path
+      return jsonResponse.map((model) => ({
+        ...model,
+        icon_url: model.icon_url ? VITE_BASE_URL + model.icon_url : null,
+      }));
     }
 }
@@ -1,6 +1,6 @@
 export interface AIModel  {
   id: string;
-  image_data: string;
+  icon_url: string | null;
   name: string;
   description: string;
   trigger_word: string;
@@ -5,6 +5,7 @@ export interface Thumbnail {
   prompt: string;
   model: string;
   loading: boolean;
+  progress?: number;
   settings: ImageSettings;
   hasError: boolean;
 }
\ No newline at end of file
@@ -0,0 +1,92 @@
+import os
+import time
+
+import torch
+import torch._dynamo
+import torch._inductor.config
+
+from step_cache import compile_blocks
+
+# graphs compiled per denoiser before dynamo gives up and runs eagerly; every
+# bucket, batch size and LoRA style (and LoRA disabled) is a graph of its
+# own, 70 for FLUX's four styles and base model at seven buckets and two
+# batch sizes
+CACHE_SIZE_LIMIT = 128
+
+
+def compile_cache_dir(root: str, base: str) -> str:
+    # compiled kernels only fit the torch build and GPU that made them
+    device = torch.cuda.get_device_name().replace(" ", "-") if torch.cuda.is_available() else "cpu"
+    return os.path.join(root, base, f"torch-{torch.__version__}-{device}")
+
+
+def _has_adapters(pipe) -> bool:
+    return any(getattr(c, "peft_config", None) for c in pipe.components.values())
+
+
+def optimize_pipeline(pipe, compile_dir: str, mode: str = "max-autotune-no-cudagraphs") -> dict:
+    # Puts the pipeline in its fastest form: fused attention projections,
+    # channels-last convolutions, and the denoiser and VAE decoder compiled
+    # by inductor with its caches in compile_dir, so a container that starts
+    # after another has warmed up loads kernels instead of building them.
+    # Compilation itself happens on the first call per shape (see warm_up).
+    # -> what was applied
+    os.makedirs(compile_dir, exist_ok=True)
+    os.environ["TORCHINDUCTOR_CACHE_DIR"] = compile_dir
+    torch._inductor.config.fx_graph_cache = True
+    torch._dynamo.config.cache_size_limit = max(torch._dynamo.config.cache_size_limit, CACHE_SIZE_LIMIT)
+
+    applied = {"attention": "sdpa"}
+    if torch.cuda.is_available():
+        # buckets keep shapes fixed, so the autotuned choices stay valid
+        torch.backends.cudnn.benchmark = True
+        torch.backends.cuda.matmul.allow_tf32 = True
+
+    # fused q/k/v projections can't carry LoRA adapters
+    if hasattr(pipe, "fuse_qkv_projections") and not _has_adapters(pipe):
+        pipe.fuse_qkv_projections()
+        applied["fused_qkv"] = True
+
+    denoiser = getattr(pipe, "transformer", None) or pipe.unet
+    if denoiser is getattr(pipe, "unet", None):
+        denoiser.to(memory_format=torch.channels_last)
+        applied["channels_last"] = True
+    pipe.vae.to(memory_format=torch.channels_last)
+
+    # compiled in place, so the pipeline, LoRA loading and residency code keep
+    # working on the same module objects. With the step cache, block by
+    # block, so its per-step skip decisions stay outside the graphs.
+    if getattr(denoiser, "step_cache", None) is not None:
+        compile_blocks(denoiser, mode=mode, fullgraph=False, dynamic=False)
+        applied["compiled"] = [f"{type(denoiser).__name__} blocks", "vae.decoder"]
+    else:
+        denoiser.compile(mode=mode, fullgraph=False, dynamic=False)
+        applied["compiled"] = [type(denoiser).__name__, "vae.decoder"]
+    pipe.vae.decoder.compile(mode=mode, fullgraph=False, dynamic=False)
+    applied["mode"] = mode
+    return applied
+
+
+def warm_up(pipe, buckets, batch_sizes=(1,), steps: int = 2, repeat: int = 1, **pipeline_args) -> dict:
+    # Runs every (width, height) bucket at every batch size once, then
+    # `repeat` more times.
+    # -> "WxH@B" -> {"first_s": the first call, compiling if needed, "steady_s": the fastest after it}
+    report = {}
+    for width, height in buckets:
+        for batch_size in batch_sizes:
+            timings = []
+            for _ in range(1 + repeat):
+                start = time.perf_counter()
+                pipe(
+                    prompt=["warm-up"] * batch_size,
+                    width=width,
+                    height=height,
+                    num_inference_steps=steps,
+                    output_type="pil",
+                    **pipeline_args,
+                )
+                if torch.cuda.is_available():
+                    torch.cuda.synchronize()
+                timings.append(time.perf_counter() - start)
+            report[f"{width}x{height}@{batch_size}"] = {"first_s": timings[0], "steady_s": min(timings[1:]) if repeat else None}
+    return report
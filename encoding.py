@@ -0,0 +1,80 @@
+from io import BytesIO
+
+from PIL import Image, features
+
+# format -> (PIL format name, media type, default quality, extra save options)
+FORMATS = {
+    "png": ("PNG", "image/png", None, {"compress_level": 1}),
+    "webp": ("WEBP", "image/webp", 90, {"method": 4}),
+    "jpeg": ("JPEG", "image/jpeg", 90, {"optimize": False}),
+    "avif": ("AVIF", "image/avif", 70, {"speed": 8}),
+}
+
+DEFAULT_FORMAT = "webp"
+
+# preference order when the client only tells us what it accepts
+ACCEPT_PREFERENCE = ("avif", "webp", "jpeg", "png")
+
+
+def negotiate_format(requested: str | None, accept: str | None) -> str:
+    # An explicit format wins; otherwise pick the best image type the Accept
+    # header lists, falling back to DEFAULT_FORMAT for */* and the like.
+    if requested:
+        requested = requested.lower().replace("jpg", "jpeg")
+        if requested not in FORMATS:
+            raise ValueError(f"Unsupported format: {requested}")
+        return requested
+
+    accepted = set()
+    for part in (accept or "").split(","):
+        media_type, *params = [p.strip() for p in part.split(";")]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(media_type.lower())
+
+    for fmt in ACCEPT_PREFERENCE:
+        if FORMATS[fmt][1] in accepted:
+            return fmt
+    return DEFAULT_FORMAT
+
+
+def encode_image(image, fmt: str = DEFAULT_FORMAT, quality: int | None = None) -> bytes:
+    if fmt == "avif" and not features.check("avif"):
+        fmt = "webp"
+
+    pil_format, _, default_quality, options = FORMATS[fmt]
+    if fmt == "jpeg" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    buf = BytesIO()
+    if default_quality is not None:
+        options = {**options, "quality": quality or default_quality}
+    image.save(buf, format=pil_format, **options)
+    # getvalue() hands over BytesIO's own buffer when nothing else references it
+    return buf.getvalue()
+
+
+def transcode(data: bytes, fmt: str = DEFAULT_FORMAT, quality: int | None = None) -> bytes:
+    # an encoded image, re-encoded as `fmt`
+    with Image.open(BytesIO(data)) as image:
+        image.load()
+        return encode_image(image, fmt, quality)
+
+
+def sniff_media_type(data: bytes) -> str:
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[4:8] == b"ftyp" and data[8:12] in (b"avif", b"avis"):
+        return "image/avif"
+    return "application/octet-stream"
@@ -0,0 +1,228 @@
+import asyncio
+import tempfile
+import time
+
+from sqlalchemy import JSON, Column, Float, Index, String, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import declarative_base
+
+# how long changes are gathered before they are written, and the most rows
+# written per statement
+FLUSH_INTERVAL = 0.25
+MAX_BATCH = 500
+
+# states a job can be in; only the last three are final
+STATES = ("queued", "running", "done", "failed", "cancelled")
+FINAL_STATES = ("done", "failed", "cancelled")
+
+LedgerBase = declarative_base()
+
+
+class Job(LedgerBase):
+    __tablename__ = "image_job"
+
+    id = Column(String, primary_key=True)
+    subject = Column(String, nullable=False)
+    model_id = Column(String, nullable=False)
+    params = Column(JSON, nullable=False)  # result_cache.normalize_request of the request
+    priority = Column(String, nullable=False)
+    state = Column(String, nullable=False)
+    created_at = Column(Float, nullable=False)  # unix time of each transition
+    started_at = Column(Float)
+    finished_at = Column(Float)
+    timings = Column(JSON)  # stage -> seconds, see timing.py
+    seeds = Column(JSON)  # the seed of each image, in order
+    objects = Column(JSON)  # object store key of each image, see object_store.py
+    result_key = Column(String)  # the request's entry in the result cache
+    error = Column(String)
+
+    __table_args__ = (Index("ix_image_job_subject_created", "subject", "created_at"),)
+
+
+COLUMNS = [column.name for column in Job.__table__.columns]
+
+
+class JobLedger:
+    # Every job the web tier runs, with its transitions, written behind:
+    # queued()/running()/finished()/failed() only change the in-memory
+    # record, and a background task upserts the changed records in batches.
+    # Records stay in memory until they reach a final state and are written,
+    # so reads of live jobs never wait on the database, and a finished job
+    # is read from the table by primary key (status) or by subject and
+    # creation time (history).
+
+    def __init__(self, engine, flush_interval: float = FLUSH_INTERVAL, max_batch: int = MAX_BATCH):
+        self.engine = engine
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.flushes = 0
+        self.rows_written = 0
+        self.write_errors = 0
+
+        self._records = {}  # job id -> record, until it is final and written
+        self._dirty = set()
+        self._changed = None  # asyncio.Event, created on the loop that uses it
+        self._flusher = None
+        self._created = False
+        self._create_lock = None
+
+    # --- writes ---
+
+    def _record(self, job_id: str, **fields):
+        record = self._records.get(job_id)
+        if record is None:
+            return
+        record.update(fields)
+        self._dirty.add(job_id)
+
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        self._changed.set()
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._run())
+
+    def queued(self, job_id: str, subject: str, model_id: str, params: dict, priority: str, result_key: str | None = None):
+        self._records[job_id] = {column: None for column in COLUMNS}
+        self._record(
+            job_id,
+            id=job_id,
+            subject=subject,
+            model_id=model_id,
+            params=params,
+            priority=priority,
+            state="queued",
+            created_at=time.time(),
+            result_key=result_key,
+        )
+
+    def running(self, job_id: str):
+        self._record(job_id, state="running", started_at=time.time())
+
+    def finished(self, job_id: str, timings: dict, seeds: list | None = None, objects: list | None = None):
+        self._record(job_id, state="done", finished_at=time.time(), timings=timings, seeds=seeds, objects=objects)
+
+    def reassign(self, job_id: str, subject: str):
+        # the job now belongs to `subject`, whose identical request shares it
+        self._record(job_id, subject=subject)
+
+    def failed(self, job_id: str, error: str, state: str = "failed"):
+        record = self._records.get(job_id)
+        if record is not None and record["state"] in FINAL_STATES:
+            return
+        self._record(job_id, state=state, finished_at=time.time(), error=error)
+
+    async def _run(self):
+        while True:
+            await self._changed.wait()
+            # let a batch of changes build up
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def _create_tables(self):
+        if self._created:
+            return
+        if self._create_lock is None:
+            self._create_lock = asyncio.Lock()
+        async with self._create_lock:
+            if not self._created:
+                async with self.engine.begin() as conn:
+                    await conn.run_sync(LedgerBase.metadata.create_all)
+                self._created = True
+
+    def _upsert(self):
+        insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}[self.engine.dialect.name]
+        statement = insert(Job.__table__)
+        return statement.on_conflict_do_update(
+            index_elements=["id"],
+            set_={column: statement.excluded[column] for column in COLUMNS if column != "id"},
+        )
+
+    async def flush(self):
+        # writes every changed record; on a database error they stay dirty
+        # and go out with the next flush
+        dirty, self._dirty = self._dirty, set()
+        if self._changed is not None:
+            self._changed.clear()
+        if not dirty:
+            return
+
+        rows = [dict(self._records[job_id]) for job_id in dirty]
+        try:
+            await self._create_tables()
+            async with self.engine.begin() as conn:
+                for i in range(0, len(rows), self.max_batch):
+                    await conn.execute(self._upsert(), rows[i:i + self.max_batch])
+        except asyncio.CancelledError:
+            self._dirty |= dirty
+            raise
+        except Exception as e:
+            print(f"Job ledger: writing {len(rows)} records failed, will retry: {e!r}")
+            self.write_errors += 1
+            self._dirty |= dirty
+            self._changed.set()
+            return
+
+        self.flushes += 1
+        self.rows_written += len(rows)
+        for row in rows:
+            job_id = row["id"]
+            # final, and not changed again while it was being written
+            if row["state"] in FINAL_STATES and job_id not in self._dirty:
+                self._records.pop(job_id, None)
+
+    async def close(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+
+    # --- reads ---
+
+    async def get_many(self, job_ids: list) -> dict:
+        # job id -> record, for the ids the ledger knows
+        found = {job_id: dict(self._records[job_id]) for job_id in job_ids if job_id in self._records}
+        missing = [job_id for job_id in job_ids if job_id not in found]
+        if missing:
+            await self._create_tables()
+            async with self.engine.connect() as conn:
+                result = await conn.execute(select(Job.__table__).where(Job.id.in_(missing)))
+                for row in result.mappings():
+                    found.setdefault(row["id"], dict(row))
+        return found
+
+    async def get(self, job_id: str) -> dict | None:
+        return (await self.get_many([job_id])).get(job_id)
+
+    async def history(self, subject: str, limit: int = 50, before: float | None = None) -> list:
+        # the subject's jobs, newest first, created before `before` if given
+        await self._create_tables()
+        query = select(Job.__table__).where(Job.subject == subject)
+        if before is not None:
+            query = query.where(Job.created_at < before)
+        query = query.order_by(Job.created_at.desc()).limit(limit)
+        async with self.engine.connect() as conn:
+            rows = {row["id"]: dict(row) for row in (await conn.execute(query)).mappings()}
+
+        # changes that are not written yet win
+        for job_id, record in self._records.items():
+            if record["subject"] == subject and (before is None or record["created_at"] < before):
+                rows[job_id] = dict(record)
+        return sorted(rows.values(), key=lambda r: r["created_at"], reverse=True)[:limit]
+
+    def stats(self) -> dict:
+        return {
+            "live": len(self._records),
+            "dirty": len(self._dirty),
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "write_errors": self.write_errors,
+        }
+
+
+def scratch_ledger(**options) -> JobLedger:
+    # a throwaway SQLite job ledger, for tests and benchmarks
+    return JobLedger(create_async_engine(f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/ledger.db"), **options)
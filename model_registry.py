@@ -1,11 +1,548 @@
-MODEL_REGISTRY = {
-    "flux": "FluxGenerator",
-    "sd3.5": "StableDiffusionGenerator",
-    "opendalle": "OpenDalleV1Generator",
-    "sdxl-turbo": "SDXLTurboGenerator",
-    "ghibli": "FluxGhibliArtGenerator",
-    "flux-aestehticanime": "AnimeArtGenerator",
-    "super-realism": "SuperRealismArtGenerator",
-    "iso": "Isometric3DGenerator",
-    "sdxl-base": "SDXLBaseGenerator",
-}
\ No newline at end of file
+# Everything about the served models in one place. prompt_forge.py builds a
+# Modal class per POOLS entry and per GENERATORS entry outside a pool,
+# preload_models.py its download manifest,
+# and the web tier its routing and the /models catalogue from MODELS.
+# validate() runs on import, so a bad edit fails the deploy instead of a
+# request.
+
+# GPU types a generator may ask for, with their memory in GiB
+GPUS = {
+    "A10G": 24,
+    "L4": 24,
+    "L40S": 48,
+    "A100": 40,
+    "A100-80GB": 80,
+    "H100": 80,
+}
+
+DTYPES = ("float16", "bfloat16", "float32")
+
+# pipelines whose transformer blocks step_cache.py can skip
+STEP_CACHE_PIPELINES = ("FluxPipeline", "StableDiffusion3Pipeline")
+
+# weight-only quantization of the transformer and T5 encoder (quantization.py)
+QUANTIZE_MODES = ("int8", "fp8")
+QUANTIZE_COMPONENTS = ("transformer", "T5EncoderModel")
+
+# (width, height) shapes compiled generators are warmed up on, and the only
+# sizes they render, so no request hits a shape that still has to compile
+# (other sizes are rejected rather than rendered at a bucket the caller
+# didn't ask for); streamed previews skip the compiled decoder (see
+# previews.py).
+RESOLUTION_BUCKETS = (
+    (512, 512),
+    (768, 768),
+    (1024, 1024),
+    (1152, 896),
+    (896, 1152),
+    (1344, 768),
+    (768, 1344),
+)
+
+# What the resolution planner (plan_resolution) knows about each pipeline:
+# the multiple its sides must be (VAE downscale times patch size), and rough
+# activation memory in GiB per megapixel per image at 16 bits, for the
+# denoiser (classifier-free guidance included) and for an untiled VAE decode.
+# Tiled decode holds one tile of TILE_MEGAPIXELS at a time; attention slicing
+# is only wired up for UNet pipelines, where it about halves the denoiser's.
+MEMORY_PROFILES = {
+    "FluxPipeline": {"multiple": 16, "denoise_gb": 1.0, "decode_gb": 2.5, "attention_slicing": False},
+    "StableDiffusion3Pipeline": {"multiple": 16, "denoise_gb": 1.0, "decode_gb": 2.5, "attention_slicing": False},
+    "AutoPipelineForText2Image": {"multiple": 8, "denoise_gb": 1.0, "decode_gb": 2.5, "attention_slicing": True},
+}
+TILE_MEGAPIXELS = 1.0
+ATTENTION_SLICING_FACTOR = 0.5
+
+# sides outside these are rejected, whatever memory says
+MIN_SIDE = 256
+MAX_SIDE = 4096
+
+# GiB of every GPU kept free for the CUDA context and allocator slack
+RESERVED_GB = 1.0
+
+# One Modal class each, keyed by class name. "base" is the snapshot's folder
+# under the weights volume's model cache; vram_gb is the resident weights
+# plus activations for a full batch at 1024x1024. Containers scale between
+# warm_containers and max_containers, each taking twice max_batch_size
+# concurrent inputs. "compile": True compiles the pipeline and warms it up
+# on RESOLUTION_BUCKETS when a container starts. "quantize" stores the
+# transformer and T5 weights in 8 bits (one of QUANTIZE_MODES), baked ahead
+# of time by bake_weights or else quantized while loading;
+# "quantize_components" narrows that to some of QUANTIZE_COMPONENTS, e.g. T5
+# alone for generators whose LoRA adapters attach to the transformer. "step_cache":
+# True lets requests skip redundant transformer steps (step_cache.py); with
+# "compile", the transformer is compiled block by block so the cache decides
+# between compiled blocks.
+GENERATORS = {
+    "SDXLTurboGenerator": {
+        "base": "sdxl-turbo",
+        "repo": "stabilityai/sdxl-turbo",
+        "pipeline": "AutoPipelineForText2Image",
+        "dtype": "float16",
+        "variant": "fp16",
+        "gpu": "A100",
+        "vram_gb": 24,
+        "max_batch_size": 8,
+        "warm_containers": 0,
+        "max_containers": 2,
+    },
+    "OpenDalleV1Generator": {
+        "base": "OpenDalleV1.1",
+        "repo": "dataautogpt3/OpenDalleV1.1",
+        "pipeline": "AutoPipelineForText2Image",
+        "dtype": "float16",
+        "gpu": "A100",
+        "vram_gb": 14,
+        "max_batch_size": 4,
+        "warm_containers": 0,
+        "max_containers": 2,
+    },
+    "SDXLBaseGenerator": {
+        "base": "stable-diffusion-xl-base-1.0",
+        "repo": "stabilityai/stable-diffusion-xl-base-1.0",
+        "pipeline": "AutoPipelineForText2Image",
+        "dtype": "float16",
+        "variant": "fp16",
+        "gpu": "A100",
+        "vram_gb": 14,
+        "max_batch_size": 4,
+        "warm_containers": 0,
+        "max_containers": 1,
+    },
+    "StableDiffusionGenerator": {
+        "base": "stable-diffusion-3.5-large",
+        "repo": "stabilityai/stable-diffusion-3.5-large",
+        "pipeline": "StableDiffusion3Pipeline",
+        "dtype": "bfloat16",
+        "quantize": "fp8",
+        "gpu": "A100",
+        "vram_gb": 20,
+        "max_batch_size": 2,
+        "warm_containers": 0,
+        "max_containers": 2,
+        "step_cache": True,
+    },
+    "FluxLoraGenerator": {
+        "base": "FLUX.1-dev",
+        "repo": "black-forest-labs/FLUX.1-dev",
+        "pipeline": "FluxPipeline",
+        "dtype": "bfloat16",
+        # the LoRAs change the transformer and CLIP, never T5
+        "quantize": "fp8",
+        "quantize_components": ("T5EncoderModel",),
+        "gpu": "A100",
+        "vram_gb": 34,
+        "max_batch_size": 2,
+        "warm_containers": 0,
+        "max_containers": 4,
+        "compile": True,
+        "step_cache": True,
+    },
+}
+
+# Generators that share one container instead of each keeping their own GPU
+# warm. Members keep their own loading, batch size and step profiles; the
+# pool decides the hardware. vram_budget_gb bounds the weights kept on the
+# GPU at once (the rest of its memory is left for activations), and
+# host_budget_gb the pinned host copies of loaded pipelines.
+POOLS = {
+    "PooledGenerator": {
+        "members": ["SDXLTurboGenerator", "OpenDalleV1Generator", "SDXLBaseGenerator", "StableDiffusionGenerator"],
+        "gpu": "A100",
+        "vram_budget_gb": 30,
+        "host_budget_gb": 64,
+        "warm_containers": 0,
+        "max_containers": 3,
+    },
+}
+
+# What users pick from, keyed by model_id. "lora" entries are adapters on
+# their generator's base; "fixed_guidance" overrides whatever the request asks.
+MODELS = {
+    "flux": {
+        "name": "FLUX Transformer",
+        "description": "A 12B rectified flow transformer model for high-fidelity image generation.",
+        "icon": "flux.png",
+        "available": True,
+        "trigger_word": None,
+        "tags": ["high-quality", "experimental"],
+        "generator": "FluxLoraGenerator",
+        "default_steps": 28,
+        "max_steps": 50,
+    },
+    "sd3.5": {
+        "name": "Stable Diffusion 3.5",
+        "description": "A cutting-edge text-to-image model from Stability AI. Delivers improved coherence, detail, and image fidelity over previous SD versions. Great for both photorealistic and artistic generations.",
+        "icon": "stable-diffusion.png",
+        "available": True,
+        "trigger_word": None,
+        "tags": ["stable", "photorealistic", "balanced", "v3"],
+        "generator": "StableDiffusionGenerator",
+        "default_steps": 28,
+        "max_steps": 50,
+    },
+    "opendalle": {
+        "name": "Open Dalle v1.1",
+        "description": "A cutting-edge text-to-image model from that competes with DALLE-3.",
+        "icon": "open-dalle.png",
+        "available": True,
+        "trigger_word": None,
+        "tags": ["stable", "photorealistic", "balanced", "v3"],
+        "generator": "OpenDalleV1Generator",
+        "default_steps": 35,
+        "max_steps": 60,
+    },
+    "sdxl-turbo": {
+        "name": "SDXL-Turbo",
+        "description": "SDXL-Turbo is a fast generative text-to-image model that can synthesize photorealistic images from a text prompt in a single network evaluation.",
+        "icon": "sdxl-turbo.png",
+        "available": True,
+        "trigger_word": None,
+        "tags": ["turbo", "photorealistic", "balanced"],
+        "generator": "SDXLTurboGenerator",
+        "default_steps": 1,
+        "max_steps": 4,
+        "fixed_guidance": 0.0,
+    },
+    "ghibli": {
+        "name": "Flux Anime Ghibli Art LoRA",
+        "description": "A Flux LoRa in the style of Anime Ghibli Art.",
+        "icon": "ghibli.png",
+        "available": True,
+        "trigger_word": "Ghibli Art",
+        "tags": ["LoRA", "artistic", "ghibli-style"],
+        "generator": "FluxLoraGenerator",
+        "lora": {"repo": "strangerzonehf/Flux-Ghibli-Art-LoRA"},
+        "default_steps": 28,
+        "max_steps": 50,
+    },
+    "flux-aestehticanime": {
+        "name": "Flux Aesthetic Anime LoRA",
+        "description": "A Flux LoRa in the style and aesthetic of ghibli retro anime.",
+        "icon": "flux-aesthetic-anime.png",
+        "available": True,
+        "trigger_word": None,
+        "tags": ["LoRA", "artistic", "ghibli-style"],
+        "generator": "FluxLoraGenerator",
+        "lora": {
+            "repo": "dataautogpt3/FLUX-AestheticAnime",
+            "weight_name": "Flux_1_Dev_LoRA_AestheticAnime.safetensors",
+        },
+        "default_steps": 28,
+        "max_steps": 50,
+    },
+    "iso": {
+        "name": "Flux Isometric 3D LoRA",
+        "description": "A Flux LoRA in the style of isometric 3D.",
+        "icon": "iso.png",
+        "available": True,
+        "trigger_word": "Isometric 3D",
+        "tags": ["LoRA", "artistic", "iso-style"],
+        "generator": "FluxLoraGenerator",
+        "lora": {"repo": "strangerzonehf/Flux-Isometric-3D-LoRA"},
+        "default_steps": 28,
+        "max_steps": 50,
+    },
+    "super-realism": {
+        "name": "Flux Super Realism LoRA",
+        "description": "A Flux LoRA for super realism.",
+        "icon": "super-realisim.png",
+        "available": True,
+        "trigger_word": "Super Realism",
+        "tags": ["LoRA", "super-realism", "artistic"],
+        "generator": "FluxLoraGenerator",
+        "lora": {"repo": "strangerzonehf/Flux-Super-Realism-LoRA"},
+        "default_steps": 28,
+        "max_steps": 50,
+    },
+    "sdxl-base": {
+        "name": "SD-XL 1.0 Base ",
+        "description": "generative text-to-image model that can synthesize photorealistic images from a text prompt",
+        "icon": "flux.png",
+        "available": False,
+        "trigger_word": None,
+        "tags": ["SD-XL", "high-quality", "balanced"],
+        "generator": "SDXLBaseGenerator",
+        "default_steps": 30,
+        "max_steps": 50,
+    },
+}
+
+GENERATOR_KEYS = ("base", "repo", "pipeline", "dtype", "gpu", "vram_gb", "max_batch_size", "warm_containers", "max_containers")
+POOL_KEYS = ("members", "gpu", "vram_budget_gb", "host_budget_gb", "warm_containers", "max_containers")
+
+# jobs a model may have waiting for a GPU before new ones are turned away,
+# unless the model sets its own "max_queue"
+DEFAULT_MAX_QUEUE = 32
+MODEL_KEYS = ("name", "description", "icon", "available", "trigger_word", "tags", "generator", "default_steps", "max_steps")
+
+
+def validate(models: dict = MODELS, generators: dict = GENERATORS, pools: dict = POOLS):
+    problems = []
+
+    bases = {}
+    for name, profile in generators.items():
+        missing = [key for key in GENERATOR_KEYS if key not in profile]
+        if missing:
+            problems.append(f"generator {name} is missing {', '.join(missing)}")
+            continue
+        if profile["dtype"] not in DTYPES:
+            problems.append(f"generator {name} has unknown dtype {profile['dtype']}")
+        if profile.get("quantize") not in (None,) + QUANTIZE_MODES:
+            problems.append(f"generator {name} has unknown quantize mode {profile['quantize']}")
+        if profile.get("step_cache") and profile["pipeline"] not in STEP_CACHE_PIPELINES:
+            problems.append(f"generator {name} can't use the step cache with {profile['pipeline']}")
+        quantized = profile.get("quantize_components", QUANTIZE_COMPONENTS) if profile.get("quantize") else ()
+        if set(quantized) - set(QUANTIZE_COMPONENTS):
+            problems.append(f"generator {name} can only quantize {', '.join(QUANTIZE_COMPONENTS)}")
+        if "transformer" in quantized and loras_for(name, models):
+            # adapters attach to full-precision linear layers
+            problems.append(f"generator {name} can't quantize its transformer, it swaps LoRA adapters; quantize only T5EncoderModel")
+        if profile["gpu"] not in GPUS:
+            problems.append(f"generator {name} has unknown gpu {profile['gpu']}")
+        elif not 0 < profile["vram_gb"] <= GPUS[profile["gpu"]]:
+            problems.append(f"generator {name} needs {profile['vram_gb']} GiB, {profile['gpu']} has {GPUS[profile['gpu']]}")
+        if profile["max_batch_size"] < 1:
+            problems.append(f"generator {name} has max_batch_size below 1")
+        if not 0 <= profile["warm_containers"] <= profile["max_containers"] or profile["max_containers"] < 1:
+            problems.append(f"generator {name} needs 0 <= warm_containers <= max_containers and max_containers >= 1")
+
+        # generators sharing a snapshot share its download and baked copy
+        loading = tuple(profile.get(key) for key in ("repo", "pipeline", "dtype", "variant", "fuse_loras", "quantize", "quantize_components"))
+        if bases.setdefault(profile["base"], loading) != loading:
+            problems.append(f"generators loading {profile['base']} disagree on how to load it")
+
+    pooled = {}
+    for name, pool in pools.items():
+        missing = [key for key in POOL_KEYS if key not in pool]
+        if missing:
+            problems.append(f"pool {name} is missing {', '.join(missing)}")
+            continue
+        if name in generators:
+            problems.append(f"pool {name} has the same name as a generator")
+        gpu_gb = GPUS.get(pool["gpu"])
+        if gpu_gb is None:
+            problems.append(f"pool {name} has unknown gpu {pool['gpu']}")
+        elif not 0 < pool["vram_budget_gb"] < gpu_gb:
+            problems.append(f"pool {name} needs 0 < vram_budget_gb < {gpu_gb}")
+        if not 0 <= pool["warm_containers"] <= pool["max_containers"] or pool["max_containers"] < 1:
+            problems.append(f"pool {name} needs 0 <= warm_containers <= max_containers and max_containers >= 1")
+        for member in pool["members"]:
+            if member not in generators:
+                problems.append(f"pool {name} has unknown member {member}")
+                continue
+            if pooled.setdefault(member, name) != name:
+                problems.append(f"generator {member} is in more than one pool")
+            if loras_for(member, models):
+                problems.append(f"pool {name} can't host {member}, which swaps LoRA adapters")
+            if generators[member].get("compile"):
+                problems.append(f"pool {name} can't host {member}, compiled graphs don't survive swapping devices")
+            if gpu_gb is not None and generators[member].get("vram_gb", 0) > gpu_gb:
+                problems.append(f"pool {name} member {member} needs more than a {pool['gpu']}")
+
+    for name, profile in generators.items():
+        if profile.get("pipeline") not in MEMORY_PROFILES:
+            problems.append(f"generator {name} has no memory profile for {profile.get('pipeline')}")
+        elif profile.get("compile") and profile.get("gpu") in GPUS:
+            # tiles are shapes the warm-up never compiled
+            for width, height in RESOLUTION_BUCKETS:
+                try:
+                    if plan_resolution(name, width, height, generators, pools)["vae_tiling"]:
+                        problems.append(f"compiled generator {name} would need tiled decode at {width}x{height}")
+                except ValueError as e:
+                    problems.append(f"compiled generator {name} can't serve its bucket {width}x{height}: {e}")
+
+    for model_id, model in models.items():
+        missing = [key for key in MODEL_KEYS if key not in model]
+        if missing:
+            problems.append(f"model {model_id} is missing {', '.join(missing)}")
+            continue
+        if model["generator"] not in generators:
+            problems.append(f"model {model_id} uses unknown generator {model['generator']}")
+        if not 1 <= model["default_steps"] <= model["max_steps"]:
+            problems.append(f"model {model_id} needs 1 <= default_steps <= max_steps")
+        if "lora" in model and "repo" not in model["lora"]:
+            problems.append(f"model {model_id} has a lora without a repo")
+        if model.get("max_queue", DEFAULT_MAX_QUEUE) < 1:
+            problems.append(f"model {model_id} has max_queue below 1")
+        if model.get("fixed_guidance", 0) < 0:
+            problems.append(f"model {model_id} has negative fixed_guidance")
+
+    if problems:
+        raise ValueError("Invalid model registry:\n  " + "\n  ".join(problems))
+
+
+def class_for(model_id: str, models: dict = MODELS, pools: dict = POOLS) -> str:
+    # the Modal class serving a model: its generator, or the pool hosting it
+    generator = models[model_id]["generator"]
+    for name, pool in pools.items():
+        if generator in pool["members"]:
+            return name
+    return generator
+
+
+def pool_batch_size(pool: dict, generators: dict = GENERATORS) -> int:
+    return max(generators[member]["max_batch_size"] for member in pool["members"])
+
+
+def capacities(generators: dict = GENERATORS, pools: dict = POOLS) -> dict:
+    # class name -> generation calls it can run at once when fully scaled out
+    pooled = {member for pool in pools.values() for member in pool["members"]}
+    capacity = {}
+    for name, profile in generators.items():
+        if name not in pooled:
+            capacity[name] = profile["max_containers"] * 2 * profile["max_batch_size"]
+    for name, pool in pools.items():
+        capacity[name] = pool["max_containers"] * 2 * pool_batch_size(pool, generators)
+    return capacity
+
+
+def queue_limits(models: dict = MODELS) -> dict:
+    return {model_id: model.get("max_queue", DEFAULT_MAX_QUEUE) for model_id, model in models.items()}
+
+
+def memory_budget(name: str, generators: dict = GENERATORS, pools: dict = POOLS) -> tuple:
+    # -> (GiB of weights resident next to a generator's activations, GiB its
+    # activations may use). A standalone generator's vram_gb is its weights
+    # plus a full batch at 1024x1024; a pooled one shares the GPU with up to
+    # vram_budget_gb of weights and gets the rest.
+    profile = generators[name]
+    for pool in pools.values():
+        if name in pool["members"]:
+            weights = pool["vram_budget_gb"]
+            return weights, GPUS[pool["gpu"]] - RESERVED_GB - weights
+
+    weights = profile["vram_gb"] - activation_gb(profile["pipeline"], 1024, 1024, profile["max_batch_size"])
+    return weights, GPUS[profile["gpu"]] - RESERVED_GB - weights
+
+
+def activation_gb(pipeline: str, width: int, height: int, batch: int, vae_slicing: bool = False, vae_tiling: bool = False, attention_slicing: bool = False) -> float:
+    # estimated peak activations of one pipeline call; denoising and decoding
+    # happen one after the other, so the larger of the two
+    memory = MEMORY_PROFILES[pipeline]
+    megapixels = width * height / 1e6
+
+    denoise = memory["denoise_gb"] * megapixels * batch
+    if attention_slicing:
+        denoise *= ATTENTION_SLICING_FACTOR
+
+    decoded = 1 if vae_slicing else batch
+    decode = memory["decode_gb"] * (min(megapixels, TILE_MEGAPIXELS) if vae_tiling else megapixels) * decoded
+    return max(denoise, decode)
+
+
+def check_size(width: int, height: int):
+    if not (MIN_SIDE <= width <= MAX_SIDE and MIN_SIDE <= height <= MAX_SIDE):
+        raise ValueError(f"width and height must be between {MIN_SIDE} and {MAX_SIDE}")
+
+
+def plan_resolution(name: str, width: int, height: int, generators: dict = GENERATORS, pools: dict = POOLS) -> dict:
+    # How generator `name` renders width x height: the size snapped to its
+    # pipeline's multiple, the memory savers it needs, and the most images a
+    # batch of that size may hold. Savers are switched on cheapest first
+    # (VAE slicing, VAE tiling, attention slicing) until a full batch fits,
+    # then the batch shrinks. Raises ValueError when not even one image fits.
+    profile = generators[name]
+    memory = MEMORY_PROFILES[profile["pipeline"]]
+
+    check_size(width, height)
+    multiple = memory["multiple"]
+    width = max(multiple, round(width / multiple) * multiple)
+    height = max(multiple, round(height / multiple) * multiple)
+
+    weights, budget = memory_budget(name, generators, pools)
+    savers = [{}, {"vae_slicing": True}, {"vae_slicing": True, "vae_tiling": True}]
+    if memory["attention_slicing"]:
+        savers.append({"vae_slicing": True, "vae_tiling": True, "attention_slicing": True})
+
+    for batch in range(profile["max_batch_size"], 0, -1):
+        for options in savers:
+            needed = activation_gb(profile["pipeline"], width, height, batch, **options)
+            if needed <= budget:
+                return {
+                    "width": width,
+                    "height": height,
+                    "vae_slicing": options.get("vae_slicing", False),
+                    "vae_tiling": options.get("vae_tiling", False),
+                    "attention_slicing": options.get("attention_slicing", False),
+                    "max_batch": batch,
+                    "estimated_gb": round(weights + needed, 2),
+                }
+
+    raise ValueError(f"{width}x{height} needs more GPU memory than {name} has; try a smaller size")
+
+
+def apply_profile(request: dict, models: dict = MODELS, generators: dict = GENERATORS, pools: dict = POOLS) -> dict:
+    # The request with its model's defaults filled in: default_steps when no
+    # step count was given, fixed_guidance for models that ignore it, the
+    # no step cache where the generator has none. The size goes through
+    # plan_resolution, whose plan rides along as "memory". Raises ValueError
+    # for more steps than the model allows, a size it can't serve (for
+    # compiled generators, any size that isn't one of RESOLUTION_BUCKETS),
+    # or more images than fit one batch of that size.
+    model = models[request["model_id"]]
+    request = dict(request)
+
+    if request.get("iterations") is None:
+        request["iterations"] = model["default_steps"]
+    elif not 1 <= request["iterations"] <= model["max_steps"]:
+        raise ValueError(f"{request['model_id']} takes 1 to {model['max_steps']} iterations")
+
+    if model.get("fixed_guidance") is not None:
+        request["guidance"] = model["fixed_guidance"]
+
+    generator = generators[model["generator"]]
+    if not generator.get("step_cache"):
+        request["step_cache"] = None
+
+    width = 1024 if request.get("width") is None else request["width"]
+    height = 1024 if request.get("height") is None else request["height"]
+    plan = plan_resolution(model["generator"], width, height, generators, pools)
+    if generator.get("compile") and (plan["width"], plan["height"]) not in RESOLUTION_BUCKETS:
+        sizes = ", ".join(f"{w}x{h}" for w, h in RESOLUTION_BUCKETS)
+        raise ValueError(f"{request['model_id']} renders only these sizes: {sizes}")
+    request["width"], request["height"] = plan["width"], plan["height"]
+    request["memory"] = plan
+
+    # all of a request's images come from one pipeline call
+    request["numberImages"] = request.get("numberImages") or 1
+    if request["numberImages"] > plan["max_batch"]:
+        raise ValueError(f"{request['model_id']} makes at most {plan['max_batch']} images of {plan['width']}x{plan['height']} per request")
+    return request
+
+
+def model_list(models: dict = MODELS) -> list:
+    # the /models catalogue entries
+    return [
+        {
+            "id": model_id,
+            "name": model["name"],
+            "description": model["description"],
+            "icon_url": model["icon"],
+            "available": model["available"],
+            "trigger_word": model["trigger_word"],
+            "tags": model["tags"],
+        }
+        for model_id, model in models.items()
+    ]
+
+
+def loras_for(generator: str, models: dict = MODELS) -> dict:
+    # model_id -> lora for the adapters a generator serves
+    return {model_id: model["lora"] for model_id, model in models.items() if model["generator"] == generator and "lora" in model}
+
+
+def preload_manifest(models: dict = MODELS, generators: dict = GENERATORS) -> tuple:
+    # (base models by folder name, LoRA repos) for preload_models.py
+    base_models = {}
+    for profile in generators.values():
+        base_models[profile["base"]] = {"repo": profile["repo"], "variant": profile.get("variant")}
+
+    loras = {}
+    for model in models.values():
+        if "lora" in model:
+            loras[model["lora"]["repo"]] = {k: v for k, v in model["lora"].items() if k != "repo"}
+    return base_models, loras
+
+
+validate()
@@ -0,0 +1,220 @@
+import hashlib
+import hmac
+import os
+import re
+import threading
+import time
+
+from encoding import FORMATS
+
+# Finished images by content: an object's key is the SHA-256 of its bytes
+# plus an extension for its media type, so the same image is stored once
+# and a key never changes what it points at. That makes objects safe to
+# cache forever and the digest a strong ETag.
+
+# media type -> key extension
+EXTENSIONS = {media_type: fmt for fmt, (_, media_type, _, _) in FORMATS.items()}
+MEDIA_TYPES = {fmt: media_type for media_type, fmt in EXTENSIONS.items()}
+
+KEY_PATTERN = re.compile(r"^[0-9a-f]{64}\.[a-z]+$")
+
+# objects never change, so anything that has one may keep it
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+def object_key(data: bytes, media_type: str) -> str:
+    return f"{hashlib.sha256(data).hexdigest()}.{EXTENSIONS.get(media_type, 'bin')}"
+
+
+def valid_key(key: str) -> bool:
+    return KEY_PATTERN.match(key) is not None
+
+
+def media_type_of(key: str) -> str:
+    return MEDIA_TYPES.get(key.rpartition(".")[2], "application/octet-stream")
+
+
+def etag_of(key: str) -> str:
+    return f'"{key.partition(".")[0]}"'
+
+
+def sign(secret: bytes, key: str, expires: int) -> str:
+    # signature of a URL for `key` that stops working at unix time `expires`
+    return hmac.new(secret, f"{key}:{expires}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def verify(secret: bytes, key: str, expires: int, signature: str) -> bool:
+    return expires >= time.time() and hmac.compare_digest(sign(secret, key, expires), signature)
+
+
+class LocalObjectStore:
+    # Objects as files under root, sharded by the first two hex digits. The
+    # stand-in for a bucket when running locally, and on a Modal volume in
+    # production: `commit` publishes what this container wrote, and `reload`
+    # picks up what others wrote before a key is given up on. A reload fails
+    # while files are open, which under load is most of the time, so a
+    # missing key is retried for up to reload_wait seconds. The oldest
+    # objects go once they add up to more than max_bytes (see prune()).
+
+    def __init__(self, root: str, max_bytes: int | None = None, commit=None, reload=None, reload_wait: float = 0.0):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._commit = commit
+        self._reload = reload
+        self.reload_wait = reload_wait
+        self._reload_lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def put(self, data: bytes, media_type: str) -> str:
+        key = object_key(data, media_type)
+        path = self._path(key)
+        if os.path.exists(path):
+            # written again: keep it from being pruned as old
+            os.utime(path)
+            return key
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return key
+
+    def commit(self):
+        if self._commit is not None:
+            self._commit()
+
+    def path(self, key: str) -> str | None:
+        # the object's file, or None when there is no such object
+        if not valid_key(key):
+            return None
+        path = self._path(key)
+        if self._reload is None:
+            return path if os.path.exists(path) else None
+
+        deadline = time.monotonic() + self.reload_wait
+        delay = 0.1
+        while not os.path.exists(path):
+            with self._reload_lock:
+                if not os.path.exists(path):
+                    try:
+                        self._reload()
+                    except Exception as e:
+                        print(f"Object store: reload failed: {e!r}")
+            remaining = deadline - time.monotonic()
+            if os.path.exists(path) or remaining <= 0:
+                break
+            time.sleep(min(delay, remaining))
+            delay *= 2
+        return path if os.path.exists(path) else None
+
+    def get(self, key: str) -> bytes | None:
+        path = self.path(key)
+        if path is None:
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def url(self, key: str, ttl: int) -> str | None:
+        # files have no URL of their own; the web tier signs one to itself
+        return None
+
+    def prune(self):
+        if self.max_bytes is None:
+            return
+        found = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                found.append((stat.st_mtime, stat.st_size, path))
+
+        size = sum(s for _, s, _ in found)
+        for _, file_size, path in sorted(found):
+            if size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= file_size
+
+
+class S3ObjectStore:
+    # Objects in an S3-compatible bucket under `prefix`. Clients are sent to
+    # presigned URLs, so image bytes never pass through the web tier; the
+    # bucket's lifecycle rules decide how long objects are kept. boto3 is
+    # only needed when this store is used.
+
+    def __init__(self, bucket: str, prefix: str = "", client=None, **client_args):
+        if client is None:
+            import boto3
+
+            client = boto3.client("s3", **client_args)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+
+    def _name(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def _exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._name(key))
+        except self.client.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    def put(self, data: bytes, media_type: str) -> str:
+        key = object_key(data, media_type)
+        if not self._exists(key):
+            self.client.put_object(
+                Bucket=self.bucket,
+                Key=self._name(key),
+                Body=data,
+                ContentType=media_type,
+                CacheControl=IMMUTABLE_CACHE_CONTROL,
+            )
+        return key
+
+    def commit(self):
+        pass
+
+    def path(self, key: str) -> str | None:
+        return None
+
+    def get(self, key: str) -> bytes | None:
+        if not valid_key(key):
+            return None
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._name(key))["Body"].read()
+        except self.client.exceptions.NoSuchKey:
+            return None
+
+    def url(self, key: str, ttl: int) -> str | None:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self._name(key)},
+            ExpiresIn=ttl,
+        )
+
+    def prune(self):
+        pass
+
+
+def open_store(location: str, **options):
+    # "s3://bucket/prefix" for a bucket (credentials and, for other
+    # providers, AWS_ENDPOINT_URL come from the environment), anything else
+    # is a directory; options go to LocalObjectStore
+    if location.startswith("s3://"):
+        bucket, _, prefix = location.removeprefix("s3://").partition("/")
+        return S3ObjectStore(bucket, prefix)
+    return LocalObjectStore(location, **options)
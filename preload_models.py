@@ -1,5 +1,13 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+
 import modal
 
+from model_registry import preload_manifest
+
 image = (
     modal.Image.debian_slim()
     .pip_install(
@@ -13,12 +21,13 @@ image = (
         "transformers~=4.44.0",
         "peft==0.11.1",
     )
-    .env({"HF_HUB_ENABLE_HF_TRANSFER": "1"})  # turn on faster downloads from HF    
+    .env({"HF_HUB_ENABLE_HF_TRANSFER": "1"})  # turn on faster downloads from HF
+    .add_local_python_source("model_registry")
 )
 
 with image.imports():
-    from huggingface_hub import snapshot_download
-    
+    from huggingface_hub import HfApi, hf_hub_download
+
 # Use the new App-based API
 app = modal.App("preload")
 
@@ -26,88 +35,155 @@ webAssetsVolume = modal.Volume.from_name("web-assets", create_if_missing=True)
 
 weightsVolume = modal.Volume.from_name("weights", create_if_missing=True)
 
-def downloadModelSnapshot(repo_root: str, model: str, dl_dir: str):
-    repo = repo_root + model
-
-    print(f"Starting download from {repo} to {dl_dir}")
-    snapshot_download(
-        repo_id=repo,
-        local_dir=dl_dir
-    )
+MODEL_CACHE_DIR = "/weights/model-cache"
+LORA_CACHE_DIR = "/weights/lora-cache"
+
+# Base models by the folder the generators load them from, and LoRA repos,
+# stored under LORA_CACHE_DIR/<repo> where FluxLoraGenerator looks before
+# going to the Hub. For base models only the diffusers components listed in
+# model_index.json are fetched, in the generator's variant, so single-file
+# checkpoints and other formats in the same repo stay on the Hub.
+MODELS, LORAS = preload_manifest()
+
+# weight formats the pipelines never read when safetensors are there
+SKIPPED_WEIGHTS = ("*.bin", "*.ckpt", "*.pt", "*.pth", "*.onnx", "*.onnx_data", "*.msgpack", "*.h5", "*.pb")
+
+# files verified by an earlier run: path -> {"size", "mtime", "sha"}
+RECORD_FILE = ".preload.json"
+
+DOWNLOAD_WORKERS = 8
+
+
+def manifest() -> list:
+    jobs = []
+    for name, model in MODELS.items():
+        jobs.append({
+            "repo": model["repo"],
+            "local_dir": f"{MODEL_CACHE_DIR}/{name}",
+            "variant": model.get("variant"),
+            "allow_patterns": None,
+        })
+    for repo, lora in LORAS.items():
+        jobs.append({
+            "repo": repo,
+            "local_dir": f"{LORA_CACHE_DIR}/{repo}",
+            "variant": None,
+            "allow_patterns": [lora.get("weight_name", "*.safetensors")],
+        })
+    return jobs
+
+
+def weights_variant(filename: str) -> str | None:
+    # diffusion_pytorch_model.fp16.safetensors -> "fp16", and the same for
+    # shards such as model.fp16-00001-of-00002.safetensors
+    parts = os.path.basename(filename).split(".")
+    if len(parts) < 3:
+        return None
+    return parts[-2].split("-")[0]
+
+
+def pipeline_files(files: list, model_index: dict, variant: str | None) -> list:
+    # the files from_pretrained(..., variant=variant) would read
+    components = [name for name, value in model_index.items() if isinstance(value, list) and value[0] is not None]
+
+    selected = ["model_index.json"]
+    for component in components:
+        in_component = [f for f in files if f.startswith(component + "/") and not any(fnmatch(f, p) for p in SKIPPED_WEIGHTS)]
+        weights = [f for f in in_component if f.endswith(".safetensors")]
+        wanted = [f for f in weights if weights_variant(f) == variant]
+        if not wanted and variant is not None:
+            # diffusers falls back to the default weights for components
+            # that have no such variant
+            wanted = [f for f in weights if weights_variant(f) is None]
+
+        selected += [f for f in in_component if not f.endswith(".safetensors")] + wanted
+    return selected
+
+
+def file_digest(path: str, lfs: bool) -> str:
+    # LFS files are listed by sha256; everything else by git blob id
+    digest = hashlib.sha256() if lfs else hashlib.sha1(f"blob {os.path.getsize(path)}\0".encode())
+    with open(path, "rb") as f:
+        while chunk := f.read(16 * 1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def preload(job: dict) -> dict:
+    repo, local_dir = job["repo"], job["local_dir"]
+    info = HfApi().model_info(repo, files_metadata=True)
+    siblings = {s.rfilename: s for s in info.siblings}
+
+    if job["allow_patterns"] is not None:
+        files = [f for f in siblings if any(fnmatch(f, p) for p in job["allow_patterns"])]
+    else:
+        index_path = hf_hub_download(repo, "model_index.json", revision=info.sha, local_dir=local_dir)
+        with open(index_path) as f:
+            files = pipeline_files(list(siblings), json.load(f), job["variant"])
+
+    record_path = os.path.join(local_dir, RECORD_FILE)
+    try:
+        with open(record_path) as f:
+            record = json.load(f)
+    except FileNotFoundError:
+        record = {}
+
+    def fetch(filename: str) -> bool:
+        # True if the file had to be downloaded
+        sibling = siblings[filename]
+        expected = sibling.lfs.sha256 if sibling.lfs else sibling.blob_id
+        path = os.path.join(local_dir, filename)
+
+        if os.path.exists(path):
+            stat = os.stat(path)
+            known = record.get(filename)
+            if known and known == {"size": stat.st_size, "mtime": stat.st_mtime, "sha": expected}:
+                return False
+            if stat.st_size == sibling.size and file_digest(path, bool(sibling.lfs)) == expected:
+                record[filename] = {"size": stat.st_size, "mtime": stat.st_mtime, "sha": expected}
+                return False
+
+        # picks up a partial download left by an earlier, interrupted run
+        hf_hub_download(repo, filename, revision=info.sha, local_dir=local_dir)
+        if file_digest(path, bool(sibling.lfs)) != expected:
+            os.remove(path)
+            raise RuntimeError(f"Checksum mismatch for {repo}/{filename}")
+
+        stat = os.stat(path)
+        record[filename] = {"size": stat.st_size, "mtime": stat.st_mtime, "sha": expected}
+        return True
+
+    try:
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as pool:
+            downloaded = sum(pool.map(fetch, files))
+    finally:
+        with open(record_path, "w") as f:
+            json.dump(record, f)
+        weightsVolume.commit()
+
+    return {
+        "repo": repo,
+        "files": len(files),
+        "downloaded": downloaded,
+        "bytes": sum(siblings[f].size or 0 for f in files),
+    }
 
-    print(f"Downloaded model files for {repo}")
 
 @app.function(
-    volumes={"/weights": weightsVolume}, 
-    timeout=900,  # timeout in seconds (e.g., 900s = 15 minutes)
-    image=image,     
+    volumes={"/weights": weightsVolume},
+    timeout=3600,
+    retries=modal.Retries(max_retries=3, initial_delay=5.0),
+    image=image,
     secrets=[modal.Secret.from_name("hf-token")],  # 👈 attaches HF_TOKEN env var
     )
-def preload_openDalle():
-    repo_root = "dataautogpt3/"
-    model = "OpenDalleV1.1"
-    downloadModelSnapshot(repo_root=repo_root, model=model, dl_dir="/weights/model-cache/" + model)
-
-
-@app.function(
-    volumes={"/weights": weightsVolume}, 
-    timeout=900,  # timeout in seconds (e.g., 900s = 15 minutes)
-    image=image,     
-    secrets=[modal.Secret.from_name("hf-token")],  # 👈 attaches HF_TOKEN env var
-    )
-def preload_flux():
-    model = "FLUX.1-dev"
-    repo = "black-forest-labs/" + model
-    dl_dir = "/weights/model-cache/" + model
-
-    print(f"Starting download from {repo} to {dl_dir}")
-
-    snapshot_download(
-        repo_id=repo,
-        local_dir=dl_dir,   # makes it usable as a direct `from_pretrained` path
-    )    
-
-    print("Flux model preloaded to volume.")   
-
-
-
-@app.function(
-    volumes={"/weights": weightsVolume}, 
-    timeout=900,  # timeout in seconds (e.g., 900s = 15 minutes)
-    image=image,     
-    secrets=[modal.Secret.from_name("hf-token")],  # 👈 attaches HF_TOKEN env var
-    )
-def preload_sd():
-    model = "stable-diffusion-3.5-large"
-    dl_dir = "/weights/model-cache/" + model
-    downloadModelSnapshot(repo_root="stabilityai/", model=model, dl_dir=dl_dir)
-
-
-@app.function(
-    volumes={"/weights": weightsVolume}, 
-    timeout=900,  # timeout in seconds (e.g., 900s = 15 minutes)
-    image=image,     
-    secrets=[modal.Secret.from_name("hf-token")],  # 👈 attaches HF_TOKEN env var
-    )
-def preload_sdxl_turbo():
-    repo_root = "stabilityai/"
-    model = "sdxl-turbo"
-
-    downloadModelSnapshot(repo_root=repo_root, model=model, dl_dir="/weights/model-cache/" + model)
-
-
-
-@app.function(
-    volumes={"/weights": weightsVolume}, 
-    timeout=900,  # timeout in seconds (e.g., 900s = 15 minutes)
-    image=image,     
-    secrets=[modal.Secret.from_name("hf-token")],  # 👈 attaches HF_TOKEN env var
-    )
-def preload_sdxl_base():
-    repo_root = "stabilityai/"
-    model = "stable-diffusion-xl-base-1.0"
-
-    downloadModelSnapshot(repo_root=repo_root, model=model, dl_dir="/weights/model-cache/" + model)
-
+def preload_repo(job: dict) -> dict:
+    return preload(job)
 
 
+@app.local_entrypoint()
+def main(only: str = ""):
+    # modal run preload_models.py [--only FLUX.1-dev]
+    # Every repo gets its own container, so the downloads run side by side.
+    jobs = [job for job in manifest() if not only or only in (job["repo"], os.path.basename(job["local_dir"]))]
+    for result in preload_repo.map(jobs, order_outputs=False):
+        print(f"{result['repo']}: {result['downloaded']}/{result['files']} files fetched, {result['bytes'] / 1024**3:.1f} GiB on the volume")
@@ -0,0 +1,47 @@
+from io import BytesIO
+
+import torch
+import torch.nn.functional as F
+from PIL import Image
+
+# latents are shrunk to at most this many cells a side before decoding, which
+# keeps a preview decode to a few milliseconds (256px output for an 8x VAE)
+PREVIEW_LATENT_SIZE = 32
+
+
+@torch.no_grad()
+def decode_previews(pipe, latents, height: int, width: int) -> list:
+    # Low resolution JPEGs of in-progress latents, one per batch item.
+    if hasattr(pipe, "_unpack_latents"):
+        # FLUX keeps its latents packed into 2x2 patches during denoising
+        latents = pipe._unpack_latents(latents, height, width, pipe.vae_scale_factor)
+
+    latent_height, latent_width = latents.shape[-2:]
+    scale = min(1.0, PREVIEW_LATENT_SIZE / max(latent_height, latent_width))
+    if scale < 1.0:
+        size = (max(1, round(latent_height * scale)), max(1, round(latent_width * scale)))
+        latents = F.adaptive_avg_pool2d(latents, size)
+
+    vae = pipe.vae
+    latents = latents / vae.config.scaling_factor
+    if getattr(vae.config, "shift_factor", None):
+        latents = latents + vae.config.shift_factor
+
+    # The decoder's own forward rather than vae.decode, which goes through
+    # the decoder compiled by compilation.optimize_pipeline: preview latents
+    # have shapes of their own, and compiling one on the request path costs
+    # far more than decoding a few hundred cells eagerly.
+    latents = latents.to(vae.device, vae.dtype)
+    if getattr(vae, "post_quant_conv", None) is not None:
+        latents = vae.post_quant_conv(latents)
+    images = vae.decoder.forward(latents)
+    # fp16 SDXL VAEs can overflow; a preview is allowed to be a little wrong
+    images = torch.nan_to_num(images.float()).div(2).add(0.5).clamp(0, 1)
+    images = images.mul(255).round().to(torch.uint8).permute(0, 2, 3, 1).cpu().numpy()
+
+    previews = []
+    for array in images:
+        buf = BytesIO()
+        Image.fromarray(array).save(buf, format="JPEG", quality=70)
+        previews.append(buf.getvalue())
+    return previews
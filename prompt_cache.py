@@ -0,0 +1,182 @@
+import threading
+import time
+from collections import OrderedDict
+
+import torch
+
+
+def normalize_prompt(prompt: str) -> str:
+    # whitespace never changes what the tokenizers produce; case does for T5
+    return " ".join(prompt.split())
+
+
+# How each pipeline encodes a list of prompts, without classifier-free
+# guidance, as {pipeline argument: tensor with one row per prompt}. The
+# negative embeddings for guidance come from encoding "" the same way and
+# taking the negative half.
+
+def _flux(pipe, prompts: list, device) -> dict:
+    embeds, pooled, _ = pipe.encode_prompt(prompt=prompts, prompt_2=None, device=device)
+    return {"prompt_embeds": embeds, "pooled_prompt_embeds": pooled}
+
+
+def _sd3(pipe, prompts: list, device, negative: bool = False) -> dict:
+    embeds, negative_embeds, pooled, negative_pooled = pipe.encode_prompt(
+        prompt=prompts, prompt_2=None, prompt_3=None, device=device, do_classifier_free_guidance=negative,
+    )
+    if negative:
+        return {"negative_prompt_embeds": negative_embeds, "negative_pooled_prompt_embeds": negative_pooled}
+    return {"prompt_embeds": embeds, "pooled_prompt_embeds": pooled}
+
+
+def _sdxl(pipe, prompts: list, device, negative: bool = False) -> dict:
+    embeds, negative_embeds, pooled, negative_pooled = pipe.encode_prompt(
+        prompt=prompts, device=device, do_classifier_free_guidance=negative,
+    )
+    if negative:
+        return {"negative_prompt_embeds": negative_embeds, "negative_pooled_prompt_embeds": negative_pooled}
+    return {"prompt_embeds": embeds, "pooled_prompt_embeds": pooled}
+
+
+# pipeline class -> (encode, uses a negative prompt under guidance, repeats
+# embeddings it is given num_images_per_prompt times itself)
+ENCODERS = {
+    "FluxPipeline": (_flux, False, False),
+    "StableDiffusion3Pipeline": (_sd3, True, False),
+    "StableDiffusionXLPipeline": (_sdxl, True, True),
+}
+
+
+def _uses_guidance(pipe, guidance: float) -> bool:
+    # mirrors the pipelines' do_classifier_free_guidance
+    unet = getattr(pipe, "unet", None)
+    if unet is not None and unet.config.time_cond_proj_dim is not None:
+        return False
+    return guidance > 1
+
+
+class PromptEmbeddingCache:
+    # LRU of text encoder outputs, so a prompt that comes back (seed sweeps,
+    # several images, retries) skips CLIP/T5. Entries are keyed by
+    # (namespace, pipeline class, normalized prompt) and hold one row of
+    # each embedding tensor; the namespace tells apart models whose text
+    # encoders differ, e.g. LoRA styles on one base. Entries stay on the
+    # device they were computed on unless `device` is given, and the least
+    # recently used go once they add up to more than max_bytes.
+
+    def __init__(self, max_bytes: int, device: str | None = None):
+        self.max_bytes = max_bytes
+        self.device = torch.device(device) if device else None
+
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.encode_seconds = 0.0  # spent encoding misses
+
+        self._entries = OrderedDict()  # key -> (tensors, bytes)
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def _put(self, key, tensors: dict):
+        if self.device is not None:
+            tensors = {name: t.to(self.device) for name, t in tensors.items()}
+        size = sum(t.nbytes for t in tensors.values())
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (tensors, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    @torch.no_grad()
+    def embeddings(self, pipe, namespace: str, prompts: list, guidance: float, images_per_prompt: int = 1) -> dict | None:
+        # Pipeline arguments carrying the embeddings for `prompts`, in order,
+        # in place of prompt=... and num_images_per_prompt=...; None for
+        # pipelines without an encoder here.
+        pipeline = type(pipe).__name__
+        if pipeline not in ENCODERS:
+            return None
+        encode, has_negative, repeats = ENCODERS[pipeline]
+        device = pipe._execution_device
+
+        keys = [(namespace, pipeline, normalize_prompt(p)) for p in prompts]
+        rows = {key: self._get(key) for key in keys}
+
+        missing = list(dict.fromkeys(key for key, row in rows.items() if row is None))
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            start = time.perf_counter()
+            encoded = encode(pipe, [key[2] for key in missing], device)
+            self.encode_seconds += time.perf_counter() - start
+            for i, key in enumerate(missing):
+                # cloned, so a cached row doesn't keep the whole batch alive
+                rows[key] = {name: t[i : i + 1].clone() for name, t in encoded.items()}
+                self._put(key, rows[key])
+
+        args = {name: torch.cat([rows[key][name].to(device) for key in keys]) for name in rows[keys[0]]}
+
+        if has_negative and _uses_guidance(pipe, guidance):
+            key = (namespace, pipeline, None)  # the empty negative prompt
+            negative = self._get(key)
+            if negative is None:
+                negative = encode(pipe, [""], device, negative=True)
+                self._put(key, negative)
+            args.update({name: t.to(device).repeat(len(keys), *[1] * (t.dim() - 1)) for name, t in negative.items()})
+
+        if repeats:
+            args["num_images_per_prompt"] = images_per_prompt
+        elif images_per_prompt > 1:
+            # rows in the order the pipeline would have repeated them
+            args = {name: t.repeat_interleave(images_per_prompt, dim=0) for name, t in args.items()}
+        return args
+
+    def cached(self, pipe, namespace: str, prompts: list) -> list:
+        # For each of `prompts`, whether embeddings() will find it without
+        # encoding: it is cached already or an earlier prompt is the same
+        # one, as hits are counted.
+        pipeline = type(pipe).__name__
+        seen = set()
+        hits = []
+        with self._lock:
+            for prompt in prompts:
+                key = (namespace, pipeline, normalize_prompt(prompt))
+                hits.append(key in self._entries or key in seen)
+                seen.add(key)
+        return hits
+
+    def mean_encode_seconds(self) -> float:
+        # what one hit saves, going by the misses so far
+        with self._lock:
+            return self.encode_seconds / self.misses if self.misses else 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self.hits + self.misses
+            per_encode = self.encode_seconds / self.misses if self.misses else None
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else None,
+                "evictions": self.evictions,
+                "mean_encode_s": per_encode,
+                # each hit skipped one encode
+                "seconds_saved": self.hits * per_encode if per_encode is not None else 0.0,
+            }
@@ -0,0 +1,116 @@
+import re
+
+import torch
+import torch.nn.functional as F
+
+# storage dtype and largest representable magnitude per mode
+QUANTIZE_MODES = {
+    "int8": (torch.int8, 127.0),
+    "fp8": (torch.float8_e4m3fn, torch.finfo(torch.float8_e4m3fn).max),
+}
+
+# Only linear layers inside the repeated blocks are quantized: that is
+# nearly all of the weights of a FLUX/SD3 transformer or a T5 encoder, while
+# the embeddings, norms and output projection, which errors hurt most,
+# stay in full precision.
+BLOCK_LAYER = re.compile(r"(^|\.)(transformer_blocks|single_transformer_blocks|block)\.\d+\.")
+
+# components quantized when a generator asks for it: the denoiser and T5,
+# by pipeline component name or class name
+QUANTIZED_COMPONENTS = ("transformer", "T5EncoderModel")
+
+
+class QuantizedLinear(torch.nn.Module):
+    # nn.Linear holding its weight in 8 bits with one scale per output
+    # channel. The weight is dequantized to the input's dtype on every call,
+    # so only one layer's worth is ever expanded at a time; torch.compile
+    # can fold that into the matmul.
+
+    def __init__(self, in_features: int, out_features: int, bias: bool, weight_dtype, dtype, device=None):
+        super().__init__()
+        self.in_features = in_features
+        self.out_features = out_features
+        self.weight = torch.nn.Parameter(torch.empty(out_features, in_features, dtype=weight_dtype, device=device), requires_grad=False)
+        self.register_buffer("weight_scale", torch.empty(out_features, 1, dtype=dtype, device=device))
+        if bias:
+            self.bias = torch.nn.Parameter(torch.empty(out_features, dtype=dtype, device=device), requires_grad=False)
+        else:
+            self.bias = None
+
+    @classmethod
+    @torch.no_grad()
+    def from_linear(cls, linear: torch.nn.Linear, mode: str):
+        weight_dtype, limit = QUANTIZE_MODES[mode]
+        weight = linear.weight.float()
+        scale = weight.abs().amax(dim=1, keepdim=True).clamp(min=1e-12) / limit
+
+        quantized = weight / scale
+        if mode == "int8":
+            quantized = quantized.round().clamp(-limit, limit)
+
+        layer = cls(linear.in_features, linear.out_features, linear.bias is not None, weight_dtype, linear.weight.dtype, linear.weight.device)
+        layer.weight.data = quantized.to(weight_dtype)
+        layer.weight_scale.copy_(scale)
+        if linear.bias is not None:
+            layer.bias.data = linear.bias.data
+        return layer
+
+    def forward(self, x):
+        weight = self.weight.to(x.dtype) * self.weight_scale.to(x.dtype)
+        return F.linear(x, weight, self.bias)
+
+    def extra_repr(self) -> str:
+        return f"in_features={self.in_features}, out_features={self.out_features}, bias={self.bias is not None}, weight_dtype={self.weight.dtype}"
+
+
+def _replace(module: torch.nn.Module, name: str, layer: torch.nn.Module):
+    parent_name, _, child = name.rpartition(".")
+    setattr(module.get_submodule(parent_name) if parent_name else module, child, layer)
+
+
+def quantize_module(module: torch.nn.Module, mode: str) -> int:
+    # swaps the block linears of `module` for QuantizedLinear in place
+    # -> number of layers quantized
+    if mode not in QUANTIZE_MODES:
+        raise ValueError(f"Unknown quantization mode {mode}")
+
+    # layers the model wants in full precision, e.g. T5's "wo", which it
+    # also casts its input to the weight dtype of
+    keep = getattr(module, "_keep_in_fp32_modules", None) or []
+
+    layers = []
+    for name, m in module.named_modules():
+        if isinstance(m, torch.nn.Linear) and BLOCK_LAYER.search(name + ".") and not set(keep) & set(name.split(".")):
+            layers.append((name, m))
+    for name, linear in layers:
+        _replace(module, name, QuantizedLinear.from_linear(linear, mode))
+    return len(layers)
+
+
+def quantize_pipeline(pipe, mode: str, components=QUANTIZED_COMPONENTS) -> dict:
+    # -> component name -> layers quantized
+    counts = {}
+    for name, component in pipe.components.items():
+        if name in components or type(component).__name__ in components:
+            counts[name] = quantize_module(component, mode)
+    return counts
+
+
+def prepare_quantized(module: torch.nn.Module, state_dict: dict):
+    # Before loading a quantized state dict into a freshly built (meta)
+    # module: every linear with a stored weight_scale becomes an empty
+    # QuantizedLinear of the stored dtype.
+    for key in state_dict:
+        if not key.endswith(".weight_scale"):
+            continue
+        name = key[: -len(".weight_scale")]
+        linear = module.get_submodule(name)
+        layer = QuantizedLinear(
+            linear.in_features,
+            linear.out_features,
+            f"{name}.bias" in state_dict,
+            state_dict[f"{name}.weight"].dtype,
+            state_dict[key].dtype,
+            device="meta",
+        )
+        _replace(module, name, layer)
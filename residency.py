@@ -0,0 +1,186 @@
+import gc
+import threading
+import time
+from collections import OrderedDict
+
+import torch
+
+GPU, HOST, DISK = "gpu", "host", "disk"
+
+
+def module_tensors(pipe) -> list:
+    tensors = []
+    for component in pipe.components.values():
+        if isinstance(component, torch.nn.Module):
+            tensors += list(component.parameters()) + list(component.buffers())
+    return tensors
+
+
+class _Resident:
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.tier = DISK
+        self.pipe = None
+        self.host_copies = []  # (tensor in the pipeline, its copy in host memory)
+        self.bytes = 0
+
+        self.requests = 0
+        self.hits = 0
+        self.loads = 0
+        self.load_seconds = 0.0
+        self.swap_ins = 0
+        self.swap_in_seconds = 0.0
+        self.last_swap_in_seconds = None
+
+
+class PipelinePool:
+    # Several pipelines sharing one device. Recently used ones stay on the
+    # device, within vram_budget bytes of weights; the others are demoted to
+    # a pinned host copy, and past host_budget bytes dropped back to disk,
+    # least recently used first. `loaders` maps name -> callable returning
+    # the pipeline on the CPU.
+    #
+    # A pipeline keeps its host copy while it is on the device, so demoting
+    # it only repoints its tensors; weights never change after loading.
+
+    def __init__(self, loaders: dict, vram_budget: int, host_budget: int, device: str = "cuda"):
+        self.vram_budget = vram_budget
+        self.host_budget = host_budget
+        self.device = torch.device(device)
+        self.pin = self.device.type == "cuda"
+
+        self.demotions = 0
+        self.drops = 0
+
+        self._entries = OrderedDict((name, _Resident(name, loader)) for name, loader in loaders.items())
+        self._lock = threading.Lock()
+
+    def _bytes(self, tier: str) -> int:
+        tiers = (GPU,) if tier == GPU else (GPU, HOST)
+        return sum(e.bytes for e in self._entries.values() if e.tier in tiers)
+
+    def _load(self, entry: _Resident):
+        start = time.perf_counter()
+        pipe = entry.loader()
+        entry.host_copies = []
+        for tensor in module_tensors(pipe):
+            copy = tensor.data.to("cpu")
+            if self.pin:
+                copy = copy.pin_memory()
+            tensor.data = copy
+            entry.host_copies.append((tensor, copy))
+
+        entry.pipe = pipe
+        entry.bytes = sum(copy.nbytes for _, copy in entry.host_copies)
+        entry.tier = HOST
+        entry.loads += 1
+        entry.load_seconds += time.perf_counter() - start
+
+    def _promote(self, entry: _Resident):
+        start = time.perf_counter()
+        for tensor, copy in entry.host_copies:
+            tensor.data = copy.to(self.device, non_blocking=self.pin)
+        if self.pin:
+            torch.cuda.synchronize(self.device)
+
+        elapsed = time.perf_counter() - start
+        entry.tier = GPU
+        entry.swap_ins += 1
+        entry.swap_in_seconds += elapsed
+        entry.last_swap_in_seconds = elapsed
+
+    def _demote(self, entry: _Resident):
+        for tensor, copy in entry.host_copies:
+            tensor.data = copy
+        entry.tier = HOST
+        self.demotions += 1
+
+    def _drop(self, entry: _Resident):
+        if entry.tier == GPU:
+            self._demote(entry)
+        entry.pipe = None
+        entry.host_copies = []
+        entry.tier = DISK
+        self.drops += 1
+        gc.collect()
+
+    def _make_room(self, tier: str, needed: int, keep: _Resident):
+        budget = self.vram_budget if tier == GPU else self.host_budget
+        for entry in list(self._entries.values()):  # least recently used first
+            if self._bytes(tier) + needed <= budget:
+                break
+            if entry is keep:
+                continue
+            if tier == GPU and entry.tier == GPU:
+                self._demote(entry)
+            elif tier == HOST and entry.tier != DISK:
+                self._drop(entry)
+
+        if tier == GPU and self.pin:
+            torch.cuda.empty_cache()
+
+    def tier(self, name: str) -> str:
+        # where the pipeline is now: GPU, HOST or DISK
+        with self._lock:
+            return self._entries[name].tier
+
+    def acquire(self, name: str):
+        # the pipeline, on the device; only call from one thread at a time
+        # per pipeline, since the next acquire may move another one off
+        with self._lock:
+            entry = self._entries[name]
+            self._entries.move_to_end(name)
+            entry.requests += 1
+
+            if entry.tier == GPU:
+                entry.hits += 1
+                return entry.pipe
+
+            if entry.tier == DISK:
+                self._load(entry)
+                # the new copy counts as soon as it exists
+                self._make_room(HOST, 0, keep=entry)
+
+            self._make_room(GPU, entry.bytes, keep=entry)
+            self._promote(entry)
+            return entry.pipe
+
+    def prefetch(self, names=None):
+        # loads pipelines into host memory ahead of their first request, as
+        # far as host_budget allows
+        with self._lock:
+            for name in names or list(self._entries):
+                entry = self._entries[name]
+                if entry.tier != DISK:
+                    continue
+                self._load(entry)
+                if self._bytes(HOST) > self.host_budget:
+                    self._drop(entry)
+                    break
+
+    def stats(self) -> dict:
+        with self._lock:
+            pipelines = {}
+            for name, e in self._entries.items():
+                pipelines[name] = {
+                    "tier": e.tier,
+                    "bytes": e.bytes,
+                    "requests": e.requests,
+                    "hit_rate": e.hits / e.requests if e.requests else None,
+                    "loads": e.loads,
+                    "mean_load_s": e.load_seconds / e.loads if e.loads else None,
+                    "swap_ins": e.swap_ins,
+                    "mean_swap_in_s": e.swap_in_seconds / e.swap_ins if e.swap_ins else None,
+                    "last_swap_in_s": e.last_swap_in_seconds,
+                }
+
+            return {
+                "device_bytes": self._bytes(GPU),
+                "vram_budget": self.vram_budget,
+                "host_bytes": self._bytes(HOST),
+                "host_budget": self.host_budget,
+                "demotions": self.demotions,
+                "drops": self.drops,
+                "pipelines": pipelines,
+            }
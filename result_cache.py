@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# the request fields that decide what a generator produces
+CACHE_KEY_FIELDS = ("model_id", "prompt", "width", "height", "iterations", "guidance", "seed", "numberImages", "step_cache", "format", "quality")
+
+# the ones that only decide how its images are encoded; a render cached in
+# one encoding is transcoded for requests that ask for another
+ENCODING_FIELDS = ("format", "quality")
+RENDER_KEY_FIELDS = tuple(field for field in CACHE_KEY_FIELDS if field not in ENCODING_FIELDS)
+
+
+def normalize_request(request: dict) -> dict:
+    seed = request.get("seed")
+    guidance = request.get("guidance")
+    # a threshold of 0 skips nothing, the same as no step cache
+    step_cache = request.get("step_cache")
+    return {
+        "model_id": request["model_id"],
+        "prompt": " ".join(request["prompt"].split()),
+        "width": int(request["width"]),
+        "height": int(request["height"]),
+        "iterations": int(request["iterations"]),
+        "guidance": round(float(guidance), 4) if guidance is not None else None,
+        "seed": int(seed) if seed is not None else None,
+        "numberImages": int(request.get("numberImages") or 1),
+        "step_cache": round(float(step_cache), 4) if step_cache else None,
+        "format": request.get("format"),
+        "quality": request.get("quality"),
+    }
+
+
+def cache_key(request: dict, fields: tuple = CACHE_KEY_FIELDS) -> str:
+    normalized = normalize_request(request)
+    encoded = json.dumps([normalized[field] for field in fields], separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def render_key(request: dict) -> str:
+    # the same for requests that differ only in their encoding
+    return "r-" + cache_key(request, RENDER_KEY_FIELDS)
+
+
+class DiskResultCache:
+    # Bytes stored under a cache key (the web tier keeps each request's result
+    # there), evicting the least recently read entries once the directory
+    # grows past max_bytes.
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.size = 0
+
+        self._entries = OrderedDict()  # key -> size, least recently used first
+        self._lock = threading.Lock()
+
+        os.makedirs(root, exist_ok=True)
+        self._scan()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def _scan(self):
+        found = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                if name.endswith(".tmp"):
+                    os.remove(path)
+                    continue
+                stat = os.stat(path)
+                found.append((stat.st_mtime, name, stat.st_size))
+
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self.size += size
+        self._evict()
+
+    def _evict(self):
+        while self.size > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self.size -= size
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.size -= self._entries.pop(key, 0)
+            return None
+
+        # mtime doubles as the recency used to rebuild the LRU order on restart
+        os.utime(path)
+        return data
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self.size -= self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self.size += len(data)
+            self._evict()
+
+
+class InflightJobs:
+    # Cache key <-> spawned job id for requests that haven't produced a result
+    # yet, so identical requests can share one job. Entries nobody finishes
+    # (e.g. the client never polled) expire after ttl seconds.
+
+    def __init__(self, ttl: float = 900, max_completed: int = 10_000):
+        self.ttl = ttl
+        self.max_completed = max_completed
+        self._jobs = {}  # key -> (job_id, started_at)
+        self._keys = {}  # job_id -> key
+        self._completed = OrderedDict()  # job_id -> key, for jobs whose result is cached
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        for key, (job_id, started_at) in list(self._jobs.items()):
+            if started_at < cutoff:
+                del self._jobs[key]
+                self._keys.pop(job_id, None)
+
+    def get(self, key: str) -> str | None:
+        self._expire()
+        entry = self._jobs.get(key)
+        return entry[0] if entry else None
+
+    def add(self, key: str, job_id: str):
+        self._jobs[key] = (job_id, time.monotonic())
+        self._keys[job_id] = key
+
+    def key_for(self, job_id: str) -> str | None:
+        return self._keys.get(job_id) or self._completed.get(job_id)
+
+    def discard(self, job_id: str):
+        # forgets a job that won't produce a result
+        key = self._keys.pop(job_id, None)
+        if key is not None and self._jobs.get(key, (None,))[0] == job_id:
+            del self._jobs[key]
+
+    def finish(self, job_id: str) -> str | None:
+        key = self._keys.pop(job_id, None)
+        if key is not None:
+            self._jobs.pop(key, None)
+            # later polls for this job can be answered from the result cache
+            self._completed[job_id] = key
+            while len(self._completed) > self.max_completed:
+                self._completed.popitem(last=False)
+        return key
@@ -0,0 +1,248 @@
+import asyncio
+import itertools
+import math
+import time
+import uuid
+from collections import Counter
+from contextlib import asynccontextmanager
+
+# lower runs first; within a class, subjects share fairly
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+# finished jobs are kept this long for their results to be collected
+JOB_TTL = 900
+
+
+class QueueFull(Exception):
+    def __init__(self, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class JobCancelled(Exception):
+    # a job that stopped because someone asked it to
+    pass
+
+
+class Ticket:
+    # One admitted piece of GPU work, waiting for or holding a slot.
+
+    def __init__(self, class_name: str, model_id: str, subject: str, priority: str, start_tag: float, seq: int):
+        self.id = f"sq-{uuid.uuid4().hex}"
+        self.class_name = class_name
+        self.model_id = model_id
+        self.subject = subject
+        self.subjects = {subject}  # everyone whose request the job serves
+        self.priority = priority
+        self.start_tag = start_tag
+        self.seq = seq
+
+        self.granted = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+        self.task = None  # for submitted jobs, the task doing the work
+        self.cancelled = False  # set once someone asked for the job to stop
+
+    def sort_key(self):
+        return (PRIORITIES[self.priority], self.start_tag, self.seq)
+
+
+class FairScheduler:
+    # Admission control and ordering for work sent to the generators.
+    #
+    # Each serving class runs at most capacity[class] jobs at once; the rest
+    # wait in a queue bounded per model (max_queue) and per subject
+    # (max_queued_per_subject). Waiting jobs go out by priority class, then
+    # by start-time fair queueing over JWT subjects, so a subject with
+    # weight w gets w times the share of a subject with weight 1 and nobody
+    # is starved by someone else's backlog. Everything runs on the event
+    # loop; no locks needed.
+
+    def __init__(
+        self,
+        capacity: dict,
+        max_queue: dict,
+        max_queued_per_subject: int = 8,
+        weights: dict | None = None,
+        service_time: float = 30.0,
+        smoothing: float = 0.2,
+    ):
+        self.capacity = capacity  # class name -> concurrent jobs
+        self.max_queue = max_queue  # model_id -> queued jobs
+        self.max_queued_per_subject = max_queued_per_subject
+        self.weights = weights or {}  # subject -> weight, default 1
+        self.initial_service_time = service_time
+        self.smoothing = smoothing
+
+        self.service_time = {}  # class name -> moving average of seconds per job
+        self.admitted = Counter()
+        self.rejected = Counter()
+        self.jobs = {}  # id -> Ticket, for submitted jobs
+        self.tickets = {}  # id -> Ticket, for every job until it releases its slot
+
+        self._queued = {}  # class name -> [Ticket]
+        self._running = Counter()
+        self._virtual_time = Counter()  # class name -> start tag of the last dispatched job
+        self._last_finish = {}  # (class name, subject) -> finish tag of their last job
+        self._seq = itertools.count()
+
+    def service_estimate(self, class_name: str) -> float:
+        # seconds a job of the class holds its slot, on average
+        return self.service_time.get(class_name, self.initial_service_time)
+
+    def retry_after(self, class_name: str) -> int:
+        # seconds until the queue ahead has had a round of service
+        depth = len(self._queued.get(class_name, ()))
+        rounds = max(1, depth) / self.capacity.get(class_name, 1)
+        return max(1, math.ceil(rounds * self.service_estimate(class_name)))
+
+    def check(self, class_name: str, model_id: str, subject: str):
+        # raises QueueFull when the model's or the subject's queue is full
+        queued = self._queued.setdefault(class_name, [])
+
+        if sum(1 for t in queued if t.model_id == model_id) >= self.max_queue.get(model_id, 0):
+            self.rejected[model_id] += 1
+            raise QueueFull(f"Too many queued jobs for {model_id}", self.retry_after(class_name))
+        if sum(1 for t in queued if t.subject == subject) >= self.max_queued_per_subject:
+            self.rejected[model_id] += 1
+            raise QueueFull("Too many of your jobs are queued", self.retry_after(class_name))
+
+    def admit(self, class_name: str, model_id: str, subject: str, priority: str = "batch") -> Ticket:
+        self.check(class_name, model_id, subject)
+        queued = self._queued[class_name]
+
+        # start-time fair queueing: a subject's next job starts where their
+        # last one finished, or now if they have been idle
+        start = max(self._virtual_time[class_name], self._last_finish.get((class_name, subject), 0.0))
+        self._last_finish[(class_name, subject)] = start + 1.0 / self.weights.get(subject, 1.0)
+
+        ticket = Ticket(class_name, model_id, subject, priority, start, next(self._seq))
+        queued.append(ticket)
+        self.tickets[ticket.id] = ticket
+        self.admitted[model_id] += 1
+        self._dispatch(class_name)
+        return ticket
+
+    def _dispatch(self, class_name: str):
+        queued = self._queued.get(class_name, [])
+        while queued and self._running[class_name] < self.capacity.get(class_name, 1):
+            ticket = min(queued, key=Ticket.sort_key)
+            queued.remove(ticket)
+            if ticket.granted.cancelled():
+                # its waiter is being cancelled and will not run
+                continue
+            self._virtual_time[class_name] = ticket.start_tag
+            ticket.started_at = time.monotonic()
+            self._running[class_name] += 1
+            ticket.granted.set_result(None)
+
+        # subjects whose last finish is behind the virtual clock start fresh anyway
+        if len(self._last_finish) > 4096:
+            for key, finish in list(self._last_finish.items()):
+                if finish <= self._virtual_time[key[0]]:
+                    del self._last_finish[key]
+
+    def release(self, ticket: Ticket, ok: bool = True):
+        ticket.finished_at = time.monotonic()
+        class_name = ticket.class_name
+        self.tickets.pop(ticket.id, None)
+
+        if ticket.started_at is None:
+            # gave up while still queued
+            queued = self._queued.get(class_name, [])
+            if ticket in queued:
+                queued.remove(ticket)
+            return
+
+        self._running[class_name] -= 1
+        if ok:
+            elapsed = ticket.finished_at - ticket.started_at
+            previous = self.service_time.get(class_name)
+            self.service_time[class_name] = elapsed if previous is None else previous + self.smoothing * (elapsed - previous)
+        self._dispatch(class_name)
+
+    def position(self, ticket: Ticket) -> int:
+        # 1 for the next job to go out, 0 once it is running
+        if ticket.started_at is not None:
+            return 0
+        key = ticket.sort_key()
+        return 1 + sum(1 for t in self._queued.get(ticket.class_name, ()) if t.sort_key() < key)
+
+    def estimated_wait(self, ticket: Ticket) -> float:
+        position = self.position(ticket)
+        if position == 0:
+            return 0.0
+        rounds = math.ceil(position / self.capacity.get(ticket.class_name, 1))
+        return rounds * self.service_estimate(ticket.class_name)
+
+    @asynccontextmanager
+    async def slot(self, ticket: Ticket):
+        # waits for the ticket's turn and holds its slot for the block;
+        # leaving early, e.g. on a client disconnect, frees the queue spot
+        ok = False
+        try:
+            await ticket.granted
+            yield
+            ok = True
+        finally:
+            self.release(ticket, ok)
+
+    async def run(self, ticket: Ticket, work):
+        async with self.slot(ticket):
+            return await work()
+
+    def submit(self, ticket: Ticket, work):
+        # runs work() in the background; collect the outcome with result()
+        self._expire()
+        ticket.task = asyncio.create_task(self.run(ticket, work))
+        self.jobs[ticket.id] = ticket
+
+    def cancel(self, ticket: Ticket) -> bool:
+        # Drops a job that is still queued; False once it holds a slot, when
+        # only the generator can stop it. A caller waiting in slot() gets
+        # JobCancelled.
+        ticket.cancelled = True
+        if ticket.started_at is not None or ticket.finished_at is not None:
+            return False
+        # released here rather than by the task, which may not have started
+        self.release(ticket, ok=False)
+        if ticket.task is not None:
+            ticket.granted.cancel()
+            ticket.task.cancel()
+        else:
+            ticket.granted.set_exception(JobCancelled("Job was cancelled"))
+        return True
+
+    async def result(self, job_id: str, timeout: float = 0):
+        # the submitted job's result; TimeoutError if it isn't done in time,
+        # JobCancelled if it was dropped from the queue
+        task = self.jobs[job_id].task
+        if not task.done():
+            if timeout <= 0:
+                raise TimeoutError()
+            try:
+                await asyncio.wait_for(asyncio.shield(task), timeout)
+            except asyncio.CancelledError:
+                if not task.cancelled():
+                    raise
+        if task.cancelled():
+            raise JobCancelled("Job was cancelled")
+        return task.result()
+
+    def _expire(self):
+        cutoff = time.monotonic() - JOB_TTL
+        for job_id, ticket in list(self.jobs.items()):
+            if ticket.finished_at is not None and ticket.finished_at < cutoff:
+                del self.jobs[job_id]
+
+    def stats(self) -> dict:
+        return {
+            "queued": {name: len(queued) for name, queued in self._queued.items()},
+            "running": dict(self._running),
+            "capacity": dict(self.capacity),
+            "service_time": dict(self.service_time),
+            "admitted": dict(self.admitted),
+            "rejected": dict(self.rejected),
+        }
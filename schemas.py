@@ -0,0 +1,34 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+class ModelInfo(BaseModel):
+    id: str
+    name: str
+    description: str
+    available: bool
+    tags: List[str]
+    trigger_word: str | None
+    icon_url: str | None
+    
+class ImageRequest(BaseModel):
+    prompt: str
+    model_id: str
+    height: int | None = 1024
+    width: int | None = 1024
+    iterations: int | None = None  # the model's default_steps when unset
+    guidance: float | None = 3.5
+    seed: float | None = None
+    # images from one pipeline call, seeded seed, seed + 1, ...; how many fit
+    # depends on the size (see model_registry.plan_resolution)
+    numberImages: int | None = Field(1, ge=1)
+    format: str | None = None  # png, webp, jpeg or avif; negotiated from Accept when unset
+    quality: int | None = Field(None, ge=1, le=100)
+    # reuse denoiser work between steps that change less than this; higher is
+    # faster and less exact, unset or 0 runs every step (FLUX and SD3 only)
+    step_cache: float | None = Field(None, ge=0, le=1)
+
+class JobStatusRequest(BaseModel):
+    job_ids: List[str] = Field(min_length=1, max_length=100)
+    wait: float = Field(0, ge=0)
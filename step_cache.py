@@ -0,0 +1,110 @@
+import torch
+
+# Step-level caching for the FLUX and SD3 transformers, in the style of
+# first-block caching / TeaCache. Every denoising step runs the first block;
+# when its output moved less than `threshold` (relative L1, accumulated over
+# the steps skipped since the last full pass) the remaining blocks are not
+# run, and each adds back the residual it produced the last time it ran.
+# Blocks keep their names, so LoRA loading and residency see the same
+# modules as without the cache. Compiled generators compile each block's own
+# forward under the cache (compile_blocks), so the skip decisions stay in
+# eager Python and never become guards that recompile a graph.
+
+
+class StepCache:
+    def __init__(self):
+        self.threshold = 0.0
+        self.start(0.0)
+
+    def start(self, threshold: float):
+        # call before every pipeline run; a threshold of 0 turns caching off
+        self.threshold = threshold or 0.0
+        self.previous = None  # first block's residual at the last step
+        self.accumulated = 0.0
+        self.skip = False
+        self.residuals = {}  # block -> residuals from its last run
+        self.steps = 0
+        self.computed = 0
+
+    def decide(self, residual: torch.Tensor):
+        # after the first block of a step: skip the rest of this step?
+        self.steps += 1
+        skip = False
+        if self.previous is not None and self.previous.shape == residual.shape:
+            change = ((residual - self.previous).abs().mean() / self.previous.abs().mean().clamp(min=1e-8)).item()
+            self.accumulated += change
+            skip = self.accumulated < self.threshold
+
+        if not skip:
+            self.accumulated = 0.0
+            self.computed += 1
+        self.previous = residual
+        self.skip = skip
+
+
+def _residuals(output, hidden, encoder):
+    # blocks return hidden_states, or (encoder_hidden_states, hidden_states)
+    if isinstance(output, tuple):
+        encoder_out, hidden_out = output
+        return (None if encoder_out is None else encoder_out - encoder, hidden_out - hidden)
+    return output - hidden
+
+
+def _apply(residuals, hidden, encoder):
+    if isinstance(residuals, tuple):
+        encoder_residual, hidden_residual = residuals
+        return (None if encoder_residual is None else encoder + encoder_residual, hidden + hidden_residual)
+    return hidden + residuals
+
+
+def _wrap(block, cache: StepCache, first: bool):
+    # the block's own forward stays reachable as block.uncached_forward, for
+    # compile_blocks to swap for a compiled one
+    block.uncached_forward = block.forward
+
+    def cached_forward(*args, **kwargs):
+        forward = block.uncached_forward
+        if not cache.threshold:
+            return forward(*args, **kwargs)
+
+        hidden = kwargs["hidden_states"] if "hidden_states" in kwargs else args[0]
+        encoder = kwargs.get("encoder_hidden_states")
+
+        if not first and cache.skip and block in cache.residuals:
+            return _apply(cache.residuals[block], hidden, encoder)
+
+        output = forward(*args, **kwargs)
+        residuals = _residuals(output, hidden, encoder)
+        if first:
+            cache.decide(residuals[-1] if isinstance(residuals, tuple) else residuals)
+        else:
+            cache.residuals[block] = residuals
+        return output
+
+    block.forward = cached_forward
+
+
+def _blocks(transformer) -> list:
+    return list(transformer.transformer_blocks) + list(getattr(transformer, "single_transformer_blocks", []))
+
+
+def enable_step_cache(transformer) -> StepCache:
+    # hooks the transformer's blocks; the cache stays off until start()
+    cache = StepCache()
+    for i, block in enumerate(_blocks(transformer)):
+        _wrap(block, cache, first=i == 0)
+    transformer.step_cache = cache
+    return cache
+
+
+def compile_blocks(transformer, **compile_args):
+    # Compiles every block of a transformer with the step cache enabled, in
+    # place of compiling the whole transformer: the blocks of a kind share
+    # one graph per shape, and whether a step is skipped is decided between
+    # them, outside anything compiled.
+    for block in _blocks(transformer):
+        block.uncached_forward = torch.compile(block.uncached_forward, **compile_args)
+
+
+def step_cache_for(pipe) -> StepCache | None:
+    return getattr(getattr(pipe, "transformer", None), "step_cache", None)
@@ -0,0 +1,45 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ledger import scratch_ledger
+from model_registry import MODELS, capacities, model_list, queue_limits
+from object_store import LocalObjectStore
+from result_cache import DiskResultCache
+from scheduler import FairScheduler
+from web import create_web_app
+
+ASSET_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "images")
+
+
+class AllowAll:
+    # every token is valid and names its own subject
+    async def verify(self, token: str) -> dict:
+        return {"sub": token, "exp": 2**40}
+
+
+@pytest.fixture
+def make_app():
+    # the web app on `backend`, with a throwaway result cache, ledger and
+    # object store; keyword arguments replace any of create_web_app's
+    def make(backend, **overrides):
+        args = dict(
+            backend=backend,
+            verifier=AllowAll(),
+            model_registry=MODELS,
+            model_list=model_list(),
+            asset_dir=ASSET_DIR,
+            result_cache=DiskResultCache(tempfile.mkdtemp(), 10**8),
+            scheduler=FairScheduler(capacities(), queue_limits()),
+            ledger=scratch_ledger(),
+            object_store=LocalObjectStore(tempfile.mkdtemp()),
+            url_secret=b"test",
+        )
+        args.update(overrides)
+        return create_web_app(**args)
+
+    return make
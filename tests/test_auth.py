@@ -0,0 +1,141 @@
+import asyncio
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import JWTError, jwt
+
+from auth import JWKSCache, JWKSUnavailable, TokenVerifier
+from backend import FakeBackend
+
+AUDIENCE = "https://api.test"
+ISSUER = "https://idp.test/"
+KID = "test-key"
+
+
+def b64(number: int) -> str:
+    raw = number.to_bytes((number.bit_length() + 7) // 8, "big")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+PRIVATE_KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+PRIVATE_PEM = PRIVATE_KEY.private_bytes(
+    serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+).decode()
+NUMBERS = PRIVATE_KEY.public_key().public_numbers()
+JWKS = {"keys": [{"kty": "RSA", "kid": KID, "use": "sig", "n": b64(NUMBERS.n), "e": b64(NUMBERS.e)}]}
+
+
+class JWKSHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps(JWKS).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.fetches += 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def jwks_server():
+    # a stand-in for the IdP's JWKS endpoint on a local port
+    server = ThreadingHTTPServer(("127.0.0.1", 0), JWKSHandler)
+    server.fetches = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def url_of(server) -> str:
+    host, port = server.server_address
+    return f"http://{host}:{port}/.well-known/jwks.json"
+
+
+def closed_url() -> str:
+    # a port nothing listens on
+    server = ThreadingHTTPServer(("127.0.0.1", 0), JWKSHandler)
+    url = url_of(server)
+    server.server_close()
+    return url
+
+
+def token(kid: str = KID, subject: str = "user") -> str:
+    claims = {"sub": subject, "aud": AUDIENCE, "iss": ISSUER, "exp": int(time.time()) + 600}
+    return jwt.encode(claims, PRIVATE_PEM, algorithm="RS256", headers={"kid": kid})
+
+
+def verifier(url: str) -> TokenVerifier:
+    return TokenVerifier(JWKSCache(url, timeout=1.0), AUDIENCE, ISSUER, ["RS256"])
+
+
+def test_valid_token_is_verified(jwks_server):
+    payload = asyncio.run(verifier(url_of(jwks_server)).verify(token()))
+
+    assert payload["sub"] == "user"
+    assert jwks_server.fetches == 1
+
+
+def test_unknown_kid_is_rejected(jwks_server):
+    with pytest.raises(JWTError):
+        asyncio.run(verifier(url_of(jwks_server)).verify(token(kid="someone-else")))
+
+
+def test_cached_keys_outlive_the_idp(jwks_server):
+    check = verifier(url_of(jwks_server))
+    check.jwks.ttl = 0
+
+    async def run():
+        await check.verify(token(subject="before"))
+        jwks_server.shutdown()
+        jwks_server.server_close()
+        # the refresh fails, but the keys from the first fetch still verify
+        return await check.verify(token(subject="after"))
+
+    assert asyncio.run(run())["sub"] == "after"
+
+
+def test_cold_cache_without_idp_is_unavailable():
+    with pytest.raises(JWKSUnavailable):
+        asyncio.run(verifier(closed_url()).verify(token()))
+
+
+def test_app_answers_503_without_idp(make_app):
+    app = make_app(FakeBackend(), verifier=verifier(closed_url()))
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/models", headers={"Authorization": f"Bearer {token()}"})
+
+    response = asyncio.run(run())
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "30"
+
+
+def test_app_accepts_tokens_signed_by_the_idp(jwks_server, make_app):
+    app = make_app(FakeBackend(), verifier=verifier(url_of(jwks_server)))
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            good = await client.get("/generate", params={"prompt": "a", "model_id": "flux"}, headers={"Authorization": f"Bearer {token()}"})
+            bad = await client.get("/generate", params={"prompt": "a", "model_id": "flux"}, headers={"Authorization": f"Bearer {token(kid='someone-else')}"})
+            return good, bad
+
+    good, bad = asyncio.run(run())
+
+    assert good.status_code == 200
+    assert bad.status_code == 403
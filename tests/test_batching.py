@@ -0,0 +1,126 @@
+import threading
+import time
+
+import pytest
+
+from batching import MicroBatcher
+
+
+class Recorder:
+    # run_batch that remembers every batch it was given, optionally blocking
+    # until released so submissions can pile up behind it
+    def __init__(self, gate: threading.Event | None = None):
+        self.batches = []
+        self.gate = gate
+
+    def __call__(self, items: list) -> list:
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.batches.append(list(items))
+        return [item * 10 for item in items]
+
+
+def test_items_with_the_same_key_share_a_batch():
+    gate = threading.Event()
+    run_batch = Recorder(gate)
+    batcher = MicroBatcher(run_batch, max_batch_size=4, max_wait=0.2)
+
+    # the first call holds the worker while the rest queue up
+    blocker = batcher.enqueue("warm", 0)
+    time.sleep(0.05)
+    futures = [batcher.enqueue(key, i) for i, key in enumerate(["a", "b", "a", "b", "a"], start=1)]
+    gate.set()
+
+    assert blocker.result(5) == (0, 1)
+    assert [f.result(5) for f in futures] == [(10, 3), (20, 2), (30, 3), (40, 2), (50, 3)]
+    assert run_batch.batches == [[0], [1, 3, 5], [2, 4]]
+
+
+def test_batches_are_capped_at_max_batch_size():
+    gate = threading.Event()
+    run_batch = Recorder(gate)
+    batcher = MicroBatcher(run_batch, max_batch_size=4, max_wait=0.2)
+
+    batcher.enqueue("warm", 0)
+    time.sleep(0.05)
+    futures = [batcher.enqueue("k", i) for i in range(1, 7)]
+    gate.set()
+
+    assert [f.result(5)[1] for f in futures] == [4, 4, 4, 4, 2, 2]
+    assert run_batch.batches[1:] == [[1, 2, 3, 4], [5, 6]]
+
+
+def test_batch_limit_follows_the_first_item():
+    gate = threading.Event()
+    run_batch = Recorder(gate)
+    batcher = MicroBatcher(run_batch, max_batch_size=4, max_wait=0.2, batch_limit=lambda item: 2)
+
+    batcher.enqueue("warm", 0)
+    time.sleep(0.05)
+    futures = [batcher.enqueue("k", i) for i in range(1, 6)]
+    gate.set()
+
+    assert [f.result(5)[1] for f in futures] == [2, 2, 2, 2, 1]
+
+
+def test_a_lone_item_waits_at_most_max_wait():
+    batcher = MicroBatcher(Recorder(), max_batch_size=4, max_wait=0.1)
+
+    start = time.perf_counter()
+    result = batcher.submit("k", 1)
+    elapsed = time.perf_counter() - start
+
+    assert result == (10, 1)
+    assert 0.1 <= elapsed < 0.5
+
+
+def test_a_full_batch_does_not_wait():
+    gate = threading.Event()
+    batcher = MicroBatcher(Recorder(gate), max_batch_size=2, max_wait=5)
+
+    futures = [batcher.enqueue("k", i) for i in (1, 2)]
+    start = time.perf_counter()
+    gate.set()
+    for f in futures:
+        f.result(5)
+
+    assert time.perf_counter() - start < 1
+
+
+def test_a_failed_batch_fails_every_item():
+    def run_batch(items):
+        if 2 in items:
+            raise RuntimeError("out of memory")
+        return items
+
+    batcher = MicroBatcher(run_batch, max_batch_size=4, max_wait=0.1)
+    futures = [batcher.enqueue("k", i) for i in (1, 2, 3)]
+
+    for f in futures:
+        with pytest.raises(RuntimeError, match="out of memory"):
+            f.result(5)
+    # the worker carries on with the next batch
+    assert batcher.submit("k", 4) == (4, 1)
+
+
+def test_wrong_number_of_results_fails_the_batch():
+    batcher = MicroBatcher(lambda items: items[:1], max_batch_size=4, max_wait=0.1)
+    futures = [batcher.enqueue("k", i) for i in (1, 2)]
+
+    for f in futures:
+        with pytest.raises(RuntimeError, match="2 items"):
+            f.result(5)
+
+
+def test_stats_count_batch_sizes():
+    gate = threading.Event()
+    batcher = MicroBatcher(Recorder(gate), max_batch_size=4, max_wait=0.2)
+
+    batcher.enqueue("warm", 0)
+    time.sleep(0.05)
+    futures = [batcher.enqueue("k", i) for i in (1, 2, 3)]
+    gate.set()
+    for f in futures:
+        f.result(5)
+
+    assert batcher.stats() == {"batches": 2, "images": 4, "mean_batch_size": 2.0, "batch_sizes": {1: 1, 3: 1}}
@@ -0,0 +1,53 @@
+import asyncio
+
+import httpx
+
+from backend import FakeBackend
+from model_registry import capacities, queue_limits
+from scheduler import FairScheduler
+
+LATENCY = 1.0
+
+
+async def client_for(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", headers={"Authorization": "Bearer user"})
+
+
+def reclaimed_seconds(metrics: str) -> dict:
+    # outcome -> reclaimed GPU-seconds, summed over models
+    seconds = {}
+    for line in metrics.splitlines():
+        if line.startswith("prompt_forge_reclaimed_gpu_seconds_total{"):
+            labels, value = line.rsplit(" ", 1)
+            outcome = labels.split('outcome="')[1].split('"')[0]
+            seconds[outcome] = seconds.get(outcome, 0.0) + float(value)
+    return seconds
+
+
+def test_reclaimed_seconds_come_from_the_generator(make_app):
+    # one slot per class, so the second job waits in the queue
+    scheduler = FairScheduler({class_name: 1 for class_name in capacities()}, queue_limits())
+    app = make_app(FakeBackend(latency=LATENCY), scheduler=scheduler)
+
+    async def run():
+        async with await client_for(app) as client:
+            running = (await client.post("/start-job", json={"prompt": "a", "model_id": "flux", "iterations": 10})).json()["job_id"]
+            queued = (await client.post("/start-job", json={"prompt": "b", "model_id": "flux", "iterations": 10})).json()["job_id"]
+            await asyncio.sleep(LATENCY / 4)
+
+            dropped = await client.post(f"/jobs/{queued}/cancel")
+            interrupted = await client.post(f"/jobs/{running}/cancel")
+            result = await client.get(f"/result/{running}", params={"wait": 5})
+            metrics = await client.get("/metrics")
+            return dropped, interrupted, result, metrics.text
+
+    dropped, interrupted, result, metrics = asyncio.run(run())
+
+    assert dropped.json() == {"state": "cancelled"}
+    assert interrupted.status_code == 202
+    assert result.status_code == 410
+    seconds = reclaimed_seconds(metrics)
+    # a queued job never held the GPU; the running one gave back the steps
+    # the generator didn't run, not a guessed job length
+    assert seconds.get("dropped", 0.0) == 0.0
+    assert 0 < seconds["interrupted"] < LATENCY
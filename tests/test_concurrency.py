@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+import httpx
+
+from backend import FakeBackend
+
+LATENCY = 0.3
+CALLS = 12
+
+
+async def client_for(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", headers={"Authorization": "Bearer user"})
+
+
+def test_generate_calls_overlap(make_app):
+    backend = FakeBackend(latency=LATENCY)
+    app = make_app(backend)
+
+    async def run():
+        async with await client_for(app) as client:
+            start = time.perf_counter()
+            responses = await asyncio.gather(*(
+                client.get("/generate", params={"prompt": f"prompt {i}", "model_id": "flux"}) for i in range(CALLS)
+            ))
+            return responses, time.perf_counter() - start
+
+    responses, elapsed = asyncio.run(run())
+
+    assert [r.status_code for r in responses] == [200] * CALLS
+    # every call held the backend at once, instead of one after another
+    assert backend.peak_running == CALLS
+    assert elapsed < CALLS * LATENCY / 2
+
+
+def test_submitted_jobs_overlap(make_app):
+    backend = FakeBackend(latency=LATENCY)
+    app = make_app(backend)
+
+    async def run():
+        async with await client_for(app) as client:
+            jobs = await asyncio.gather(*(
+                client.post("/start-job", json={"prompt": f"prompt {i}", "model_id": "flux"}) for i in range(CALLS)
+            ))
+            job_ids = [r.json()["job_id"] for r in jobs]
+            return await asyncio.gather(*(client.get(f"/result/{job_id}", params={"wait": 5}) for job_id in job_ids))
+
+    results = asyncio.run(run())
+
+    assert [r.status_code for r in results] == [200] * CALLS
+    assert backend.peak_running == CALLS
+
+
+def test_event_loop_free_while_jobs_run(make_app):
+    backend = FakeBackend(latency=LATENCY)
+    app = make_app(backend)
+
+    async def run():
+        async with await client_for(app) as client:
+            generating = [
+                asyncio.create_task(client.get("/generate", params={"prompt": f"prompt {i}", "model_id": "flux"}))
+                for i in range(CALLS)
+            ]
+            await asyncio.sleep(LATENCY / 3)
+            start = time.perf_counter()
+            models = await client.get("/models")
+            answered_in = time.perf_counter() - start
+            still_running = backend.running
+            await asyncio.gather(*generating)
+            return models, answered_in, still_running
+
+    models, answered_in, still_running = asyncio.run(run())
+
+    assert models.status_code == 200
+    assert still_running == CALLS
+    assert answered_in < LATENCY / 3
@@ -0,0 +1,138 @@
+import asyncio
+
+from ledger import scratch_ledger
+
+FLUSH_INTERVAL = 0.1
+
+
+def ledger_run(test, **options):
+    # runs `test(ledger)` on a fresh SQLite ledger, closing it afterwards
+    async def run():
+        ledger = scratch_ledger(flush_interval=FLUSH_INTERVAL, **options)
+        try:
+            return await test(ledger)
+        finally:
+            await ledger.close()
+
+    return asyncio.run(run())
+
+
+def queue(ledger, job_id: str, subject: str = "alice"):
+    ledger.queued(job_id, subject, "flux", {"prompt": job_id}, "batch", f"key-{job_id}")
+
+
+def test_changes_are_written_behind_in_one_batch():
+    async def test(ledger):
+        for i in range(5):
+            queue(ledger, f"job-{i}")
+        ledger.running("job-0")
+        before = ledger.stats()
+        await asyncio.sleep(FLUSH_INTERVAL * 3)
+        return before, ledger.stats()
+
+    before, after = ledger_run(test)
+
+    # nothing touches the database until the flush interval has passed
+    assert before["rows_written"] == 0 and before["dirty"] == 5
+    assert after["flushes"] == 1 and after["rows_written"] == 5 and after["dirty"] == 0
+    # live jobs stay in memory
+    assert after["live"] == 5
+
+
+def test_final_records_leave_memory_once_written():
+    async def test(ledger):
+        queue(ledger, "done")
+        queue(ledger, "failed")
+        queue(ledger, "live")
+        ledger.running("done")
+        ledger.finished("done", {"denoise": 1.0}, [7], ["a" * 64 + ".png"])
+        ledger.failed("failed", "boom")
+        await ledger.flush()
+        return ledger.stats(), await ledger.get_many(["done", "failed", "live"])
+
+    stats, records = ledger_run(test)
+
+    assert stats["live"] == 1
+    assert records["done"]["state"] == "done"
+    assert records["done"]["seeds"] == [7]
+    assert records["done"]["timings"] == {"denoise": 1.0}
+    assert records["failed"]["state"] == "failed" and records["failed"]["error"] == "boom"
+    assert records["live"]["state"] == "queued"
+
+
+def test_final_states_are_not_overwritten():
+    async def test(ledger):
+        queue(ledger, "job")
+        ledger.finished("job", {"denoise": 1.0})
+        # a late failure, e.g. a client that went away after the result
+        ledger.failed("job", "Client went away", state="cancelled")
+        in_memory = await ledger.get("job")
+        await ledger.flush()
+        ledger.failed("job", "too late")
+        return in_memory, await ledger.get("job")
+
+    in_memory, written = ledger_run(test)
+
+    for record in (in_memory, written):
+        assert record["state"] == "done"
+        assert record["error"] is None
+
+
+def test_get_many_reads_memory_and_table():
+    async def test(ledger):
+        queue(ledger, "written")
+        ledger.finished("written", {})
+        await ledger.flush()
+        queue(ledger, "live")
+        ledger.running("live")
+        return await ledger.get_many(["written", "live", "unknown"])
+
+    records = ledger_run(test)
+
+    assert set(records) == {"written", "live"}
+    assert records["live"]["state"] == "running"
+    assert records["written"]["result_key"] == "key-written"
+
+
+def test_history_is_newest_first_and_paged():
+    async def test(ledger):
+        for i in range(4):
+            queue(ledger, f"job-{i}")
+            await asyncio.sleep(0.01)
+        queue(ledger, "other", subject="bob")
+        ledger.finished("job-0", {})
+        await ledger.flush()
+        first = await ledger.history("alice", limit=2)
+        rest = await ledger.history("alice", limit=10, before=first[-1]["created_at"])
+        return first, rest
+
+    first, rest = ledger_run(test)
+
+    assert [r["id"] for r in first] == ["job-3", "job-2"]
+    assert [r["id"] for r in rest] == ["job-1", "job-0"]
+
+
+def test_reassign_moves_the_job_to_another_history():
+    async def test(ledger):
+        queue(ledger, "job")
+        ledger.reassign("job", "bob")
+        await ledger.flush()
+        return await ledger.history("alice"), await ledger.history("bob")
+
+    alice, bob = ledger_run(test)
+
+    assert alice == []
+    assert [r["id"] for r in bob] == ["job"]
+
+
+def test_large_flushes_are_split():
+    async def test(ledger):
+        for i in range(25):
+            queue(ledger, f"job-{i}")
+        await ledger.flush()
+        return ledger.stats(), await ledger.get_many([f"job-{i}" for i in range(25)])
+
+    stats, records = ledger_run(test, max_batch=10)
+
+    assert stats["rows_written"] == 25
+    assert len(records) == 25
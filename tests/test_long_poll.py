@@ -0,0 +1,115 @@
+import asyncio
+import time
+
+import httpx
+
+from backend import FakeBackend
+
+
+class PromptLatencyBackend(FakeBackend):
+    # each job takes as many seconds as its prompt says
+    def __init__(self):
+        super().__init__(latency=0)
+
+    async def _generate(self, class_name: str, request: dict):
+        await asyncio.sleep(float(request["prompt"]))
+        return await super()._generate(class_name, request)
+
+
+async def client_for(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", headers={"Authorization": "Bearer user"})
+
+
+async def start(client, seconds: float) -> str:
+    response = await client.post("/start-job", json={"prompt": str(seconds), "model_id": "flux"})
+    assert response.status_code == 200
+    return response.json()["job_id"]
+
+
+async def timed(request):
+    start = time.perf_counter()
+    response = await request
+    return response, time.perf_counter() - start
+
+
+def test_wait_returns_when_the_job_finishes(make_app):
+    app = make_app(PromptLatencyBackend())
+
+    async def run():
+        async with await client_for(app) as client:
+            job_id = await start(client, 0.3)
+            return await timed(client.get(f"/result/{job_id}", params={"wait": 10}))
+
+    response, elapsed = asyncio.run(run())
+
+    assert response.status_code == 200
+    assert response.content.startswith(b"\x89PNG")
+    assert elapsed < 2
+
+
+def test_wait_gives_up_after_its_timeout(make_app):
+    app = make_app(PromptLatencyBackend())
+
+    async def run():
+        async with await client_for(app) as client:
+            job_id = await start(client, 5)
+            no_wait = await timed(client.get(f"/result/{job_id}"))
+            with_wait = await timed(client.get(f"/result/{job_id}", params={"wait": 0.5}))
+            return no_wait, with_wait
+
+    (no_wait, no_wait_elapsed), (with_wait, with_wait_elapsed) = asyncio.run(run())
+
+    assert no_wait.status_code == 202
+    assert no_wait_elapsed < 0.3
+    assert with_wait.status_code == 202
+    assert 0.5 <= with_wait_elapsed < 2
+
+
+def test_status_wakes_on_the_first_change(make_app):
+    app = make_app(PromptLatencyBackend())
+
+    async def run():
+        async with await client_for(app) as client:
+            fast, slow = await start(client, 0.3), await start(client, 10)
+            response, elapsed = await timed(client.post("/results/status", json={"job_ids": [fast, slow], "wait": 20}))
+            return fast, slow, response, elapsed
+
+    fast, slow, response, elapsed = asyncio.run(run())
+
+    assert response.status_code == 200
+    jobs = response.json()["jobs"]
+    assert jobs[fast]["state"] == "done"
+    assert jobs[slow]["state"] == "pending"
+    assert elapsed < 2
+
+
+def test_status_answers_at_once_when_something_is_done(make_app):
+    app = make_app(PromptLatencyBackend())
+
+    async def run():
+        async with await client_for(app) as client:
+            fast, slow = await start(client, 0.1), await start(client, 10)
+            await client.get(f"/result/{fast}", params={"wait": 5})
+            return await timed(client.post("/results/status", json={"job_ids": [fast, slow], "wait": 20}))
+
+    response, elapsed = asyncio.run(run())
+
+    assert response.status_code == 200
+    assert sorted(job["state"] for job in response.json()["jobs"].values()) == ["done", "pending"]
+    assert elapsed < 0.5
+
+
+def test_unknown_job_is_not_found(make_app):
+    app = make_app(PromptLatencyBackend())
+
+    async def run():
+        async with await client_for(app) as client:
+            job_id = await start(client, 0.1)
+            result = await client.get("/result/garbage", params={"wait": 1})
+            status = await client.post("/results/status", json={"job_ids": ["garbage", job_id], "wait": 5})
+            return result, status
+
+    result, status = asyncio.run(run())
+
+    assert result.status_code == 404
+    assert status.json()["jobs"]["garbage"]["state"] == "unknown"
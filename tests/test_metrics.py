@@ -0,0 +1,81 @@
+import asyncio
+
+import httpx
+
+from backend import FakeBackend
+
+
+class CountingBackend(FakeBackend):
+    # results carry whatever counters a test gives the prompt
+    def __init__(self, counters: dict):
+        super().__init__(latency=0)
+        self.counters = counters
+
+    def _result(self, request: dict) -> dict:
+        return {**super()._result(request), "counters": self.counters[request["prompt"]]}
+
+
+def samples(metrics: str, name: str) -> dict:
+    # {label: value} of the `name` series, label being the one besides model
+    values = {}
+    for line in metrics.splitlines():
+        if line.startswith(name + "{"):
+            labels, value = line.rsplit(" ", 1)
+            values[labels.split(",", 1)[1].split('"')[1]] = float(value)
+    return values
+
+
+def metrics_after(app, prompts: list) -> str:
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", headers={"Authorization": "Bearer user"}) as client:
+            for prompt in prompts:
+                job_id = (await client.post("/start-job", json={"prompt": prompt, "model_id": "flux"})).json()["job_id"]
+                assert (await client.get(f"/result/{job_id}", params={"wait": 5})).status_code == 200
+            return (await client.get("/metrics")).text
+
+    return asyncio.run(run())
+
+
+def test_batch_sizes_are_counted_per_job(make_app):
+    backend = CountingBackend({"a": {"batch_size": 2}, "b": {"batch_size": 2}, "c": {"batch_size": 1}})
+
+    metrics = metrics_after(make_app(backend), ["a", "b", "c"])
+
+    assert samples(metrics, "prompt_forge_batched_jobs_total") == {"1": 1.0, "2": 2.0}
+
+
+def test_skipped_steps_are_counted(make_app):
+    backend = CountingBackend({
+        "cached": {"batch_size": 1, "steps_requested": 28, "steps_run": 20},
+        "exact": {"batch_size": 1, "steps_requested": 28, "steps_run": 28},
+    })
+
+    metrics = metrics_after(make_app(backend), ["cached", "exact"])
+
+    assert samples(metrics, "prompt_forge_denoise_steps_total") == {"run": 48.0, "skipped": 8.0}
+
+
+def test_prompt_cache_hits_and_saved_time_are_counted(make_app):
+    backend = CountingBackend({
+        "first": {"batch_size": 1, "prompt_cache": "miss", "encode_saved": 0.0},
+        "again": {"batch_size": 1, "prompt_cache": "hit", "encode_saved": 0.25},
+        "other": {"batch_size": 1, "prompt_cache": "hit", "encode_saved": 0.5},
+    })
+
+    metrics = metrics_after(make_app(backend), ["first", "again", "other"])
+
+    assert samples(metrics, "prompt_forge_prompt_cache_total") == {"hit": 2.0, "miss": 1.0}
+    assert samples(metrics, "prompt_forge_prompt_cache_saved_seconds_total") == {"text_encode": 0.75}
+
+
+def test_pool_swap_ins_are_counted_per_tier(make_app):
+    backend = CountingBackend({
+        "resident": {"batch_size": 1, "pool": "gpu", "pool_acquire": 0.0},
+        "swapped": {"batch_size": 1, "pool": "host", "pool_acquire": 1.5},
+        "again": {"batch_size": 1, "pool": "host", "pool_acquire": 0.5},
+    })
+
+    metrics = metrics_after(make_app(backend), ["resident", "swapped", "again"])
+
+    assert samples(metrics, "prompt_forge_pool_acquires_total") == {"gpu": 1.0, "host": 2.0}
+    assert samples(metrics, "prompt_forge_pool_acquire_seconds_total") == {"gpu": 0.0, "host": 2.0}
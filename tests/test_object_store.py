@@ -0,0 +1,77 @@
+import asyncio
+import tempfile
+import time
+
+import httpx
+
+from backend import FakeBackend
+from object_store import LocalObjectStore, object_key
+
+IMAGE = b"\x89PNG\r\n\x1a\n" + bytes(range(256))
+
+
+class Volume:
+    # a volume whose reload is refused while files are open, `busy` times,
+    # and then brings in what another container wrote
+    def __init__(self, writer: LocalObjectStore, data: bytes, busy: int):
+        self.writer = writer
+        self.data = data
+        self.busy = busy
+        self.reloads = 0
+
+    def reload(self):
+        self.reloads += 1
+        if self.reloads <= self.busy:
+            raise RuntimeError("there are open files preventing the operation")
+        self.writer.put(self.data, "image/png")
+
+
+def test_path_retries_a_refused_reload():
+    root = tempfile.mkdtemp()
+    volume = Volume(LocalObjectStore(root), IMAGE, busy=2)
+    store = LocalObjectStore(root, reload=volume.reload, reload_wait=5)
+
+    path = store.path(object_key(IMAGE, "image/png"))
+
+    assert path is not None
+    assert volume.reloads == 3
+
+
+def test_path_gives_up_after_reload_wait():
+    root = tempfile.mkdtemp()
+    volume = Volume(LocalObjectStore(root), IMAGE, busy=100)
+    store = LocalObjectStore(root, reload=volume.reload, reload_wait=0.5)
+
+    start = time.perf_counter()
+    path = store.path(object_key(IMAGE, "image/png"))
+
+    assert path is None
+    assert 0.5 <= time.perf_counter() - start < 2
+
+
+class VolumeBackend(FakeBackend):
+    # a generator that stored its image on the volume and returns only the key
+    def _result(self, request: dict) -> dict:
+        result = super()._result(request)
+        result["objects"] = [object_key(self.image, "image/png")]
+        del result["image"], result["images"]
+        return result
+
+
+def test_fresh_result_waits_for_the_volume(make_app):
+    root = tempfile.mkdtemp()
+    volume = Volume(LocalObjectStore(root), IMAGE, busy=2)
+    store = LocalObjectStore(root, reload=volume.reload, reload_wait=5)
+    app = make_app(VolumeBackend(latency=0.05, image=IMAGE), object_store=store)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", headers={"Authorization": "Bearer user"}) as client:
+            job = await client.post("/start-job", json={"prompt": "a", "model_id": "flux"})
+            return await client.get(f"/result/{job.json()['job_id']}", params={"wait": 5})
+
+    response = asyncio.run(run())
+
+    assert response.status_code == 200
+    assert response.content == IMAGE
+    assert volume.reloads == 3
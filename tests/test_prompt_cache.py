@@ -0,0 +1,18 @@
+from benchmarks.tiny_pipelines import TINY_PIPELINES
+from prompt_cache import PromptEmbeddingCache
+
+
+def test_cached_matches_how_hits_are_counted():
+    pipe = TINY_PIPELINES["flux"](1)
+    cache = PromptEmbeddingCache(10**8)
+    cache.embeddings(pipe, "flux", ["a cat"], guidance=3.5)
+    hits = cache.hits
+
+    prompts = [" a  cat", "a dog", "a dog"]
+    cached = cache.cached(pipe, "flux", prompts)
+    cache.embeddings(pipe, "flux", prompts, guidance=3.5)
+
+    assert cached == [True, False, True]
+    assert cache.hits - hits == sum(cached)
+    assert cache.cached(pipe, "other-style", ["a cat"]) == [False]
+    assert cache.mean_encode_seconds() > 0
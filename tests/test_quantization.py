@@ -0,0 +1,28 @@
+import pytest
+
+from benchmarks.tiny_pipelines import TINY_PIPELINES
+from model_registry import GENERATORS, MODELS, validate
+from quantization import QuantizedLinear, quantize_pipeline
+
+
+def quantized_layers(module) -> int:
+    return sum(isinstance(m, QuantizedLinear) for m in module.modules())
+
+
+def test_text_encoder_only_leaves_the_transformer_for_lora():
+    pipe = TINY_PIPELINES["flux"](1)
+
+    counts = quantize_pipeline(pipe, "fp8", ("T5EncoderModel",))
+
+    assert list(counts) == ["text_encoder_2"]
+    assert quantized_layers(pipe.text_encoder_2) == counts["text_encoder_2"] > 0
+    assert quantized_layers(pipe.transformer) == 0
+
+
+def test_lora_generators_may_only_quantize_t5():
+    generators = {name: dict(profile) for name, profile in GENERATORS.items()}
+    validate(MODELS, generators)
+
+    del generators["FluxLoraGenerator"]["quantize_components"]
+    with pytest.raises(ValueError, match="can't quantize its transformer"):
+        validate(MODELS, generators)
@@ -0,0 +1,99 @@
+import pytest
+import torch
+
+from benchmarks.tiny_pipelines import TINY_PIPELINES
+from model_registry import MAX_SIDE, MIN_SIDE, apply_profile, plan_resolution
+
+
+def test_a_full_batch_at_1024_needs_no_savers():
+    plan = plan_resolution("FluxLoraGenerator", 1024, 1024)
+
+    assert plan["max_batch"] == 2
+    assert not (plan["vae_slicing"] or plan["vae_tiling"] or plan["attention_slicing"])
+
+
+def test_savers_come_on_cheapest_first_then_the_batch_shrinks():
+    sliced = plan_resolution("FluxLoraGenerator", 1536, 1536)
+    tiled = plan_resolution("FluxLoraGenerator", 2560, 2560)
+
+    assert (sliced["vae_slicing"], sliced["vae_tiling"], sliced["max_batch"]) == (True, False, 2)
+    assert (tiled["vae_slicing"], tiled["vae_tiling"], tiled["max_batch"]) == (True, True, 1)
+    # FLUX has no attention slicing to fall back on
+    assert not tiled["attention_slicing"]
+
+
+def test_attention_slicing_is_the_last_saver_for_unet_pipelines():
+    generators = {"G": {"pipeline": "AutoPipelineForText2Image", "gpu": "A10G", "vram_gb": 20, "max_batch_size": 1}}
+
+    plan = plan_resolution("G", 3072, 3072, generators, pools={})
+
+    assert plan["attention_slicing"] and plan["vae_tiling"]
+    assert plan["max_batch"] == 1
+
+
+def test_sides_round_to_the_pipeline_multiple():
+    flux = plan_resolution("FluxLoraGenerator", 1001, 777)
+    sdxl = plan_resolution("SDXLBaseGenerator", 1001, 777)
+
+    assert (flux["width"], flux["height"]) == (1008, 784)
+    assert (sdxl["width"], sdxl["height"]) == (1000, 776)
+
+
+@pytest.mark.parametrize("width, height", [(MIN_SIDE - 1, 1024), (1024, MAX_SIDE + 1)])
+def test_sizes_out_of_range_are_rejected(width, height):
+    with pytest.raises(ValueError, match="between"):
+        plan_resolution("FluxLoraGenerator", width, height)
+
+
+def test_sizes_too_large_for_memory_are_rejected():
+    with pytest.raises(ValueError, match="needs more GPU memory"):
+        plan_resolution("FluxLoraGenerator", MAX_SIDE, MAX_SIDE)
+
+
+def test_requests_carry_their_plan():
+    request = apply_profile({"model_id": "sd3.5", "prompt": "cat", "width": 2048, "height": 2048})
+
+    assert (request["width"], request["height"]) == (2048, 2048)
+    assert request["memory"]["vae_tiling"]
+    assert request["numberImages"] == 1
+
+
+def test_more_images_than_a_batch_holds_are_rejected():
+    apply_profile({"model_id": "sd3.5", "prompt": "cat", "numberImages": 2})
+
+    with pytest.raises(ValueError, match="at most 1 images"):
+        apply_profile({"model_id": "sd3.5", "prompt": "cat", "width": 2560, "height": 2560, "numberImages": 2})
+
+
+def test_tiled_decode_matches_the_untiled_one():
+    # the tiny VAE tiles at 32 pixels, so a 96 pixel image is decoded in
+    # overlapping tiles that are blended back together
+    vae = TINY_PIPELINES["flux"](1).vae
+    latents = torch.randn(2, vae.config.latent_channels, 48, 48, generator=torch.Generator().manual_seed(0))
+
+    with torch.no_grad():
+        whole = vae.decode(latents).sample
+        vae.enable_slicing()
+        vae.enable_tiling()
+        tiled = vae.decode(latents).sample
+
+    assert tiled.shape == whole.shape == (2, 3, 96, 96)
+    assert torch.isfinite(tiled).all()
+    difference = (tiled - whole).abs().mean()
+    # random weights blend less smoothly than trained ones, but the tiles
+    # still have to land where the untiled image is
+    assert 0 < difference < 0.5 * whole.abs().mean()
+
+
+def test_compiled_generators_render_their_buckets_as_asked():
+    small = apply_profile({"model_id": "flux", "prompt": "cat", "width": 512, "height": 512})
+    wide = apply_profile({"model_id": "flux", "prompt": "cat", "width": 1344, "height": 768})
+
+    assert (small["width"], small["height"]) == (512, 512)
+    assert (wide["width"], wide["height"]) == (1344, 768)
+
+
+@pytest.mark.parametrize("width, height", [(2048, 2048), (640, 640), (1000, 1000)])
+def test_compiled_generators_reject_sizes_without_a_bucket(width, height):
+    with pytest.raises(ValueError, match="renders only these sizes"):
+        apply_profile({"model_id": "flux", "prompt": "cat", "width": width, "height": height})
@@ -0,0 +1,130 @@
+import asyncio
+import tempfile
+from io import BytesIO
+
+import httpx
+from PIL import Image
+
+from backend import FakeBackend
+from encoding import encode_image
+from result_cache import DiskResultCache, InflightJobs, cache_key, render_key
+
+LATENCY = 0.3
+
+
+async def client_for(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", headers={"Authorization": "Bearer user"})
+
+
+def request(**fields) -> dict:
+    return {"model_id": "flux", "prompt": "a red fox", "width": 1024, "height": 1024, "iterations": 28, **fields}
+
+
+def test_equivalent_requests_share_a_key():
+    assert cache_key(request(prompt="a  red\tfox ")) == cache_key(request())
+    assert cache_key(request(guidance=3.50001)) == cache_key(request(guidance=3.5))
+    assert cache_key(request(step_cache=0)) == cache_key(request(step_cache=None))
+    assert cache_key(request(seed=1)) != cache_key(request(seed=2))
+    assert cache_key(request(width=768)) != cache_key(request())
+
+
+def test_encoding_only_changes_the_cache_key():
+    assert cache_key(request(format="png")) != cache_key(request(format="jpeg"))
+    assert render_key(request(format="png")) == render_key(request(format="jpeg", quality=50))
+    assert render_key(request(seed=1)) != render_key(request(seed=2))
+
+
+def test_disk_cache_evicts_least_recently_read():
+    cache = DiskResultCache(tempfile.mkdtemp(), max_bytes=25)
+    cache.put("a", b"x" * 10)
+    cache.put("b", b"x" * 10)
+    cache.get("a")
+    cache.put("c", b"x" * 10)
+
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+    assert cache.size == 20
+
+
+def test_disk_cache_survives_a_restart():
+    root = tempfile.mkdtemp()
+    DiskResultCache(root, max_bytes=100).put("a", b"image")
+
+    assert DiskResultCache(root, max_bytes=100).get("a") == b"image"
+
+
+def test_inflight_jobs_forget_finished_and_failed_jobs():
+    jobs = InflightJobs()
+    jobs.add("k1", "job-1")
+    jobs.add("k2", "job-2")
+
+    assert jobs.finish("job-1") == "k1"
+    jobs.discard("job-2")
+
+    assert jobs.get("k1") is None and jobs.get("k2") is None
+    # polls for the finished job are answered from the result cache
+    assert jobs.key_for("job-1") == "k1"
+    assert jobs.key_for("job-2") is None
+
+
+def test_repeat_request_is_served_from_the_cache(make_app):
+    backend = FakeBackend(latency=LATENCY)
+    app = make_app(backend)
+
+    async def run():
+        async with await client_for(app) as client:
+            params = {"prompt": "a red fox", "model_id": "flux"}
+            first = await client.get("/generate", params=params)
+            second = await client.get("/generate", params=params)
+            job = await client.post("/start-job", json=params)
+            return first, second, job
+
+    first, second, job = asyncio.run(run())
+
+    assert first.status_code == second.status_code == 200
+    assert second.content == first.content
+    assert len(backend.calls) == 1
+    assert second.headers["Server-Timing"].startswith("cache;")
+    assert job.json()["job_id"].startswith("rc-")
+
+
+def test_concurrent_identical_jobs_share_one_call(make_app):
+    backend = FakeBackend(latency=LATENCY)
+    app = make_app(backend)
+
+    async def run():
+        async with await client_for(app) as client:
+            body = {"prompt": "a red fox", "model_id": "flux"}
+            jobs = await asyncio.gather(*(client.post("/start-job", json=body) for _ in range(8)))
+            job_ids = {job.json()["job_id"] for job in jobs}
+            results = await asyncio.gather(*(client.get(f"/result/{job_id}", params={"wait": 5}) for job_id in job_ids))
+            return job_ids, results
+
+    job_ids, results = asyncio.run(run())
+
+    assert len(job_ids) == 1
+    assert [r.status_code for r in results] == [200]
+    assert len(backend.calls) == 1
+
+
+def test_other_encoding_is_transcoded_not_rendered_again(make_app):
+    png = encode_image(Image.new("RGB", (64, 64), "red"), "png")
+    backend = FakeBackend(latency=LATENCY, image=png)
+    app = make_app(backend)
+
+    async def run():
+        async with await client_for(app) as client:
+            params = {"prompt": "a red fox", "model_id": "flux"}
+            first = await client.get("/generate", params={**params, "format": "png"})
+            second = await client.get("/generate", params={**params, "format": "jpeg"})
+            job = await client.post("/start-job", json={**params, "format": "webp", "quality": 40})
+            third = await client.get(f"/result/{job.json()['job_id']}")
+            return first, second, third
+
+    first, second, third = asyncio.run(run())
+
+    assert len(backend.calls) == 1
+    assert first.headers["content-type"] == "image/png"
+    assert second.headers["content-type"] == "image/jpeg"
+    assert third.headers["content-type"] == "image/webp"
+    assert Image.open(BytesIO(second.content)).size == (64, 64)
@@ -0,0 +1,81 @@
+import pytest
+import torch
+
+from benchmarks.tiny_pipelines import TINY_PIPELINES
+from step_cache import compile_blocks, enable_step_cache
+
+STEPS = 8
+
+
+@pytest.fixture(scope="module")
+def flux():
+    pipe = TINY_PIPELINES["flux"](1)
+    pipe.set_progress_bar_config(disable=True)
+    return pipe
+
+
+def render(pipe) -> torch.Tensor:
+    return pipe(
+        prompt="a cute racoon in a priest robe",
+        num_inference_steps=STEPS,
+        width=64,
+        height=64,
+        guidance_scale=4.0,
+        max_sequence_length=64,
+        output_type="latent",
+        generator=torch.Generator().manual_seed(0),
+    ).images
+
+
+def drift(latents: torch.Tensor, baseline: torch.Tensor) -> float:
+    return ((latents - baseline).abs().mean() / baseline.abs().mean()).item()
+
+
+@pytest.fixture(scope="module")
+def cached(flux):
+    # latents with every block run, then the cache hooked in
+    baseline = render(flux)
+    return flux, enable_step_cache(flux.transformer), baseline
+
+
+def test_a_zero_threshold_runs_every_block(cached):
+    pipe, cache, baseline = cached
+    cache.start(0)
+
+    latents = render(pipe)
+
+    assert cache.steps == 0
+    assert drift(latents, baseline) < 0.01
+
+
+def test_a_high_threshold_skips_steps_and_stays_close(cached):
+    pipe, cache, baseline = cached
+    cache.start(1.0)
+
+    latents = render(pipe)
+
+    assert cache.steps == STEPS
+    assert 1 <= cache.computed < STEPS
+    assert drift(latents, baseline) < 0.05
+
+
+def test_compiled_blocks_keep_their_graphs_across_thresholds(cached):
+    pipe, cache, baseline = cached
+    graphs = []
+
+    def backend(graph, inputs):
+        graphs.append(graph)
+        return graph.forward
+
+    compile_blocks(pipe.transformer, backend=backend, dynamic=False)
+    cache.start(0)
+    render(pipe)
+    compiled = len(graphs)
+    for threshold in (1.0, 0.2, 0.5):
+        cache.start(threshold)
+        latents = render(pipe)
+
+    assert compiled > 0
+    assert len(graphs) == compiled
+    assert cache.computed < STEPS
+    assert drift(latents, baseline) < 0.05
@@ -0,0 +1,163 @@
+import time
+from contextlib import contextmanager
+
+# Stage timings of image jobs. Generators record where a request's time went
+# on the GPU side, the web tier adds queueing and the round trip, and the
+# result carries them as {stage: seconds}.
+
+# histogram buckets in seconds, from a result cache read up to a cold start
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class Spans:
+    # Named durations in seconds, in the order they were first recorded;
+    # a stage recorded twice adds up.
+
+    def __init__(self):
+        self.durations = {}
+
+    def add(self, name: str, seconds: float):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+
+def server_timing(timings: dict) -> str:
+    # Server-Timing header value, durations in milliseconds
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
+
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class StageHistograms:
+    # Prometheus histograms of stage durations, labelled by model and stage,
+    # rendered in the text exposition format.
+
+    def __init__(self, name: str = "prompt_forge_stage_seconds", buckets: tuple = BUCKETS):
+        self.name = name
+        self.buckets = buckets
+        self._series = {}  # (model, stage) -> [per-bucket counts, +Inf count, sum]
+
+    def observe(self, model_id: str, timings: dict):
+        for stage, seconds in timings.items():
+            series = self._series.get((model_id, stage))
+            if series is None:
+                series = self._series[(model_id, stage)] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += 1
+            series[2] += seconds
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} Time image jobs spent in each stage, from admission to the image reaching the web tier.",
+            f"# TYPE {self.name} histogram",
+        ]
+        for (model_id, stage), (counts, count, total) in sorted(self._series.items()):
+            labels = f'model="{_label(model_id)}",stage="{_label(stage)}"'
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return "\n".join(lines) + "\n"
+
+
+class LabelledCounters:
+    # Prometheus counters labelled by model and one more label, rendered in
+    # the text exposition format.
+
+    def __init__(self, name: str, help: str, label: str):
+        self.name = name
+        self.help = help
+        self.label = label
+        self._values = {}  # (model, label value) -> total
+
+    def add(self, model_id: str, value: str, amount: float = 1.0):
+        self._values[(model_id, value)] = self._values.get((model_id, value), 0.0) + amount
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for (model_id, value), total in sorted(self._values.items()):
+            lines.append(f'{self.name}{{model="{_label(model_id)}",{self.label}="{_label(value)}"}} {total}')
+        return "\n".join(lines) + "\n"
+
+
+class JobCounters:
+    # What generators counted for each finished job (the "counters" of its
+    # result), summed per model into Prometheus counters: the jobs run at
+    # each batch size, the denoising steps run or skipped by the step
+    # cache, prompt embedding cache hits with the encoding they saved, and
+    # for pooled generators the tier each batch's pipeline was acquired from
+    # with the time that took (a swap-in, when it was in host memory).
+
+    def __init__(self):
+        self.batch_sizes = LabelledCounters(
+            "prompt_forge_batched_jobs_total",
+            "Finished image jobs, by the size of the batch they ran in.",
+            "batch_size",
+        )
+        self.steps = LabelledCounters(
+            "prompt_forge_denoise_steps_total",
+            "Denoising steps finished image jobs asked for, by whether they ran or the step cache skipped them.",
+            "outcome",
+        )
+        self.prompt_cache = LabelledCounters(
+            "prompt_forge_prompt_cache_total",
+            "Prompts of finished image jobs looked up in the generators' embedding caches, by outcome.",
+            "outcome",
+        )
+        self.encode_saved = LabelledCounters(
+            "prompt_forge_prompt_cache_saved_seconds_total",
+            "Text encoding time prompt embedding cache hits saved, at the mean time of a miss.",
+            "stage",
+        )
+        self.pool_acquires = LabelledCounters(
+            "prompt_forge_pool_acquires_total",
+            "Finished image jobs of pooled generators, by the tier their pipeline was acquired from.",
+            "tier",
+        )
+        self.pool_acquire_seconds = LabelledCounters(
+            "prompt_forge_pool_acquire_seconds_total",
+            "Time the batches of those jobs spent acquiring their pipeline, by the tier it was acquired from.",
+            "tier",
+        )
+
+    def observe(self, model_id: str, counters: dict):
+        if counters.get("batch_size"):
+            self.batch_sizes.add(model_id, str(counters["batch_size"]))
+        if counters.get("steps_requested"):
+            run = counters.get("steps_run", counters["steps_requested"])
+            self.steps.add(model_id, "run", run)
+            self.steps.add(model_id, "skipped", counters["steps_requested"] - run)
+        if counters.get("prompt_cache"):
+            self.prompt_cache.add(model_id, counters["prompt_cache"])
+            self.encode_saved.add(model_id, "text_encode", counters.get("encode_saved", 0.0))
+        if counters.get("pool"):
+            self.pool_acquires.add(model_id, counters["pool"])
+            self.pool_acquire_seconds.add(model_id, counters["pool"], counters.get("pool_acquire", 0.0))
+
+    def render(self) -> str:
+        return "".join(
+            counters.render()
+            for counters in (
+                self.batch_sizes,
+                self.steps,
+                self.prompt_cache,
+                self.encode_saved,
+                self.pool_acquires,
+                self.pool_acquire_seconds,
+            )
+        )
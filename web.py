@@ -0,0 +1,766 @@
+import asyncio
+import base64
+import json
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import List
+
+from fastapi import FastAPI, Request, Depends, HTTPException, Query
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from jose import JWTError
+
+from auth import JWKSUnavailable
+from backend import UnknownJob
+from catalogue import ICON_CACHE_CONTROL, build_catalogue, etag_matches
+from encoding import negotiate_format, sniff_media_type, transcode
+from ledger import FINAL_STATES
+from model_registry import apply_profile, class_for
+from object_store import IMMUTABLE_CACHE_CONTROL, etag_of, media_type_of, sign, valid_key, verify
+from result_cache import InflightJobs, cache_key, normalize_request, render_key
+from scheduler import JobCancelled, QueueFull
+from schemas import ImageRequest, JobStatusRequest, ModelInfo
+from timing import JobCounters, LabelledCounters, StageHistograms, server_timing
+
+# job ids handed out for cache hits; anything else is a backend job id
+CACHED_JOB_PREFIX = "rc-"
+
+# seconds a client waits before retrying when the IdP's keys can't be fetched
+AUTH_RETRY_AFTER = 30
+
+# upper bound on how long a long-poll is held open, below common proxy idle timeouts
+MAX_WAIT_SECONDS = 50
+
+# how long a signed result URL works; URLs signed within one such window are
+# identical, so browsers can cache what they point at
+RESULT_URL_TTL = 900
+
+# how often the object store drops its oldest objects when over budget
+PRUNE_INTERVAL = 600
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def data_uri(data: bytes, media_type: str) -> str:
+    return f"data:{media_type};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+def unpack(result) -> dict:
+    # generate_timed results, which carry object store keys, or images as
+    # bytes from backends that don't store them and from jobs spawned with
+    # generate -> {"objects" or "images", "timings", "seeds"}; seeds are None
+    # when unknown
+    if not isinstance(result, dict):
+        result = {"image": result}
+    return {
+        "objects": result.get("objects"),
+        "images": result.get("images") or ([result["image"]] if "image" in result else None),
+        "timings": dict(result.get("timings") or {}),
+        "seeds": result.get("seeds"),
+    }
+
+
+def image_headers(timings: dict, seed: int | None) -> dict:
+    headers = {"Server-Timing": server_timing(timings)}
+    if seed is not None:
+        headers["X-Seed"] = str(seed)
+    return headers
+
+
+def create_web_app(
+    backend,
+    verifier,
+    model_registry: dict,
+    model_list: list,
+    asset_dir: str,
+    result_cache,
+    scheduler,
+    ledger,
+    object_store,
+    url_secret: bytes,
+) -> FastAPI:
+    # `backend` is a backend.ModalBackend in production; anything with the same
+    # async run/spawn/stream/result/cancel methods works, which is how the app is exercised
+    # in-process. `model_registry` is model_registry.MODELS or the same shape.
+    # Every call that reaches a generator goes through `scheduler`, a
+    # scheduler.FairScheduler, and is recorded in `ledger`, a ledger.JobLedger.
+    # Images live in `object_store` (see object_store.py) and `result_cache`
+    # maps requests to their keys; `url_secret` signs links to them.
+
+    async def prune_objects():
+        while True:
+            try:
+                await asyncio.to_thread(object_store.prune)
+            except Exception as e:
+                print(f"Object store: pruning failed: {e!r}")
+            await asyncio.sleep(PRUNE_INTERVAL)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        pruner = asyncio.create_task(prune_objects())
+        yield
+        pruner.cancel()
+        # write out what the ledger still holds before the container goes away
+        await ledger.close()
+
+    web_app = FastAPI(lifespan=lifespan)
+
+    web_app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"], #ORIGINS.split(",") if ORIGINS else [],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["Server-Timing", "X-Seed", "ETag", "Content-Range"],
+    )
+
+
+    # --- AUTH DEPENDENCY ---
+    class JWTBearer(HTTPBearer):
+        def __init__(self, auto_error: bool = True):
+            super(JWTBearer, self).__init__(auto_error=auto_error)
+
+        async def __call__(self, request: Request):
+            credentials: HTTPAuthorizationCredentials = await super().__call__(request)
+            if credentials:
+                try:
+                    payload = await verifier.verify(credentials.credentials)
+                    return payload  # optionally pass user info
+                except JWTError as e:
+                    raise HTTPException(status_code=403, detail=str(e))
+                except JWKSUnavailable as e:
+                    # the IdP is down and this container has no keys yet
+                    print(e)
+                    raise HTTPException(status_code=503, detail="Can't verify tokens right now", headers={"Retry-After": str(AUTH_RETRY_AFTER)})
+            raise HTTPException(status_code=403, detail="Invalid authorization code.")
+
+    auth = JWTBearer()
+
+    # jobs still computing a given cache key
+    inflight_jobs = InflightJobs()
+
+    # built once per container; icons are served separately by content hash
+    catalogue = build_catalogue(model_list, asset_dir)
+
+    # stage timings of every finished job and result cache read, for /metrics
+    metrics = StageHistograms()
+    # and what the generators counted for each job they finished, from
+    # whichever container ran it
+    job_counters = JobCounters()
+
+    # Cancelled jobs, and the GPU time they gave back: the denoising steps
+    # an interrupted job didn't run, as its generator timed them. A job
+    # dropped from the queue never held the GPU, and one whose client went
+    # away leaves nobody to receive the generator's report, so neither adds
+    # to the seconds.
+    cancellations = LabelledCounters("prompt_forge_cancelled_jobs_total", "Image jobs cancelled, by outcome.", "outcome")
+    reclaimed = LabelledCounters(
+        "prompt_forge_reclaimed_gpu_seconds_total",
+        "GPU time cancelled image jobs did not use, by outcome.",
+        "outcome",
+    )
+
+    # cancel signals on their way to the generators
+    interrupts = set()
+
+    def generator_for(model_id: str) -> str:
+        model = model_registry.get(model_id)
+        if model is None:
+            raise HTTPException(status_code=400, detail=f"Unknown model: {model_id}")
+        if not model["available"]:
+            raise HTTPException(status_code=400, detail=f"Model not available: {model_id}")
+        return class_for(model_id, model_registry)
+
+    def prepare(request: ImageRequest, http_request: Request) -> ImageRequest:
+        # Pin everything a generator would otherwise decide before the request
+        # is keyed or sent: the output format, and the model's step defaults
+        # and limits.
+        generator_for(request.model_id)
+        try:
+            data = apply_profile(request.model_dump(), model_registry)
+            data["format"] = negotiate_format(request.format, http_request.headers.get("accept"))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return ImageRequest(**data)
+
+    def subject_of(claims: dict) -> str:
+        return claims.get("sub") or "anonymous"
+
+    def too_busy(e: QueueFull) -> HTTPException:
+        return HTTPException(status_code=429, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+
+    def admit(class_name: str, request: ImageRequest, claims: dict, priority: str):
+        try:
+            ticket = scheduler.admit(class_name, request.model_id, subject_of(claims), priority)
+        except QueueFull as e:
+            raise too_busy(e)
+        record_job(ticket, request)
+        return ticket
+
+    def record_job(ticket, request: ImageRequest):
+        data = request.model_dump()
+        ledger.queued(ticket.id, ticket.subject, ticket.model_id, normalize_request(data), ticket.priority, cache_key(data))
+
+    def count_cancelled(ticket, outcome: str, seconds: float = 0.0):
+        cancellations.add(ticket.model_id, outcome)
+        reclaimed.add(ticket.model_id, outcome, seconds)
+
+    async def send_interrupt(job_id: str):
+        try:
+            await backend.cancel(job_id)
+        except Exception as e:
+            print(f"Cancelling {job_id} failed: {e!r}")
+
+    def interrupt(ticket):
+        # asks the generator to stop the job at its next denoising step
+        task = asyncio.create_task(send_interrupt(ticket.id))
+        interrupts.add(task)
+        task.add_done_callback(interrupts.discard)
+
+    def abandoned(ticket):
+        # A job whose client went away: still queued, it has already left
+        # the queue; running, it is stopped like a cancelled one.
+        if ticket.cancelled:
+            return
+        ticket.cancelled = True
+        if ticket.started_at is None:
+            count_cancelled(ticket, "dropped")
+        else:
+            count_cancelled(ticket, "interrupted")
+            interrupt(ticket)
+
+    @contextmanager
+    def tracked(ticket):
+        # a job that stops without finishing is failed, or cancelled when
+        # its client went away or someone cancelled it
+        try:
+            yield
+        except (asyncio.CancelledError, GeneratorExit):
+            ledger.failed(ticket.id, "Client went away", state="cancelled")
+            abandoned(ticket)
+            raise
+        except JobCancelled:
+            ledger.failed(ticket.id, "Cancelled", state="cancelled")
+            raise
+        except Exception as e:
+            ledger.failed(ticket.id, str(e) or type(e).__name__)
+            raise
+
+    def queue_info(job_id: str) -> dict:
+        ticket = scheduler.jobs.get(job_id)
+        if ticket is None:
+            return {"queue_position": 0, "estimated_wait": 0.0}
+        return {"queue_position": scheduler.position(ticket), "estimated_wait": scheduler.estimated_wait(ticket)}
+
+    def store_images(images: list) -> list:
+        keys = [object_store.put(image, sniff_media_type(image)) for image in images]
+        object_store.commit()
+        return keys
+
+    async def stored(result) -> dict:
+        # any backend result -> {"objects", "timings", "seeds"}, putting
+        # images that came back as bytes into the object store
+        result = unpack(result)
+        images = result.pop("images")
+        if result["objects"] is None:
+            result["objects"] = await asyncio.to_thread(store_images, images)
+        return result
+
+    async def finished(ticket, result, call_started: float) -> dict:
+        # A generator's result -> {"objects", "timings", "seeds"}: the timings
+        # are the time the job waited for a slot, the generator's stages, and
+        # "transfer", whatever the round trip took beyond those (dispatch,
+        # storing images that came back as bytes).
+        if isinstance(result, dict):
+            job_counters.observe(ticket.model_id, result.get("counters") or {})
+        result = await stored(result)
+        timings = result["timings"]
+        elapsed = time.perf_counter() - call_started
+        result["timings"] = {
+            "queue": ticket.started_at - ticket.enqueued_at,
+            **timings,
+            "transfer": max(0.0, elapsed - sum(timings.values())),
+        }
+        metrics.observe(ticket.model_id, result["timings"])
+        return result
+
+    def check_cancelled(ticket, result):
+        # raises JobCancelled for a generator's report of a job it stopped
+        if isinstance(result, dict) and result.get("cancelled"):
+            count_cancelled(ticket, "interrupted", result.get("reclaimed") or 0.0)
+            raise JobCancelled("Job was cancelled")
+
+    async def timed_call(ticket, call) -> dict:
+        ledger.running(ticket.id)
+        start = time.perf_counter()
+        with tracked(ticket):
+            outcome = await call()
+            check_cancelled(ticket, outcome)
+            result = await finished(ticket, outcome, start)
+        ledger.finished(ticket.id, result["timings"], result["seeds"], result["objects"])
+        return result
+
+    def save_result(key: str, result: dict, request: ImageRequest | None = None):
+        # what the request produced, by its cache key: the images' object
+        # keys and their seeds. Given the request, it is also kept by render
+        # key with its encoding, for requests that only want another one.
+        entry = {"objects": result["objects"], "seeds": result["seeds"]}
+        result_cache.put(key, json.dumps(entry).encode("utf-8"))
+        if request is not None:
+            render = {**entry, "format": request.format, "quality": request.quality}
+            result_cache.put(render_key(request.model_dump()), json.dumps(render).encode("utf-8"))
+
+    def transcode_cached(key: str, request: ImageRequest) -> bool:
+        # Caches a result under `key` made from a cached render of the same
+        # request in another encoding, re-encoding its images rather than
+        # running the GPU again; False when there is no such render. Blocks.
+        data = result_cache.get(render_key(request.model_dump()))
+        if data is None:
+            return False
+        render = json.loads(data)
+        objects = render["objects"]
+        if (render["format"], render["quality"]) != (request.format, request.quality):
+            objects = []
+            for object_key in render["objects"]:
+                image = object_store.get(object_key)
+                if image is None:
+                    return False
+                image = transcode(image, request.format, request.quality)
+                objects.append(object_store.put(image, sniff_media_type(image)))
+            object_store.commit()
+        save_result(key, {"objects": objects, "seeds": render["seeds"]})
+        return True
+
+    async def cached_result(key: str, model_id: str | None, request: ImageRequest | None = None) -> dict | None:
+        # a cached result as {"objects", "timings", "seeds"}; given the
+        # request, a render cached in another encoding counts
+        start = time.perf_counter()
+        data = await asyncio.to_thread(result_cache.get, key)
+        if data is None and request is not None and await asyncio.to_thread(transcode_cached, key, request):
+            data = await asyncio.to_thread(result_cache.get, key)
+        if data is None:
+            return None
+        timings = {"cache": time.perf_counter() - start}
+        if model_id is not None:
+            metrics.observe(model_id, timings)
+        return {**json.loads(data), "timings": timings}
+
+    def object_url(http_request: Request, key: str) -> str:
+        # a short-lived link anyone holding it can fetch the object from: a
+        # presigned bucket URL, or /objects/{key} signed by this app and
+        # valid for one to two RESULT_URL_TTL windows
+        url = object_store.url(key, RESULT_URL_TTL)
+        if url is None:
+            expires = (int(time.time()) // RESULT_URL_TTL + 2) * RESULT_URL_TTL
+            url = str(http_request.url_for("get_object", key=key).include_query_params(
+                expires=expires, signature=sign(url_secret, key, expires),
+            ))
+        return url
+
+    async def object_response(http_request: Request, key: str, headers: dict) -> Response:
+        # The object, or a redirect to its bucket. Objects never change, so
+        # their digest is a strong ETag and they may be cached for good;
+        # FileResponse answers Range requests. A redirect is only reused while
+        # the presigned URL it points at still works.
+        url = object_store.url(key, RESULT_URL_TTL)
+        if url is not None:
+            headers = {**headers, "Cache-Control": f"private, max-age={RESULT_URL_TTL // 2}"}
+            return RedirectResponse(url, status_code=307, headers=headers)
+
+        headers = {**headers, "ETag": etag_of(key), "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+        if etag_matches(http_request.headers.get("if-none-match"), (etag_of(key),)):
+            return Response(status_code=304, headers=headers)
+
+        path = await asyncio.to_thread(object_store.path, key)
+        if path is None:
+            raise HTTPException(status_code=404, detail="Result expired")
+        return FileResponse(path, media_type=media_type_of(key), headers=headers)
+
+    async def submit_job(request: ImageRequest, claims: dict) -> dict:
+        # -> {"job_id", "queue_position", "estimated_wait"}
+        class_name = generator_for(request.model_id)
+
+        # identical requests are served from the result cache, or share the
+        # job that is already computing them
+        key = cache_key(request.model_dump())
+        if key in result_cache or await asyncio.to_thread(transcode_cached, key, request):
+            return {"job_id": CACHED_JOB_PREFIX + key, **queue_info("")}
+
+        job_id = inflight_jobs.get(key)
+        if job_id is not None and job_id in scheduler.jobs:
+            scheduler.jobs[job_id].subjects.add(subject_of(claims))
+        if job_id is None:
+            ticket = admit(class_name, request, claims, "batch")
+            # the generator watches for cancellations by job id
+            data = {**request.model_dump(), "job_id": ticket.id}
+
+            async def call():
+                call_id = await backend.spawn(class_name, data)
+                while True:
+                    try:
+                        return await backend.result(call_id, timeout=MAX_WAIT_SECONDS)
+                    except TimeoutError:
+                        continue
+
+            async def work():
+                try:
+                    result = await timed_call(ticket, call)
+                except Exception:
+                    # identical requests that come later start a job of their own
+                    inflight_jobs.discard(ticket.id)
+                    raise
+                # stored where the ledger says it is, whether or not anyone polls
+                await asyncio.to_thread(save_result, key, result, request)
+                return result
+
+            scheduler.submit(ticket, work)
+            job_id = ticket.id
+            inflight_jobs.add(key, job_id)
+
+        return {"job_id": job_id, **queue_info(job_id)}
+
+    @web_app.get("/models", response_model=List[ModelInfo], dependencies=[Depends(auth)])
+    async def list_models(request: Request):
+        body, etag, encoding = catalogue.representation(request.headers.get("accept-encoding"))
+        headers = {
+            "ETag": etag,
+            "Cache-Control": "private, no-cache",
+            "Vary": "Accept-Encoding",
+        }
+
+        if etag_matches(request.headers.get("if-none-match"), (catalogue.etag, catalogue.gzip_etag)):
+            return Response(status_code=304, headers=headers)
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    @web_app.get("/icons/{name}")
+    async def get_icon(name: str):
+        icon = catalogue.icons.get(name)
+        if icon is None:
+            raise HTTPException(status_code=404, detail="Icon not found")
+
+        return Response(content=icon, media_type="image/webp", headers={"Cache-Control": ICON_CACHE_CONTROL})
+
+    # Jobs queued through /start-job and /generate-async run at "batch"
+    # priority; /generate and /generate-stream, where someone is watching,
+    # at "interactive".
+
+    @web_app.post("/start-job")
+    async def start_image_job(request: ImageRequest, http_request: Request, claims: dict = Depends(auth)):
+        return JSONResponse(content=await submit_job(prepare(request, http_request), claims))
+
+    @web_app.get("/generate")
+    async def proxy_generate(prompt: str, model_id: str, http_request: Request, format: str | None = None, claims: dict = Depends(auth)):
+        request = prepare(ImageRequest(prompt=prompt, model_id=model_id, format=format), http_request)
+        class_name = generator_for(model_id)
+
+        key = cache_key(request.model_dump())
+        result = await cached_result(key, model_id, request)
+        if result is None:
+            ticket = admit(class_name, request, claims, "interactive")
+            try:
+                with tracked(ticket):
+                    data = {**request.model_dump(), "job_id": ticket.id}
+                    result = await scheduler.run(ticket, lambda: timed_call(ticket, lambda: backend.run(class_name, data)))
+            except JobCancelled:
+                raise HTTPException(status_code=410, detail="Job was cancelled")
+            await asyncio.to_thread(save_result, key, result, request)
+
+        headers = image_headers(result["timings"], result["seeds"][0] if result["seeds"] else None)
+        return await object_response(http_request, result["objects"][0], headers)
+
+    @web_app.get("/generate-async")
+    async def proxy_generate_job(prompt: str, model_id: str, http_request: Request, format: str | None = None, claims: dict = Depends(auth)):
+        request = prepare(ImageRequest(prompt=prompt, model_id=model_id, format=format), http_request)
+        return JSONResponse(content=await submit_job(request, claims))
+
+    @web_app.post("/generate-stream")
+    async def stream_generate(request: ImageRequest, http_request: Request, claims: dict = Depends(auth)):
+        # Server-sent events: "job" with the job's id, "queued" while waiting
+        # for a GPU, "progress" per denoising step (with an occasional JPEG
+        # preview of the first image), then one "result" carrying signed URLs
+        # of the final images, their seeds and the stage timings. "image" is
+        # the first of "images". A job cancelled through /jobs/{job_id}/cancel
+        # ends with "cancelled" instead.
+        request = prepare(request, http_request)
+        class_name = generator_for(request.model_id)
+        key = cache_key(request.model_dump())
+
+        cached = await cached_result(key, request.model_id, request)
+        if cached is None:
+            # turn the client away with a proper 429 while we still can;
+            # the ticket itself is taken once the stream starts, so a client
+            # that never reads the body never holds a place in the queue
+            try:
+                scheduler.check(class_name, request.model_id, subject_of(claims))
+            except QueueFull as e:
+                raise too_busy(e)
+
+        def result_event(result: dict, **fields) -> str:
+            images = [object_url(http_request, object_key) for object_key in result["objects"]]
+            return sse_event("result", {
+                "image": images[0],
+                "images": images,
+                "seeds": result["seeds"],
+                **fields,
+                "timings": result["timings"],
+            })
+
+        async def events():
+            if cached is not None:
+                yield result_event(cached, cached=True)
+                return
+
+            try:
+                ticket = scheduler.admit(class_name, request.model_id, subject_of(claims), "interactive")
+            except QueueFull as e:
+                yield sse_event("error", {"detail": e.detail, "retry_after": e.retry_after})
+                return
+            record_job(ticket, request)
+
+            try:
+                with tracked(ticket):
+                    # for cancelling it from elsewhere (POST /jobs/{job_id}/cancel)
+                    yield sse_event("job", {"job_id": ticket.id})
+                    position = scheduler.position(ticket)
+                    if position:
+                        yield sse_event("queued", {"position": position, "estimated_wait": scheduler.estimated_wait(ticket)})
+
+                    async with scheduler.slot(ticket):
+                        ledger.running(ticket.id)
+                        start = time.perf_counter()
+                        async for event in backend.stream(class_name, {**request.model_dump(), "job_id": ticket.id}):
+                            if event["event"] == "progress":
+                                preview = event.get("preview")
+                                yield sse_event("progress", {
+                                    "step": event["step"],
+                                    "steps": event["steps"],
+                                    "preview": data_uri(preview, "image/jpeg") if preview else None,
+                                })
+                            elif event["event"] == "result":
+                                check_cancelled(ticket, event)
+                                result = await finished(ticket, event, start)
+                                ledger.finished(ticket.id, result["timings"], result["seeds"], result["objects"])
+                                await asyncio.to_thread(save_result, key, result, request)
+                                yield result_event(result, cached=False, steps_run=event.get("steps_run"))
+            except JobCancelled:
+                yield sse_event("cancelled", {"job_id": ticket.id})
+
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+    async def fetch_result(job_id: str, wait: float = 0, index: int = 0) -> tuple[str, dict, int | None] | None:
+        # the object key of the finished job's image `index`, its stage
+        # timings and its seed (None when unknown), or None if it is still
+        # running after `wait` seconds; a job that failed is a 500 with its
+        # error, and an id nobody handed out raises UnknownJob
+        record = None
+        if job_id.startswith(CACHED_JOB_PREFIX):
+            key = job_id.removeprefix(CACHED_JOB_PREFIX)
+        else:
+            record = await ledger.get(job_id)
+            key = record["result_key"] if record is not None else inflight_jobs.key_for(job_id)
+            if record is not None and index >= record["params"].get("numberImages", 1):
+                raise HTTPException(status_code=404, detail=f"Job has no image {index}")
+            if record is not None and record["state"] == "cancelled":
+                raise HTTPException(status_code=410, detail="Job was cancelled")
+
+        result = None
+        if record is not None and record["objects"]:
+            result = {"objects": record["objects"], "timings": record["timings"] or {}, "seeds": record["seeds"]}
+        elif key is not None and key in result_cache:
+            result = await cached_result(key, record["model_id"] if record is not None else None)
+
+        if result is None:
+            if job_id.startswith(CACHED_JOB_PREFIX):
+                raise HTTPException(status_code=404, detail="Result expired")
+
+            try:
+                if job_id in scheduler.jobs:
+                    try:
+                        result = await scheduler.result(job_id, timeout=wait)
+                    except JobCancelled:
+                        raise HTTPException(status_code=410, detail="Job was cancelled")
+                elif record is not None:
+                    # a job this container no longer tracks: its result was
+                    # evicted, or it was still running when the last one stopped
+                    if record["state"] == "done":
+                        raise HTTPException(status_code=404, detail="Result expired")
+                    raise RuntimeError(record["error"] or "Job was lost when the web container restarted")
+                else:
+                    # spawned directly, before jobs went through the scheduler
+                    result = await stored(await backend.result(job_id, timeout=wait))
+            except TimeoutError:
+                return None
+            except (HTTPException, UnknownJob):
+                raise
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Job failed: {str(e) or type(e).__name__}")
+
+            key = inflight_jobs.finish(job_id)
+            if key is not None:
+                await asyncio.to_thread(save_result, key, result)
+
+        if index >= len(result["objects"]):
+            raise HTTPException(status_code=404, detail=f"Job has no image {index}")
+        seeds = result["seeds"]
+        return result["objects"][index], result["timings"], seeds[index] if seeds and index < len(seeds) else None
+
+    def ledger_state(record: dict) -> str:
+        # what job_state would say, from the ledger alone; a job that isn't
+        # final is pending while this container still holds its ticket
+        if record["state"] == "done":
+            return "done" if record["objects"] or record["result_key"] in result_cache else "expired"
+        if record["state"] == "cancelled":
+            return "cancelled"
+        if record["state"] in FINAL_STATES or (record["id"] not in scheduler.jobs and record["id"] not in scheduler.tickets):
+            return "failed"
+        return "pending"
+
+    async def job_state(job_id: str, wait: float = 0) -> str:
+        try:
+            result = await fetch_result(job_id, wait)
+        except UnknownJob:
+            return "unknown"
+        except HTTPException as e:
+            return {410: "cancelled", 500: "failed"}.get(e.status_code, "expired")
+        except Exception:
+            return "failed"
+        return "pending" if result is None else "done"
+
+    # Results are served from the object store with the ETag and caching of
+    # object_response. /result/... takes the caller's token; /objects/...
+    # takes a signed URL instead, for <img> tags and downloads.
+
+    @web_app.get("/result/{job_id}", dependencies=[Depends(auth)])
+    async def poll_results(job_id: str, http_request: Request, wait: float = Query(0, ge=0)):
+        # with ?wait=N the request is held until the job finishes or N seconds pass
+        return await image_response(http_request, job_id, wait, 0)
+
+    @web_app.get("/result/{job_id}/{index}", dependencies=[Depends(auth)])
+    async def poll_image(job_id: str, index: int, http_request: Request, wait: float = Query(0, ge=0)):
+        # image `index` of a job that asked for numberImages > 1
+        if index < 0:
+            raise HTTPException(status_code=404, detail=f"Job has no image {index}")
+        return await image_response(http_request, job_id, wait, index)
+
+    async def image_response(http_request: Request, job_id: str, wait: float, index: int) -> Response:
+        try:
+            result = await fetch_result(job_id, min(wait, MAX_WAIT_SECONDS), index)
+        except UnknownJob:
+            raise HTTPException(status_code=404, detail="Unknown job")
+        if result is None:
+            return JSONResponse(content="", status_code=202)
+
+        object_key, timings, seed = result
+        return await object_response(http_request, object_key, image_headers(timings, seed))
+
+    @web_app.api_route("/objects/{key}", methods=["GET", "HEAD"], name="get_object")
+    async def get_object(key: str, http_request: Request, expires: int = 0, signature: str = ""):
+        if not valid_key(key) or not verify(url_secret, key, expires, signature):
+            raise HTTPException(status_code=403, detail="Invalid or expired link")
+        return await object_response(http_request, key, {})
+
+    @web_app.post("/results/status", dependencies=[Depends(auth)])
+    async def job_statuses(request: JobStatusRequest, http_request: Request):
+        # State of many jobs in one call. With `wait`, a request where every job
+        # is still pending is held until the first of them changes state.
+        job_ids = list(dict.fromkeys(request.job_ids))
+        records = await ledger.get_many(job_ids)
+        others = [job_id for job_id in job_ids if job_id not in records]
+        states = {job_id: ledger_state(record) for job_id, record in records.items()}
+        states.update(zip(others, await asyncio.gather(*(job_state(job_id) for job_id in others))))
+
+        wait = min(request.wait, MAX_WAIT_SECONDS)
+        if wait > 0 and all(state == "pending" for state in states.values()):
+            tasks = {asyncio.create_task(job_state(job_id, wait)): job_id for job_id in job_ids}
+            done, waiting = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in waiting:
+                task.cancel()
+            for task in done:
+                states[tasks[task]] = task.result()
+
+        jobs = {}
+        for job_id in job_ids:
+            state = states[job_id]
+            jobs[job_id] = {"state": state}
+            if state == "pending":
+                jobs[job_id].update(queue_info(job_id))
+            elif state == "done" and job_id in records:
+                record = records[job_id]
+                jobs[job_id]["timings"] = record["timings"]
+                jobs[job_id]["seeds"] = record["seeds"]
+                jobs[job_id]["urls"] = [object_url(http_request, key) for key in record["objects"] or []]
+        return JSONResponse(content={"jobs": jobs})
+
+    @web_app.get("/jobs")
+    async def job_history(limit: int = Query(50, ge=1, le=200), before: float | None = None, claims: dict = Depends(auth)):
+        # the caller's jobs, newest first; for the next page pass the last
+        # job's created_at as `before`
+        records = await ledger.history(subject_of(claims), limit, before)
+        return JSONResponse(content={"jobs": [
+            {
+                "job_id": r["id"],
+                "model_id": r["model_id"],
+                "params": r["params"],
+                "state": r["state"],
+                "created_at": r["created_at"],
+                "started_at": r["started_at"],
+                "finished_at": r["finished_at"],
+                "timings": r["timings"],
+                "seeds": r["seeds"],
+                "error": r["error"],
+            }
+            for r in records
+        ]})
+
+    @web_app.post("/jobs/{job_id}/cancel")
+    async def cancel_job(job_id: str, claims: dict = Depends(auth)):
+        # Stops one of the caller's jobs. A queued job is dropped at once
+        # ("cancelled"); a running one is stopped by its generator at the
+        # next denoising step ("cancelling", 202), unless other requests
+        # share its batch, in which case it finishes. A job that identical
+        # requests from other callers share keeps running for them and only
+        # lets go of this caller ("detached"). Jobs that already stopped
+        # answer with their state.
+        subject = subject_of(claims)
+        ticket = scheduler.jobs.get(job_id) or scheduler.tickets.get(job_id)
+        if ticket is None or ticket.finished_at is not None:
+            record = await ledger.get(job_id)
+            if record is None or (record["subject"] != subject and (ticket is None or subject not in ticket.subjects)):
+                raise HTTPException(status_code=404, detail="Unknown job")
+            return JSONResponse(content={"state": ledger_state(record)})
+        if subject not in ticket.subjects:
+            raise HTTPException(status_code=404, detail="Unknown job")
+        if len(ticket.subjects) > 1:
+            ticket.subjects.discard(subject)
+            if ticket.subject == subject:
+                # listed in the history of someone still waiting for it
+                ticket.subject = min(ticket.subjects)
+                ledger.reassign(job_id, ticket.subject)
+            return JSONResponse(content={"state": "detached"})
+        if ticket.cancelled:
+            return JSONResponse(content={"state": "cancelling"}, status_code=202)
+
+        # identical requests that come later start a job of their own
+        inflight_jobs.discard(job_id)
+        if scheduler.cancel(ticket):
+            ledger.failed(job_id, "Cancelled", state="cancelled")
+            count_cancelled(ticket, "dropped")
+            return JSONResponse(content={"state": "cancelled"})
+
+        interrupt(ticket)
+        return JSONResponse(content={"state": "cancelling"}, status_code=202)
+
+    @web_app.get("/metrics")
+    async def prometheus_metrics():
+        # for the scraper, so no auth; per-model aggregates only
+        body = metrics.render() + job_counters.render() + cancellations.render() + reclaimed.render()
+        return Response(content=body, media_type="text/plain; version=0.0.4")
+
+    return web_app
@@ -0,0 +1,147 @@
+import importlib
+import json
+import os
+import shutil
+from glob import glob
+
+import diffusers
+import torch
+from accelerate import init_empty_weights
+from safetensors.torch import load_file
+
+from quantization import QUANTIZED_COMPONENTS, prepare_quantized, quantize_pipeline
+
+# written last by bake_pipeline; a baked folder without it is incomplete
+BAKED_MANIFEST = "baked.json"
+
+
+def manifest_for(spec: dict) -> dict:
+    # what a baked folder must have been built from to stand in for `spec`;
+    # quantize_components only when set, so copies baked before it existed
+    # still count
+    manifest = {
+        "dtype": spec["dtype"],
+        "fuse_loras": spec.get("fuse_loras", []),
+        "quantize": spec.get("quantize"),
+    }
+    if "quantize_components" in spec:
+        manifest["quantize_components"] = list(spec["quantize_components"])
+    return manifest
+
+
+def load_source(spec: dict, source_dir: str):
+    # the loading path used before baking: a downloaded diffusers folder,
+    # cast to the target dtype while it is read
+    pipeline_cls = getattr(diffusers, spec["pipeline"])
+    return pipeline_cls.from_pretrained(
+        source_dir,
+        torch_dtype=getattr(torch, spec["dtype"]),
+        variant=spec.get("variant"),
+    )
+
+
+def bake_pipeline(spec: dict, source_dir: str, baked_dir: str, device: str = "cuda"):
+    # Writes `source_dir` out again as it will be served: LoRAs in
+    # spec["fuse_loras"] folded into the base weights, every tensor already
+    # in spec["dtype"], the transformer and T5 (or just
+    # spec["quantize_components"]) quantized to spec["quantize"] if set, and
+    # one unsharded safetensors file per component.
+    pipe = load_source(spec, source_dir).to(device)
+
+    loras = spec.get("fuse_loras", [])
+    for i, lora in enumerate(loras):
+        pipe.load_lora_weights(lora["repo"], weight_name=lora.get("weight_name"), adapter_name=f"bake_{i}")
+    if loras:
+        pipe.set_adapters([f"bake_{i}" for i in range(len(loras))], [lora.get("scale", 1.0) for lora in loras])
+        pipe.fuse_lora()
+        pipe.unload_lora_weights()
+
+    # after fusing, so the LoRAs are quantized with the weights they change
+    if spec.get("quantize"):
+        quantize_pipeline(pipe, spec["quantize"], spec.get("quantize_components", QUANTIZED_COMPONENTS))
+
+    partial_dir = baked_dir + ".partial"
+    shutil.rmtree(partial_dir, ignore_errors=True)
+    pipe.save_pretrained(partial_dir, safe_serialization=True, max_shard_size="1000GB")
+    with open(os.path.join(partial_dir, BAKED_MANIFEST), "w") as f:
+        json.dump(manifest_for(spec), f)
+
+    shutil.rmtree(baked_dir, ignore_errors=True)
+    os.rename(partial_dir, baked_dir)
+
+
+def is_baked(spec: dict, baked_dir: str) -> bool:
+    try:
+        with open(os.path.join(baked_dir, BAKED_MANIFEST)) as f:
+            return json.load(f) == manifest_for(spec)
+    except FileNotFoundError:
+        return False
+
+
+def load_module(cls, folder: str, weights_path: str, device: str):
+    # Builds the module with empty (meta) parameters, then points them at
+    # tensors safetensors reads from the memory-mapped file straight onto
+    # `device`, so weights are neither initialised nor copied on the CPU.
+    with init_empty_weights():
+        if issubclass(cls, diffusers.ModelMixin):
+            model = cls.from_config(cls.load_config(folder))
+        else:
+            model = cls._from_config(cls.config_class.from_pretrained(folder))
+
+    state_dict = load_file(weights_path, device=device)
+    prepare_quantized(model, state_dict)
+    model.load_state_dict(state_dict, strict=False, assign=True)
+    if hasattr(model, "tie_weights"):
+        # tied weights (e.g. T5's shared embedding) are only stored once
+        model.tie_weights()
+
+    # non-persistent buffers were built for real on the CPU
+    model.to(device)
+    missing = [name for name, tensor in model.state_dict().items() if tensor.is_meta]
+    if missing:
+        raise RuntimeError(f"{folder} has no weights for {', '.join(missing[:5])}")
+    return model.eval()
+
+
+def load_baked(baked_dir: str, device: str = "cuda"):
+    with open(os.path.join(baked_dir, "model_index.json")) as f:
+        index = json.load(f)
+
+    components = {}
+    for name, value in index.items():
+        if name.startswith("_"):
+            continue
+        if not isinstance(value, list):
+            # pipeline config such as SDXL's force_zeros_for_empty_prompt
+            components[name] = value
+            continue
+
+        library, class_name = value
+        if library is None:
+            components[name] = None
+            continue
+
+        cls = getattr(importlib.import_module(library), class_name)
+        folder = os.path.join(baked_dir, name)
+        weights = glob(os.path.join(folder, "*.safetensors"))
+        if issubclass(cls, torch.nn.Module) and len(weights) == 1:
+            components[name] = load_module(cls, folder, weights[0], device)
+        else:
+            # tokenizers, schedulers
+            components[name] = cls.from_pretrained(folder)
+
+    return getattr(diffusers, index["_class_name"])(**components)
+
+
+def load_pipeline(spec: dict, source_dir: str, baked_dir: str, device: str = "cuda"):
+    # the baked artifacts when they are there and current, otherwise the
+    # downloaded folder as before
+    if is_baked(spec, baked_dir):
+        return load_baked(baked_dir, device)
+
+    print(f"No baked weights at {baked_dir}, loading {source_dir}")
+    pipe = load_source(spec, source_dir)
+    if spec.get("quantize"):
+        # on the CPU, so a model that only fits the GPU quantized still loads
+        quantize_pipeline(pipe, spec["quantize"], spec.get("quantize_components", QUANTIZED_COMPONENTS))
+    return pipe.to(device)